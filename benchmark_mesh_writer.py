@@ -0,0 +1,93 @@
+"""
+MESH writing time of toughio against the cached-geometry writer.
+
+Run with toughio installed:
+
+    python benchmark_mesh_writer.py
+
+Without toughio, only the fast writer is timed, on the geometry of coarse_model/coupled_model/MESH.
+"""
+
+import os
+import tempfile
+import timeit
+
+import numpy as np
+
+from mesh_writer import MeshGeometry
+
+try:
+    import toughio
+
+except ImportError:
+    toughio = None
+
+
+mesh_file = "mesh/FSC_coarse.msh"
+mesh_tough = "coarse_model/coupled_model/MESH"
+boundary_materials = ("BNDTO", "BNDBO")
+n_repeat = 5
+
+
+def best_time(func, *args):
+    """Best wall time (s) of a single call over n_repeat runs."""
+    return min(timeit.repeat(lambda: func(*args), number=1, repeat=n_repeat))
+
+
+def same_geometry(geometry1, geometry2):
+    """Check that two geometries are equal to write precision."""
+    for name in MeshGeometry._arrays:
+        a, b = getattr(geometry1, name), getattr(geometry2, name)
+        if a.dtype.kind == "f":
+            assert np.allclose(a, b, rtol=1.0e-5, equal_nan=True), name
+        else:
+            assert np.array_equal(a, b), name
+
+
+def bench_toughio(tmp):
+    mesh = toughio.read_mesh(mesh_file)
+    bcond = np.isin(mesh.materials, boundary_materials).astype(int)
+    mesh.add_cell_data("boundary_condition", bcond)
+
+    t_geometry = best_time(MeshGeometry.from_mesh, mesh)
+    geometry = MeshGeometry.from_mesh(mesh)
+
+    filename_toughio = os.path.join(tmp, "MESH_toughio")
+    filename_fast = os.path.join(tmp, "MESH_fast")
+    t_toughio = best_time(mesh.write_tough, filename_toughio)
+    t_fast = best_time(geometry.write, filename_fast, bcond)
+    same_geometry(MeshGeometry.read(filename_toughio), MeshGeometry.read(filename_fast))
+
+    print(f"=== {mesh_file}: {mesh.n_cells} elements, {len(geometry.connections)} connections ===")
+    print(f"{'toughio write_tough (ms)':>26} {t_toughio * 1e3:>10.1f}")
+    print(f"{'geometry, once (ms)':>26} {t_geometry * 1e3:>10.1f}")
+    print(f"{'fast writer (ms)':>26} {t_fast * 1e3:>10.1f}")
+    print(f"{'speedup':>26} {t_toughio / t_fast:>9.1f}x")
+
+
+def bench_fast(tmp):
+    t_read = best_time(MeshGeometry.read, mesh_tough)
+    geometry = MeshGeometry.read(mesh_tough)
+    bcond = np.isin(geometry.materials.astype(str), boundary_materials).astype(int)
+
+    cache = os.path.join(tmp, "geometry.npz")
+    geometry.save(cache)
+    t_load = best_time(MeshGeometry.load, cache)
+
+    filename = os.path.join(tmp, "MESH")
+    t_fast = best_time(geometry.write, filename, bcond)
+    same_geometry(geometry, MeshGeometry.read(filename))
+
+    print("toughio is not installed, only the fast writer is timed")
+    print(f"=== {mesh_tough}: {len(geometry.labels)} elements, {len(geometry.connections)} connections ===")
+    print(f"{'parse MESH (ms)':>26} {t_read * 1e3:>10.1f}")
+    print(f"{'load cache (ms)':>26} {t_load * 1e3:>10.1f}")
+    print(f"{'fast writer (ms)':>26} {t_fast * 1e3:>10.1f}")
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as tmp:
+        if toughio is not None:
+            bench_toughio(tmp)
+        else:
+            bench_fast(tmp)
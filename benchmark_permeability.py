@@ -0,0 +1,121 @@
+"""
+Per-call timings of the permeability update kernels against zone count.
+
+Run with toughflac installed (FLAC3D is not required):
+
+    python benchmark_permeability.py
+"""
+
+import timeit
+import tracemalloc
+
+import numpy as np
+
+from toughflac.coupling.permeability import (
+    _rinaldi2019_fused,
+    _rinaldi2019_kernel,
+    stress_tensor,
+)
+
+
+zone_counts = [1_000, 10_000, 100_000, 200_000]
+kernel_zone_counts = [10_000, 100_000, 1_000_000]
+n_repeat = 5
+
+# rinaldi2019 parameters of the FAULT group in flac3d.py
+rinaldi2019_params = dict(n=1, w=2.4, br=20e-6, bmax=60e-6, alpha=1.5)
+
+
+def stress_tensor_loop(stresses):
+    """Previous per-zone assembly of the stress tensor in rinaldi2019."""
+    stress_tensor = []
+    for i in range(len(stresses)):
+        stress_tensor.append(np.asarray([[stresses[i][0], stresses[i][3], stresses[i][5]],
+                                         [stresses[i][3], stresses[i][1], stresses[i][4]],
+                                         [stresses[i][5], stresses[i][4], stresses[i][2]]]))
+
+    return np.asarray(stress_tensor)
+
+
+def best_time(func, *args):
+    """Best wall time (s) of a single call over n_repeat runs."""
+    return min(timeit.repeat(lambda: func(*args), number=1, repeat=n_repeat))
+
+
+def bench_stress_tensor():
+    rng = np.random.default_rng(42)
+
+    print("=== stress_flat -> (N, 3, 3) ===")
+    print(f"{'nzone':>10} {'loop (ms)':>12} {'vectorized (ms)':>16} {'speedup':>9}")
+    for nzone in zone_counts:
+        stresses = rng.normal(-5.0e6, 1.0e6, size=(nzone, 6))
+        assert np.array_equal(stress_tensor_loop(stresses), stress_tensor(stresses))
+
+        t_loop = best_time(stress_tensor_loop, stresses)
+        t_vec = best_time(stress_tensor, stresses)
+        print(f"{nzone:>10d} {t_loop * 1e3:>12.2f} {t_vec * 1e3:>16.2f} {t_loop / t_vec:>8.1f}x")
+
+
+def rinaldi2019_inputs(nzone, rng):
+    """Synthetic fault zone state for the rinaldi2019 kernels."""
+    failed = rng.random(nzone) < 0.3
+
+    return (
+        rng.uniform(1.0e6, 5.0e6, nzone),                  # eff_n_stress
+        rng.uniform(1.0e6, 5.0e6, nzone),                  # eff_n_stress_init
+        np.where(failed, rng.uniform(0.0, 1.0e-3, nzone), 0.0),  # strain_shear
+        np.where(failed, rng.uniform(0.0, 1.0e-4, nzone), 0.0),  # strain_tensile
+        np.full(nzone, 10.0),                              # psi
+        np.tile([5.0e-17, 5.0e-17, 1.0e-17], (nzone, 1)),  # k0_
+        np.full(nzone, 0.14),                              # phi0_
+    )
+
+
+def peak_memory(func, *args):
+    """Peak memory (MB) traced by tracemalloc during a single call."""
+    tracemalloc.start()
+    func(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return peak / 1024**2
+
+
+def bench_rinaldi2019_kernel():
+    rng = np.random.default_rng(42)
+    params = tuple(rinaldi2019_params.values())
+
+    print("=== rinaldi2019 aperture/porosity/permeability kernel ===")
+    if _rinaldi2019_fused is None:
+        print("numba is not installed, only the NumPy kernel is timed")
+
+    # Arrays allocated by numba's runtime are not traced by tracemalloc, hence peak
+    # memory is only reported for the NumPy kernel
+    print(
+        f"{'nzone':>10} {'numpy (ms)':>11} {'numpy peak (MB)':>16} "
+        f"{'fused (ms)':>11} {'speedup':>9}"
+    )
+    for nzone in kernel_zone_counts:
+        args = rinaldi2019_inputs(nzone, rng) + params
+        t_numpy = best_time(_rinaldi2019_kernel, *args)
+        mem_numpy = peak_memory(_rinaldi2019_kernel, *args)
+
+        if _rinaldi2019_fused is None:
+            print(f"{nzone:>10d} {t_numpy * 1e3:>11.2f} {mem_numpy:>16.1f}")
+            continue
+
+        # Compile outside of the timings
+        k, phi = _rinaldi2019_fused(*args)
+        k_ref, phi_ref = _rinaldi2019_kernel(*args)
+        assert np.allclose(k, k_ref) and np.allclose(phi, phi_ref)
+
+        t_fused = best_time(_rinaldi2019_fused, *args)
+        print(
+            f"{nzone:>10d} {t_numpy * 1e3:>11.2f} {mem_numpy:>16.1f} "
+            f"{t_fused * 1e3:>11.2f} {t_numpy / t_fused:>8.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    bench_stress_tensor()
+    bench_rinaldi2019_kernel()
@@ -0,0 +1,297 @@
+"""
+Headless ensemble runner for coupled TOUGH-FLAC models.
+
+Each member of a parameter grid is run in an isolated directory created from a template (e.g., coupled_model/3_THM). Its parameters are written to 'parameters.json', which is read by flac3d.py. At most n_concurrent runs are launched at once, and a budget of n_threads_total threads is split among them. Status and outputs of all runs are collected in one index file ('index.json').
+
+Usage (edit the configuration at the bottom of this file):
+
+    python ensemble.py          # TOUGH-FLAC runs
+    python ensemble.py --stub   # stub solver, to test the runner
+
+"""
+
+import glob
+import itertools
+import json
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+# Template outputs not copied to run directories
+ignore_patterns = [
+    ".OUTPUT_*",
+    "FOFT_*",
+    "SAVE",
+    "TABLE",
+    "__pycache__",
+    "f3out",
+    "fla_tou",
+    "flac3d.dat",
+    "flag.txt",
+    "plane_monitor_init.npz",
+    "rinaldi2019_init.npz",
+    "toughflac.log",
+]
+
+# Output files collected in index
+output_patterns = [
+    "FOFT_*.csv",
+    "SAVE",
+    "f3out/*",
+    "*.log",
+]
+
+# TOUGH-FLAC command ({n_threads} is replaced by the thread budget of a run)
+tough_command = ["mpiexec", "-n", "{n_threads}", "tough3-flac-eco2n", "INFILE_coupled"]
+
+
+def parameter_grid(**values):
+    """
+    Cartesian product of parameter values.
+
+    Parameters
+    ----------
+    values : dict
+        List of values of each parameter.
+
+    Returns
+    -------
+    list of dict
+        Parameters of each run.
+
+    Example
+    -------
+    >>> parameter_grid(br=[10e-6, 20e-6], alpha=[1.0, 1.5])
+    [{'br': 1e-05, 'alpha': 1.0}, {'br': 1e-05, 'alpha': 1.5}, {'br': 2e-05, 'alpha': 1.0}, {'br': 2e-05, 'alpha': 1.5}]
+
+    """
+    names = list(values)
+
+    return [dict(zip(names, v)) for v in itertools.product(*values.values())]
+
+
+def stub_command(duration=1.0):
+    """
+    Stub solver command for testing the runner without TOUGH-FLAC.
+
+    The stub reads 'parameters.json', sleeps and writes 'f3out/stub.json'.
+
+    Parameters
+    ----------
+    duration : scalar, optional, default 1.0
+        Run time of each stub (s).
+
+    Returns
+    -------
+    list of str
+        Command.
+
+    """
+    script = (
+        "import json, os, time; "
+        "parameters = json.load(open('parameters.json')); "
+        "time.sleep({}); "
+        "os.makedirs('f3out', exist_ok=True); "
+        "json.dump(parameters, open('f3out/stub.json', 'w'))"
+    ).format(duration)
+
+    return [sys.executable, "-c", script]
+
+
+def setup_run(rundir, template, parameters, files=None):
+    """
+    Create run directory from template.
+
+    Parameters
+    ----------
+    rundir : str
+        Run directory (must not exist).
+    template : str
+        Template directory.
+    parameters : dict
+        Run parameters, written to 'parameters.json'.
+    files : dict or None, optional, default None
+        Additional files to copy as {source: destination name} (e.g., flac3d.py, flac3d.sh, MESH, tf_in.f3sav).
+
+    """
+    shutil.copytree(template, rundir, ignore=shutil.ignore_patterns(*ignore_patterns))
+    for source, name in (files or {}).items():
+        shutil.copy2(source, os.path.join(rundir, name))
+
+    with open(os.path.join(rundir, "parameters.json"), "w") as f:
+        json.dump(parameters, f, indent=2)
+
+
+class Ensemble(object):
+    """
+    Ensemble of coupled runs.
+
+    Parameters
+    ----------
+    root : str
+        Ensemble directory (run directories and index).
+    template : str
+        Template directory.
+    grid : list of dict
+        Parameters of each run (e.g., output of :func:`parameter_grid`).
+    files : dict or None, optional, default None
+        Additional files to copy to each run directory as {source: destination name}.
+    n_concurrent : int, optional, default 2
+        Maximum number of concurrent runs.
+    n_threads_total : int, optional, default 20
+        Thread budget split among concurrent runs.
+    command : list of str or None, optional, default None
+        Command run in each directory. Default is the TOUGH-FLAC command.
+
+    """
+
+    def __init__(
+        self,
+        root,
+        template,
+        grid,
+        files=None,
+        n_concurrent=2,
+        n_threads_total=20,
+        command=None,
+    ):
+        if n_concurrent < 1:
+            raise ValueError("n_concurrent must be at least 1.")
+
+        self.root = root
+        self.template = template
+        self.grid = grid
+        self.files = files
+        self.n_concurrent = n_concurrent
+        self.n_threads = max(n_threads_total // n_concurrent, 1)
+        self.command = command if command is not None else tough_command
+
+        self.index = {}
+        self._lock = threading.Lock()
+
+    def run(self):
+        """
+        Set up and run all members of the ensemble.
+
+        Runs with the same parameters already marked as 'done' in an existing index are skipped.
+
+        Returns
+        -------
+        dict
+            Index of all runs.
+
+        """
+        if not os.path.isdir(self.root):
+            os.makedirs(self.root)
+        self._load_index()
+
+        names = []
+        for i, parameters in enumerate(self.grid):
+            name = "run_{:04d}".format(i)
+            run = self.index.get(name, {})
+            if run.get("status") == "done" and all(
+                run["parameters"].get(k) == v for k, v in parameters.items()
+            ):
+                continue
+
+            rundir = os.path.join(self.root, name)
+            if os.path.isdir(rundir):
+                shutil.rmtree(rundir)
+
+            parameters = dict(parameters, n_threads=self.n_threads, logdir=".")
+            setup_run(rundir, self.template, parameters, self.files)
+            self._update(name, status="pending", parameters=parameters, rundir=rundir)
+            names.append(name)
+
+        with ThreadPoolExecutor(max_workers=self.n_concurrent) as executor:
+            list(executor.map(self._run, names))
+
+        return self.index
+
+    def _run(self, name):
+        """Run one member."""
+        rundir = self.index[name]["rundir"]
+        command = [arg.format(n_threads=self.n_threads) for arg in self.command]
+        env = dict(os.environ, FLAC3D_HEADLESS="1", OMP_NUM_THREADS=str(self.n_threads))
+
+        start = time.time()
+        self._update(name, status="running", start=start)
+        with open(os.path.join(rundir, "run.log"), "w") as log:
+            try:
+                returncode = subprocess.call(command, cwd=rundir, env=env, stdout=log, stderr=subprocess.STDOUT)
+            except OSError as e:
+                log.write("{}\n".format(e))
+                returncode = -1
+
+        outputs = sorted(
+            os.path.relpath(path, rundir)
+            for pattern in output_patterns
+            for path in glob.glob(os.path.join(rundir, pattern))
+        )
+        self._update(
+            name,
+            status="done" if returncode == 0 else "failed",
+            returncode=returncode,
+            wall_time=time.time() - start,
+            outputs=outputs,
+        )
+
+    def _load_index(self):
+        """Load existing index."""
+        filename = os.path.join(self.root, "index.json")
+        if os.path.isfile(filename):
+            with open(filename, "r") as f:
+                self.index = json.load(f)
+
+    def _update(self, name, **kwargs):
+        """Update status of a run and write index."""
+        with self._lock:
+            self.index.setdefault(name, {}).update(kwargs)
+
+            filename = os.path.join(self.root, "index.json")
+            tmp = "{}.tmp".format(filename)
+            with open(tmp, "w") as f:
+                json.dump(self.index, f, indent=2)
+            os.replace(tmp, filename)
+
+            counts = {}
+            for run in self.index.values():
+                counts[run["status"]] = counts.get(run["status"], 0) + 1
+            print(
+                "{} {}: {}".format(
+                    name,
+                    kwargs.get("status", ""),
+                    ", ".join("{} {}".format(v, k) for k, v in sorted(counts.items())),
+                )
+            )
+
+
+if __name__ == "__main__":
+    model = os.path.dirname(os.path.abspath(__file__))
+
+    grid = parameter_grid(
+        br=[10e-6, 20e-6, 40e-6],
+        bmax=[60e-6, 120e-6],
+        alpha=[1.0, 1.5],
+        k0_fault=[[5.0e-17, 5.0e-17, 1.0e-17], [5.0e-16, 5.0e-16, 1.0e-16]],
+    )
+    ensemble = Ensemble(
+        root=os.path.join(model, "ensemble"),
+        template=os.path.join(model, "coupled_model", "3_THM"),
+        grid=grid,
+        files={
+            os.path.join(model, "flac3d.py"): "flac3d.py",
+            os.path.join(model, "flac3d.sh"): "flac3d.sh",
+            os.path.join(model, "coupled_model", "MESH"): "MESH",
+            os.path.join(model, "coupled_model", "tf_in.f3sav"): "tf_in.f3sav",
+        },
+        n_concurrent=4,
+        n_threads_total=20,
+        command=stub_command(2.0) if "--stub" in sys.argv else None,
+    )
+    ensemble.run()
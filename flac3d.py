@@ -1,23 +1,48 @@
 from toughflac.coupling import extra, run
+from toughflac.coupling.permeability import PermeabilityRegistry
 from toughflac.coupling.permeability import constant
 from toughflac.coupling.permeability import nuus2025
 from toughflac.coupling.permeability import rinaldi2019
 import itasca as it
 
 from toughflac.coupling import extra, run
+from toughflac.coupling.history import HistorySampler
+from toughflac.coupling.monitor import ColumnWriter
+from toughflac.coupling.monitor import GroupMonitor
+from toughflac.coupling.monitor import PlaneMonitor
+from toughflac.coupling.profiler import CouplingProfiler
+from toughflac.coupling.scheduler import MechanicalScheduler
+from toughflac.coupling.scheduler import RatioStrategy
+from toughflac.coupling.scheduler import rate_changes
 from itasca import zonearray as za
 import toughflac.zonearray as tza
 import itasca as it
 import numpy as np
-import csv 
+import json
+import os
+
+
+# Parameters of ensemble runs (written by ensemble.py in the run directory)
+parameters = {}
+if os.path.isfile("parameters.json"):
+    with open("parameters.json") as f:
+        parameters = json.load(f)
+
+# Output directory of Python function logs
+logdir = parameters.get("logdir", r"/home/manuus/Desktop/FS-C/model")
 
 
 # FLAC3D solver parameters
 model_save = "tf_in.f3sav"
+
+# Initial state of rinaldi2019 and reference stresses of PlaneMonitor
+# (reloaded by restarted runs, delete them to start a new run)
+rinaldi2019_init_file = "rinaldi2019_init.npz"
+plane_monitor_init_file = "plane_monitor_init.npz"
 deterministic = False
 damping = "combined"
 mechanical_ratio = 1.0e-7
-n_threads = 20
+n_threads = parameters.get("n_threads", 20)
 thermal = True
 
 # Output parameters
@@ -40,202 +65,106 @@ extra["therm_coeff"] = True
 extra["saturation"] = True
 extra["pcap"] = True
 
-def stress_on_plane(tough_time):
-    """
-    Function to calculate effective normal stress on plane 
-    """
-    global init_pp, init_ss, init_sn
-
-    # Unpack time info
-    tought, tstep = tough_time
-
-    # Get all zones once and reuse
-    zones = list(it.zone.list())
-    num_zones = len(zones)
-
-    # Normal vector to the plane
-    n = np.asarray([0.50432, -0.645501, 0.573576])
-
-    # Pore pressure per zone
-    pp = np.asarray([z.pp() for z in zones])
-
-    # Effective stress tensor per zone (3x3)
-    eff_stress = np.array([-z.stress_effective() for z in zones])  # shape (N, 3, 3)
-    if eff_stress.shape[0] != num_zones:
-        raise ValueError("Stress array must be of the same length as number of zones.")
-
-    # Traction vector on the plane for each zone: T_i = σ_eff_i · n
-    T = np.einsum('ijk,k->ij', eff_stress, n)  # shape (N, 3)
-
-    # Normal stress: sn = T · n
-    sn = np.einsum('ij,j->i', T, n)  # shape (N,)
-
-    # Shear stress magnitude: |T|^2 - sn^2
-    ss = np.sqrt(np.einsum('ij,ij->i', T, T) - sn**2)
-
-    # Store initial values at first timestep
-    if tstep == 1:
-        init_pp, init_ss, init_sn = pp, ss, sn
-
-    # Boolean mask for 'FAULT' cells
-    fault_bool = za.in_group('FAULT')  # shape (N,)
-    valid_idx = np.where(fault_bool)[0]  # indices of FAULT cells
-
-    # Subset values for FAULT cells
-    pp_injec = pp[valid_idx]
-    sn_injec = sn[valid_idx]
-    ss_injec = ss[valid_idx]
-
-    # Principal stresses for FAULT cells
-    prin_stresses_all = np.linalg.eigvalsh(eff_stress)  # shape (N, 3)
-    prin_stresses = prin_stresses_all[valid_idx]        # shape (N_fault, 3)
-
-    # If you only want max principal stress, uncomment:
-    # s1_injec = prin_stresses[:, -1]
-
-    # File path
-    csv_file_path = r"/home/manuus/Desktop/FS-C/model/traction_file.csv"
-
-    # Text mode for Python 3 CSV
-    mode = "w" if tstep == 1 else "a"
-    with open(csv_file_path, mode, newline="") as csvfile:
-        writer = csv.writer(csvfile)
-
-        # Header on first timestep
-        if tstep == 1:
-            writer.writerow([
-                "Time_Step",
-                "Zone_ID",
-                "Pore_Pressure(MPa)",
-                "Normal_Stress(MPa)",
-                "Shear_Stress(MPa)",
-                "Principal_Stresses(MPa)",  # or "S1(MPa)" if you pick one
-                "TOUGH_time"
-            ])
-
-        # Write data for each FAULT cell
-        for i, zone_id in enumerate(valid_idx):
-            writer.writerow([
-                tstep,
-                zone_id,
-                pp_injec[i],
-                sn_injec[i],
-                ss_injec[i],
-                prin_stresses[i],  # or prin_stresses[i, -1] for max principal
-                tought
-            ])
-
-    return
-
-
-
-def printer_function(
-    tough_time,
-    group_name="FAULT",
-    *,
+# Zone extra variables where slip tendency, Coulomb failure stress change and
+# distance to failure on the fault plane are stored
+plane_extra_index = {"slip_tendency": 41, "dcfs": 42, "distance_to_failure": 43}
+
+# Tractions on the fault plane (one binary file per column, see read_columns)
+stress_on_plane = PlaneMonitor(
+    [
+        (
+            "FAULT",
+            [0.50432, -0.645501, 0.573576],
+            ColumnWriter(os.path.join(logdir, "traction"), PlaneMonitor.columns),
+        ),
+    ],
+    friction=0.6,
+    cohesion=0.0,
+    extra_index=plane_extra_index,
+    top_k=10,
+    init_file=plane_monitor_init_file,
+)
+
+
+# Statistics of the fault group, logged every step and printed every 10 steps
+# (or when 10%, 25% or 50% of the zones have failed)
+printer_function = GroupMonitor(
+    "FAULT",
     joint=True,
-):
-    tought, tstep = tough_time
-
-    group = za.in_group(group_name)  # boolean mask in global zonearray order
-    if not np.any(group):
-        print(f"[printer] no zones in group {group_name}")
-        return
-
-    # --- Read permeability currently stored in the model
-    k_all = tza.permeability()       # (nzone_total, 3)
-    k = k_all[group, :]              # (nzone_group, 3)
-
-    # --- Read strains for this group
-    suffix = "-joint" if joint else ""
-    strain_shear   = za.prop_scalar(f"strain-shear-plastic{suffix}")[group]
-    strain_tensile = za.prop_scalar(f"strain-tensile-plastic{suffix}")[group]
-    failed_mask = strain_shear > 0.0
-
-    # --- pore pressure for this group (Pa)
-    pp_group = tza.pp()[group]
-
-    # ============================================================
-    #   Existing diagnostics (your original stuff)
-    # ============================================================
-
-    k_col = k[:, 0]
-    idx_sorted = np.argsort(k_col)[::-1]
-    idx_second = int(idx_sorted[1]) if idx_sorted.size > 1 else int(idx_sorted[0])
-
-    if np.any(failed_mask):
-        failed_idx = np.nonzero(failed_mask)[0]
-        idx_min_failed = int(failed_idx[np.argmin(k_col[failed_idx])])
-    else:
-        idx_min_failed = int(idx_sorted[-1])
-
-    pp_sorted = np.sort(pp_group)
-    pp_second = float(pp_sorted[-2]) if pp_sorted.size >= 2 else float(pp_sorted[-1])
-
-    print(f"=== printer debug ({group_name}) tstep={tstep} t={tought} ===")
-    print("k (2nd highest)       :", k[idx_second, :])
-    print("k (min, failed only)        :", k[idx_min_failed, :])
-    print("strain_shear @min k failed  :", float(strain_shear[idx_min_failed]))
-    print("Index (2nd max k)     :", idx_second)
-    print("Index (min k failed)  :", idx_min_failed)
-    print("strain_tens @2nd max  :", float(strain_tensile[idx_second]))
-    print("strain_shear @2nd max :", float(strain_shear[idx_second]))
-    print("strain_tens @min fail :", float(strain_tensile[idx_min_failed]))
-    print("strain_shear@min fail :", float(strain_shear[idx_min_failed]))
-    print("pp 2nd max            : {:.3f} MPa".format(pp_second * 1e-6))
-    print("failed zones          : {} / {}".format(np.count_nonzero(failed_mask), strain_shear.size))
-    print("==============================================")
+    log=ColumnWriter(os.path.join(logdir, "fault_monitor"), GroupMonitor.columns),
+    every=10,
+    failed_fraction=(0.1, 0.25, 0.5),
+)
+
+# Skip mechanical analysis while pore pressure and temperature barely change
+# (forced when the injection rate changes by more than 0.01 kg/s)
+rates = np.genfromtxt(
+    r"/home/manuus/Desktop/FS-C/model/injection_rates/filtered_FSC_injecrates.csv",
+    delimiter=",",
+    skip_header=1,
+    usecols=(5, 2),  # TimeElapsed, net flow cor [kg/s]
+)
+mechanical_scheduler = MechanicalScheduler(
+    dpp=1.0e5,
+    dtemp=1.0,
+    force_times=rate_changes(rates[:, 0], rates[:, 1], tol=0.01),
+    max_skip=20,
+    log=ColumnWriter(os.path.join(logdir, "mechanical_schedule"), MechanicalScheduler.columns),
+    summary=True,
+)
+
+# Equilibrium ratio relaxed for small pore pressure increments (< 0.01 MPa)
+# and tightened while the number of failed fault zones is rising
+# (solves are timed as mechanical analysis)
+mechanical_strategy = RatioStrategy(
+    ratio=mechanical_ratio,
+    ratio_min=1.0e-8,
+    ratio_max=1.0e-5,
+    dpp_small=1.0e4,
+    group="FAULT",
+    joint=True,
+    scheduler=mechanical_scheduler,
+    log=ColumnWriter(os.path.join(logdir, "mechanical_cycles"), RatioStrategy.columns),
+    summary=True,
+)
 
 # Extra Python functions as a list of callables
-python_func_tough = ()  # Before mechanical analysis
+python_func_tough = (mechanical_scheduler,)  # Before mechanical analysis
 python_func_flac = (printer_function,) #(stress_on_plane,)  # After mechanical analysis
 
 # Extra FISH functions as a list of strings
 fish_func_tough = ()  # Before mechanical analysis
 fish_func_flac = ()  # After mechanical analysis
 
-k0_fault = np.array([5.0e-17, 5.0e-17, 1.0e-17], dtype=float)
+k0_fault = np.array(parameters.get("k0_fault", [5.0e-17, 5.0e-17, 1.0e-17]), dtype=float)
 k0_clay = np.array([5.0e-18, 5.0e-18, 1.0e-18], dtype=float)
 k0_edz = np.array([5.0e-13, 5.0e-13, 1.0e-12], dtype=float)
 k0_bnd = np.array([1.0e-18, 1.0e-18, 1.0e-18], dtype=float)
 
 a_fault = 500
 
-permeability_func = {
-    "FAULT": lambda g: rinaldi2019(
-        g,
-        k0 = k0_fault,
-        phi0 = 0.14,
-        n = 1,
-        w = 2.4,
-        br = 20e-6,     #was 20e-6
-        bmax = 60e-6,  #was 500e-6
-        alpha = 1.5, 
-        n_vector = np.array([0.47, -0.60, 0.64]),
-        joint = True, 
-
-    ),
-    "EDZ": lambda g: constant(
-        g,
-        k0=k0_edz,
-        phi0=0.14,
-    ),
-    "CLAY": lambda g: constant(
-        g,
-        k0=k0_clay,
-        phi0=0.12,
-    ),
-    "BNDTO": lambda g: constant(
-        g,
-        k0=np.tile(k0_bnd, (g.sum(), 1)),
-        phi0=0.12,   
-    ),
-    "BNDBO": lambda g: constant(
-        g,
-        k0=np.tile(k0_bnd, (g.sum(), 1)),
-        phi0=0.12,    
-    ),
-}
+# Groups sharing the same model (EDZ, CLAY, BNDTO and BNDBO) are evaluated in a single call
+permeability_models = PermeabilityRegistry()
+permeability_models.add(
+    "FAULT",
+    rinaldi2019,
+    k0 = k0_fault,
+    phi0 = 0.14,
+    n = 1,
+    w = 2.4,
+    br = parameters.get("br", 20e-6),     #was 20e-6
+    bmax = parameters.get("bmax", 60e-6),  #was 500e-6
+    alpha = parameters.get("alpha", 1.5), 
+    n_vector = np.array([0.47, -0.60, 0.64]),
+    joint = True, 
+    init_file = rinaldi2019_init_file,
+)
+permeability_models.add("EDZ", constant, k0=k0_edz, phi0=0.14)
+permeability_models.add("CLAY", constant, k0=k0_clay, phi0=0.12)
+permeability_models.add("BNDTO", constant, k0=k0_bnd, phi0=0.12)
+permeability_models.add("BNDBO", constant, k0=k0_bnd, phi0=0.12)
+
+permeability_func = permeability_models.permeability_func()
 
 #permeability_func = {
 #    "FAULT": lambda g: rutqvist2002(
@@ -246,6 +175,13 @@ permeability_func = {
 #}
 
 
+# Timing of each coupling step
+profiler = CouplingProfiler(
+    log=ColumnWriter(os.path.join(logdir, "profile"), CouplingProfiler.columns),
+    summary=True,
+)
+
+
 # History variables
 history_func = {}
 history_attributes = [
@@ -271,6 +207,10 @@ history = {
     "hist3": {k: [[0.0, 0.0, -1290.0]] for k in history_attributes},
 }
 
+# Histories are sampled by a Python function (points resolved once) rather than by run
+history_sampler = HistorySampler(history, savedir=savedir, fmt="csv", flush_every=100)
+python_func_flac += (history_sampler,)
+
 
 if __name__ == "__main__":
     run(
@@ -280,11 +220,15 @@ if __name__ == "__main__":
         mechanical_ratio=mechanical_ratio,
         n_threads=n_threads,
         thermal=thermal,
-        permeability_func=permeability_func,
-        callback_tough=python_func_tough,
-        callback_flac=python_func_flac,
+        **profiler.wrap(
+            permeability_func,
+            python_func_tough,
+            python_func_flac,
+            mechanical_tough=(mechanical_strategy.before,),
+            mechanical_flac=(mechanical_strategy.after,),
+        ),
         history_func=history_func,
-        history=history,
+        history={},
         savedir=savedir,
         save_python=save_python,
     )
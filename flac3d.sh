@@ -10,13 +10,20 @@ echo "echo off" >> flac3d.dat
 echo "call 'flac3d.py'" >> flac3d.dat
 echo "exit" >> flac3d.dat
 
-# Call FLAC3D console
+# FLAC3D console
+case "${flac}" in
+	7 )
+		console="/opt/itascasoftware/v700/flac3d7_console.sh" ;;
+	9 )
+		console="/opt/itascasoftware/subscription/flac3d9_console.sh" ;;
+esac
+
+# Call FLAC3D console (without terminal window if FLAC3D_HEADLESS is set, e.g., by ensemble.py)
 case "$(uname -s)" in
 	Linux )
-		case "${flac}" in
-			7 )
-                                xfce4-terminal --command="/opt/itascasoftware/v700/flac3d7_console.sh flac3d.dat" ;;
-			9 )
-                                xfce4-terminal --command="/opt/itascasoftware/subscription/flac3d9_console.sh flac3d.dat" ;;
-		esac;;
+		if [ -n "${FLAC3D_HEADLESS:-}" ]; then
+			${console} flac3d.dat > flac3d.log 2>&1
+		else
+			xfce4-terminal --command="${console} flac3d.dat"
+		fi;;
 esac
@@ -0,0 +1,369 @@
+"""
+Vectorized GENER block writer for volume-distributed injection.
+
+The rates of all injection cells are computed at once as the outer product of relative cell volumes and injection rates, the time vector is formatted once and shared by all sources, and the fixed-format GENER records are streamed straight to disk. Consecutive cells with the same written rates share a single record (and table) through TOUGH's NSEQ/NADD indirection.
+"""
+
+import numpy as np
+
+
+header = "GENER----1----*----2----*----3----*----4----*----5----*----6----*----7----*----8\n"
+
+
+def well_distribution(volumes, mode="volume"):
+    """
+    Fraction of the well injection rate assigned to each injection cell.
+
+    Parameters
+    ----------
+    volumes : array_like
+        Volume of each injection cell.
+    mode : str ('volume' or 'uniform'), optional, default 'volume'
+        Distribution mode:
+
+         - 'volume': proportional to cell volumes (one table per cell, unless consecutive cells have the same volume)
+         - 'uniform': uniform (one table shared by consecutive cells, but not volume-weighted)
+
+    Returns
+    -------
+    array_like
+        Fraction of each cell (sums to 1).
+
+    """
+    volumes = np.asarray(volumes, dtype=float)
+
+    if mode == "volume":
+        return volumes / volumes.sum()
+
+    elif mode == "uniform":
+        return np.full(len(volumes), 1.0 / len(volumes))
+
+    else:
+        raise ValueError("unknown distribution mode '{}'.".format(mode))
+
+
+def compress_rates(times, rates, mass_tol=1.0e-3, rate_tol=1.0e-2, interpolation="step"):
+    """
+    Simplification of injection rate tables.
+
+    Table points are greedily dropped as long as the rates of the reduced table, as interpolated by TOUGH, satisfy both tolerances against the original table:
+
+     - rate error: absolute rate difference below rate_tol times the peak absolute rate,
+     - mass balance: absolute cumulative injected mass difference below mass_tol times the total absolute injected mass.
+
+    With step rates (MOP(12) = 1 or 2), the rate of each interval between kept points is the time-averaged rate of the original intervals it merges, so that injected mass is conserved at every kept point. With linear interpolation (MOP(12) = 0), kept points retain their rates.
+
+    Multiple rate columns sharing the same times are compressed jointly. First and last points are always kept.
+
+    Parameters
+    ----------
+    times : array_like
+        Times of the rate table (sorted), shape (n_times,).
+    rates : array_like
+        Rates at each time, shape (n_times,) or (n_times, n_columns).
+    mass_tol : scalar, optional, default 1.0e-3
+        Relative tolerance on cumulative injected mass.
+    rate_tol : scalar, optional, default 1.0e-2
+        Relative tolerance on rates.
+    interpolation : str ('step' or 'linear'), optional, default 'step'
+        Interpolation of rates between table points by TOUGH (MOP(12)):
+
+         - 'step': rate of each time applies until next time (MOP(12) = 1 or 2)
+         - 'linear': rates are linearly interpolated (MOP(12) = 0)
+
+    Returns
+    -------
+    array_like
+        Times of reduced table.
+    array_like
+        Rates of reduced table.
+    dict
+        Errors of reduced table:
+
+         - 'mass': maximum relative cumulative mass error
+         - 'mass_final': relative total mass error
+         - 'rate': maximum relative rate error
+
+    """
+    if interpolation not in {"step", "linear"}:
+        raise ValueError("unknown interpolation '{}'.".format(interpolation))
+
+    times = np.asarray(times, dtype=float)
+    rates = np.asarray(rates, dtype=float)
+    q = rates.reshape((len(times), -1))
+
+    n_times = len(times)
+    if n_times < 3:
+        return times.copy(), rates.copy(), {"mass": 0.0, "mass_final": 0.0, "rate": 0.0}
+
+    # Absolute tolerances of each column
+    dt = np.diff(times)
+    rate_scale = np.abs(q).max(axis=0)
+    if interpolation == "step":
+        mass_scale = (dt[:, None] * np.abs(q[:-1])).sum(axis=0)
+    else:
+        mass_scale = 0.5 * (dt[:, None] * (np.abs(q[1:]) + np.abs(q[:-1]))).sum(axis=0)
+    rate_atol = rate_tol * rate_scale
+    mass_atol = mass_tol * mass_scale
+
+    # Cumulative time and injected mass of step rates
+    time_cum = np.concatenate(([0.0], np.cumsum(dt)))
+    mass_cum = np.concatenate((np.zeros((1, q.shape[1])), np.cumsum(dt[:, None] * q[:-1], axis=0)))
+
+    def rate(i, j):
+        """Rate of reduced table over segment [i, j]."""
+        if interpolation == "step":
+            span = time_cum[j] - time_cum[i]
+            return (mass_cum[j] - mass_cum[i]) / span if span > 0.0 else q[i]
+
+        return q[i]
+
+    def error(i, j, offset):
+        """Rate error and cumulative mass error of segment [i, j] (with mass error offset at i)."""
+        t = times[i : j + 1]
+        if interpolation == "step":
+            # Errors of original intervals [i, i + 1), ..., [j - 1, j)
+            dq = rate(i, j) - q[i:j]
+            dm = np.cumsum(np.diff(t)[:, None] * dq, axis=0)
+
+        else:
+            qq = q[i : j + 1]
+            span = t[-1] - t[0]
+            w = ((t - t[0]) / span if span > 0.0 else np.linspace(0.0, 1.0, len(t)))[:, None]
+            dq = qq[0] + w * (qq[-1] - qq[0]) - qq
+            dm = np.cumsum(0.5 * np.diff(t)[:, None] * (dq[1:] + dq[:-1]), axis=0)
+
+        return dq, offset + np.concatenate((np.zeros((1, q.shape[1])), dm))
+
+    def valid(i, j, offset):
+        dq, dm = error(i, j, offset)
+        return np.all(np.abs(dq) <= rate_atol) and np.all(np.abs(dm) <= mass_atol)
+
+    index = [0]
+    offset = np.zeros(q.shape[1])
+    i = 0
+    while i < n_times - 1:
+        # Exponential search of segment end, then bisection
+        j, step = i + 1, 1
+        while j + step < n_times and valid(i, j + step, offset):
+            j += step
+            step *= 2
+
+        lo, hi = j, min(j + step, n_times)
+        while hi - lo > 1:
+            mid = (lo + hi) // 2
+            if valid(i, mid, offset):
+                lo = mid
+            else:
+                hi = mid
+
+        offset = error(i, lo, offset)[1][-1]
+        index.append(lo)
+        i = lo
+
+    times_c = times[index]
+    q_c = np.array([rate(i, j) for i, j in zip(index[:-1], index[1:])] + [q[-1]])
+
+    # Errors at original points
+    dq, dm = [], []
+    offset = np.zeros(q.shape[1])
+    for i, j in zip(index[:-1], index[1:]):
+        dq_, dm_ = error(i, j, offset)
+        dq.append(dq_)
+        dm.append(dm_[1:])
+        offset = dm_[-1]
+    dq, dm = np.concatenate(dq), np.concatenate(dm)
+
+    def relative(x, scale):
+        return float(np.max(np.where(scale > 0.0, x / np.where(scale > 0.0, scale, 1.0), 0.0)))
+
+    errors = {
+        "mass": relative(np.abs(dm).max(axis=0), mass_scale),
+        "mass_final": relative(np.abs(dm[-1]), mass_scale),
+        "rate": relative(np.abs(dq).max(axis=0), rate_scale),
+    }
+
+    return times_c, q_c.reshape((len(index),) + rates.shape[1:]), errors
+
+
+def rate_matrix(rel_volumes, rates):
+    """
+    Rates of each injection cell, shape (n_cells, n_times).
+
+    Parameters
+    ----------
+    rel_volumes : array_like
+        Relative volume of each injection cell, shape (n_cells,).
+    rates : array_like
+        Total injection rate at each time, shape (n_times,).
+
+    Returns
+    -------
+    array_like
+        Rate matrix.
+
+    """
+    return np.multiply.outer(np.asarray(rel_volumes, dtype=float), np.asarray(rates, dtype=float))
+
+
+def format_table(values):
+    """
+    Format a table of values as fixed-width records (4 values of 14 characters per line).
+
+    Parameters
+    ----------
+    values : array_like
+        Values to format.
+
+    Returns
+    -------
+    str
+        Formatted records.
+
+    """
+    values = np.asarray(values, dtype=float).ravel()
+    n_full, n_last = divmod(len(values), 4)
+
+    out = ("{:14.7e}" * 4 + "\n") * n_full
+    if n_last:
+        out += "{:14.7e}" * n_last + "\n"
+
+    return out.format(*values.tolist())
+
+
+def format_value(value, width=10):
+    """
+    Format a value in scientific notation that fits within width characters.
+
+    Parameters
+    ----------
+    value : scalar
+        Value to format.
+    width : int, optional, default 10
+        Field width.
+
+    Returns
+    -------
+    str
+        Formatted value.
+
+    """
+    for precision in range(width - 6, -1, -1):
+        out = "{:.{}e}".format(value, precision)
+        if len(out) <= width:
+            return "{:>{}}".format(out, width)
+
+    raise ValueError("value {} does not fit within {} characters.".format(value, width))
+
+
+def sequences(labels, sources, rtol=0.0, tables=None):
+    """
+    Runs of consecutive elements sharing the same rates.
+
+    Elements are consecutive if their labels share the same first three characters and their code numbers (last two characters) increase by one. Rates are the same if they are within rtol, or if their formatted tables are identical.
+
+    Parameters
+    ----------
+    labels : sequence of str
+        Element label of each injection cell, shape (n_cells,).
+    sources : dict
+        Rate matrix of each source type as {type: array of shape (n_cells, n_times)}.
+    rtol : scalar, optional, default 0.0
+        Relative tolerance on rates of a run.
+    tables : dict or None, optional, default None
+        Formatted rate table of each cell for each source type as {type: list of str} (output of :func:`format_table`).
+
+    Returns
+    -------
+    list of tuple
+        First cell and number of cells of each run.
+
+    """
+    n_cells = len(labels)
+    if not n_cells:
+        return []
+
+    # Rates equal to those of previous cell
+    same = np.ones(n_cells - 1, dtype=bool)
+    for k, rates in sources.items():
+        close = np.all(np.abs(rates[1:] - rates[:-1]) <= rtol * np.abs(rates[:-1]), axis=1)
+        if tables is not None:
+            close |= np.array([t1 == t2 for t1, t2 in zip(tables[k][:-1], tables[k][1:])], dtype=bool)
+        same &= close
+
+    runs = []
+    start = 0
+    for i in range(1, n_cells):
+        if not (same[i - 1] and _consecutive(labels[i - 1], labels[i])):
+            runs.append((start, i - start))
+            start = i
+    runs.append((start, n_cells - start))
+
+    return runs
+
+
+def _consecutive(label1, label2):
+    """Return True if label2 follows label1 (NADD = 1)."""
+    try:
+        return label1[:3] == label2[:3] and int(label2[3:5]) == int(label1[3:5]) + 1
+
+    except ValueError:
+        return False
+
+
+def write_gener(filename, labels, times, sources, specific_enthalpy=0.0, shared=False, rtol=0.0):
+    """
+    Stream a GENER block with time-dependent rates to disk.
+
+    Each injection cell gets one record per source type (in the order of `sources`), all sharing the same times. A constant specific enthalpy is written to the GENER.1 record (EX) instead of a table of zeros.
+
+    If `shared` is `True`, consecutive cells with the same rates (identical once written, or within rtol) are written as a single record with NSEQ additional elements (NADD = 1), so that the rate table is only written (and parsed) once per run of cells. TOUGH has no per-element scale factor for tabulated rates (GX is ignored when LTAB > 1), hence volume-weighted cells only share a table if their volumes are the same.
+
+    Parameters
+    ----------
+    filename : str
+        Output file name (e.g., 'GENER').
+    labels : sequence of str
+        Element label of each injection cell, shape (n_cells,).
+    times : array_like
+        Times of the rate tables, shape (n_times,).
+    sources : dict
+        Rate matrix of each source type as {type: array of shape (n_cells, n_times)} (e.g., output of :func:`rate_matrix`).
+    specific_enthalpy : scalar, optional, default 0.0
+        Specific enthalpy of injected fluids (J/kg).
+    shared : bool, optional, default False
+        If `True`, share records of consecutive cells with the same rates.
+    rtol : scalar, optional, default 0.0
+        Relative tolerance on rates of shared records (only if `shared` is `True`).
+
+    """
+    times = np.asarray(times, dtype=float)
+    n_cells, n_times = len(labels), len(times)
+    for k, rates in sources.items():
+        if np.shape(rates) != (n_cells, n_times):
+            raise ValueError("rates of source '{}' must be of shape ({}, {}).".format(k, n_cells, n_times))
+
+    # Shared by all sources
+    times_record = format_table(times)
+    ex = format_value(specific_enthalpy)
+
+    # Rate tables of each cell (formatted once, compared when shared)
+    tables = (
+        {k: [format_table(r) for r in rates] for k, rates in sources.items()}
+        if shared
+        else None
+    )
+    runs = sequences(labels, sources, rtol, tables) if shared else [(i, 1) for i in range(n_cells)]
+
+    with open(filename, "w") as f:
+        f.write(header)
+        for i, n in runs:
+            nseq, nadd = (n - 1, 1) if n > 1 else ("", "")
+            for k, rates in sources.items():
+                f.write("{:<5}{:<5}{:>5}{:>5}{:>5}{:>5}{:>5}{:<4}{:1}{:>10}{}\n".format(
+                    labels[i], "", nseq, nadd, "", n_times, "", k, "", "", ex,
+                ))
+                f.write(times_record)
+                f.write(tables[k][i] if shared else format_table(rates[i]))
+
+        f.write("\n")
@@ -0,0 +1,267 @@
+from __future__ import division
+
+import atexit
+import os
+
+import numpy
+
+from .monitor import ColumnWriter, principal_stresses
+from .permeability import snapshot, stress_tensor
+
+try:
+    from itasca import gridpointarray as gpa
+    from itasca import zonearray as za
+except ImportError:
+    pass
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:
+    cKDTree = None
+
+
+__all__ = [
+    "HistorySampler",
+]
+
+
+# Zone attributes: name -> (source, component)
+_zone_attributes = {
+    "pp": ("pp", None),
+    "temp": ("temp", None),
+    "stress_xx": ("stress_flat", 0),
+    "stress_yy": ("stress_flat", 1),
+    "stress_zz": ("stress_flat", 2),
+    "stress_xy": ("stress_flat", 3),
+    "stress_yz": ("stress_flat", 4),
+    "stress_xz": ("stress_flat", 5),
+    "stress_prin_x": ("stress_prin", 0),
+    "stress_prin_y": ("stress_prin", 1),
+    "stress_prin_z": ("stress_prin", 2),
+}
+
+# Gridpoint attributes: name -> (source, component)
+_gridpoint_attributes = {
+    "disp_x": ("disp", 0),
+    "disp_y": ("disp", 1),
+    "disp_z": ("disp", 2),
+}
+
+
+class HistorySampler(object):
+    """
+    Vectorized sampling of history variables.
+
+    History points are resolved once (on first call) to their nearest zone centroid or gridpoint with a KD-tree (if scipy is installed, brute force otherwise). Each step, all attributes of all points are gathered from the shared zone array snapshot into a preallocated buffer, which is flushed (and emptied) to one file per history every `flush_every` steps, when full, and at exit. Instances are callable and can directly be used as FLAC3D Python functions (after mechanical analysis).
+
+    Parameters
+    ----------
+    history : dict
+        History variables as {name: {attribute: list of points}} (same format as `run`).
+    savedir : str, optional, default "f3out"
+        Output directory.
+    fmt : str ('csv' or 'binary'), optional, default 'csv'
+        Output format, either '<name>.csv' files or :class:`ColumnWriter` directories.
+    capacity : int, optional, default 1000
+        Number of buffered steps.
+    flush_every : int or None, optional, default 100
+        Flush cadence in steps. If `None`, only flush when the buffer is full and at exit.
+    append : bool, optional, default True
+        If `True`, append to existing output in `savedir` (restarted runs). Steps greater than or equal to the first appended step are discarded. If `False`, existing output is discarded.
+
+    Example
+    -------
+    >>> history = {"hist1": {"pp": [[0.0, 0.0, -1450.0]], "disp_z": [[0.0, 0.0, -1200.0]]}}
+    >>> python_func_flac = (HistorySampler(history, savedir="f3out"),)
+
+    """
+
+    def __init__(self, history, savedir="f3out", fmt="csv", capacity=1000, flush_every=100, append=True):
+        if fmt not in {"csv", "binary"}:
+            raise ValueError("unknown format '{}'.".format(fmt))
+
+        # Columns of each history
+        self.names = []
+        self._columns = []
+        self._points = {"zone": [], "gridpoint": []}
+        for name, attributes in history.items():
+            columns = []
+            for attribute, points in attributes.items():
+                if attribute in _zone_attributes:
+                    kind, (source, component) = "zone", _zone_attributes[attribute]
+                elif attribute in _gridpoint_attributes:
+                    kind, (source, component) = "gridpoint", _gridpoint_attributes[attribute]
+                else:
+                    raise ValueError("unknown history attribute '{}'.".format(attribute))
+
+                for i, point in enumerate(points):
+                    columns.append(("{}_{}".format(attribute, i + 1), kind, source, component, len(self._points[kind])))
+                    self._points[kind].append(point)
+
+            self.names.append(name)
+            self._columns.append(columns)
+
+        self.savedir = savedir
+        self.fmt = fmt
+        self.capacity = capacity
+        self.flush_every = flush_every
+        self.append = append
+
+        ncol = sum(len(columns) for columns in self._columns)
+        self._buffer = numpy.empty((capacity, ncol))
+        self._steps = numpy.empty(capacity, dtype=[("tstep", "i8"), ("time", "f8")])
+        self._nrow = 0
+        self._nstep = 0
+        self._gathers = None
+        self._writers = None
+
+        atexit.register(self.flush)
+
+    def __call__(self, tough_time):
+        """Sample all history variables of current step."""
+        time, tstep = tough_time
+        if self._gathers is None:
+            self._resolve()
+
+        snap = snapshot()
+        row = self._buffer[self._nrow]
+        for source, cols, index, component in self._gathers:
+            if source == "stress_prin":
+                arr = principal_stresses(stress_tensor(snap.stress_flat()[self._prin_zones]))
+            elif source == "disp":
+                arr = gpa.disp()
+            else:
+                arr = getattr(snap, source)()
+
+            row[cols] = arr[index] if component is None else arr[index, component]
+
+        self._steps[self._nrow] = tstep, time
+        self._nrow += 1
+        self._nstep += 1
+
+        if self._nrow == self.capacity or (
+            self.flush_every is not None and self._nstep % self.flush_every == 0
+        ):
+            self.flush()
+
+    def flush(self):
+        """Write buffered steps to disk."""
+        if not self._nrow:
+            return
+
+        steps = self._steps[: self._nrow]
+        if self._writers is None:
+            self._open(steps["tstep"][0])
+
+        start = 0
+        for name, columns, writer in zip(self.names, self._columns, self._writers):
+            values = self._buffer[: self._nrow, start : start + len(columns)]
+            start += len(columns)
+
+            if self.fmt == "csv":
+                numpy.savetxt(
+                    writer,
+                    numpy.column_stack((steps["tstep"], steps["time"], values)),
+                    fmt=["%d"] + ["%.8e"] * (len(columns) + 1),
+                    delimiter=",",
+                )
+                writer.flush()
+
+            else:
+                for (tstep, time), row in zip(steps, values):
+                    writer.append(tstep, time, **{column[0]: row[j : j + 1] for j, column in enumerate(columns)})
+                writer.flush()
+
+        self._nrow = 0
+
+    def _resolve(self):
+        """Resolve history points to nearest zones and gridpoints, and group gathers by source."""
+        index = {}
+        for kind, pos in (("zone", za.pos), ("gridpoint", gpa.pos)):
+            if self._points[kind]:
+                index[kind] = _nearest(pos(), numpy.asarray(self._points[kind], dtype=float))
+
+        # Principal stresses are only computed for sampled zones
+        prin_zones = numpy.unique([
+            index["zone"][column[4]]
+            for columns in self._columns
+            for column in columns
+            if column[2] == "stress_prin"
+        ]).astype(int)
+        self._prin_zones = prin_zones
+
+        gathers = {}
+        col = 0
+        for columns in self._columns:
+            for _, kind, source, component, ipoint in columns:
+                i = index[kind][ipoint]
+                if source == "stress_prin":
+                    i = numpy.searchsorted(prin_zones, i)
+
+                key = source, component is None
+                cols, idx, comp = gathers.setdefault(key, ([], [], []))
+                cols.append(col)
+                idx.append(i)
+                comp.append(component)
+                col += 1
+
+        self._gathers = [
+            (
+                source,
+                numpy.array(cols),
+                numpy.array(idx),
+                None if scalar else numpy.array(comp),
+            )
+            for (source, scalar), (cols, idx, comp) in gathers.items()
+        ]
+
+    def _open(self, tstep):
+        """Open output files, existing output is truncated before first step `tstep` (restarted runs)."""
+        if not os.path.isdir(self.savedir):
+            os.makedirs(self.savedir)
+
+        self._writers = []
+        for name, columns in zip(self.names, self._columns):
+            path = os.path.join(self.savedir, name)
+            if self.fmt == "csv":
+                filename = "{}.csv".format(path)
+                header = ",".join(["tstep", "time"] + [column[0] for column in columns]) + "\n"
+                size = _csv_size(filename, header, tstep) if self.append and os.path.isfile(filename) else 0
+
+                writer = open(filename, "a")
+                writer.truncate(size)
+                if not size:
+                    writer.write(header)
+
+            else:
+                writer = ColumnWriter(path, {column[0]: "f8" for column in columns}, append=self.append)
+
+            self._writers.append(writer)
+
+
+def _nearest(pos, points):
+    """Index of nearest position of each point."""
+    if cKDTree is not None:
+        return cKDTree(pos).query(points)[1]
+
+    return numpy.array([((pos - point) ** 2).sum(axis=1).argmin() for point in points])
+
+
+def _csv_size(filename, header, tstep):
+    """Size of the rows of an existing CSV history before step tstep (interrupted last row is discarded)."""
+    with open(filename, "rb") as f:
+        line = f.readline()
+        if not line:
+            return 0
+
+        if line.decode() != header:
+            raise ValueError("columns do not match existing output in '{}'.".format(filename))
+
+        size = len(line)
+        for line in f:
+            if not line.endswith(b"\n") or int(line.split(b",", 1)[0]) >= tstep:
+                break
+
+            size += len(line)
+
+    return size
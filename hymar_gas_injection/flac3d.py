@@ -5,11 +5,12 @@ from toughflac.coupling.permeability import rinaldi2019
 import itasca as it
 
 from toughflac.coupling import extra, run
+from toughflac.coupling.monitor import ColumnWriter
+from toughflac.coupling.monitor import PlaneMonitor
 from itasca import zonearray as za
 import toughflac.zonearray as tza
 import itasca as it
 import numpy as np
-import csv 
 
 
 # FLAC3D solver parameters
@@ -40,93 +41,17 @@ extra["therm_coeff"] = True
 extra["saturation"] = True
 extra["pcap"] = True
 
-def stress_on_plane(tough_time):
-    """
-    Function to calculate effective normal stress on plane 
-    """
-    global init_pp, init_ss, init_sn
-
-    # Unpack time info
-    tought, tstep = tough_time
-
-    # Get all zones once and reuse
-    zones = list(it.zone.list())
-    num_zones = len(zones)
-
-    # Normal vector to the plane
-    n = np.asarray([0, -0.838671, 0.040423])
-
-    # Pore pressure per zone
-    pp = np.asarray([z.pp() for z in zones])
-
-    # Effective stress tensor per zone (3x3)
-    eff_stress = np.array([-z.stress_effective() for z in zones])  # shape (N, 3, 3)
-    if eff_stress.shape[0] != num_zones:
-        raise ValueError("Stress array must be of the same length as number of zones.")
-
-    # Traction vector on the plane for each zone: T_i = σ_eff_i · n
-    T = np.einsum('ijk,k->ij', eff_stress, n)  # shape (N, 3)
-
-    # Normal stress: sn = T · n
-    sn = np.einsum('ij,j->i', T, n)  # shape (N,)
-
-    # Shear stress magnitude: |T|^2 - sn^2
-    ss = np.sqrt(np.einsum('ij,ij->i', T, T) - sn**2)
-
-    # Store initial values at first timestep
-    if tstep == 1:
-        init_pp, init_ss, init_sn = pp, ss, sn
-
-    # Boolean mask for 'CLAY' cells
-    fault_bool = za.in_group('CLAY')  # shape (N,)
-    valid_idx = np.where(fault_bool)[0]  # indices of CLAY cells
-
-    # Subset values for CLAY cells
-    pp_injec = pp[valid_idx]
-    sn_injec = sn[valid_idx]
-    ss_injec = ss[valid_idx]
-
-    # Principal stresses for CLAY cells
-    prin_stresses_all = np.linalg.eigvalsh(eff_stress)  # shape (N, 3)
-    prin_stresses = prin_stresses_all[valid_idx]        # shape (N_clay, 3)
-
-    # If you only want max principal stress, uncomment:
-    # s1_injec = prin_stresses[:, -1]
-
-    # File path
-    csv_file_path = r"/home/manuus/Desktop/FS-C/model/hymar_gas_injection/traction_file.csv"
-
-    # Text mode for Python 3 CSV
-    mode = "w" if tstep == 1 else "a"
-    with open(csv_file_path, mode, newline="") as csvfile:
-        writer = csv.writer(csvfile)
-
-        # Header on first timestep
-        if tstep == 1:
-            writer.writerow([
-                "Time_Step",
-                "Zone_ID",
-                "Pore_Pressure(MPa)",
-                "Normal_Stress(MPa)",
-                "Shear_Stress(MPa)",
-                "Principal_Stresses(MPa)",  # or "S1(MPa)" if you pick one
-                "TOUGH_time"
-            ])
-
-        # Write data for each FAULT cell
-        for i, zone_id in enumerate(valid_idx):
-            writer.writerow([
-                tstep,
-                zone_id,
-                pp_injec[i],
-                sn_injec[i],
-                ss_injec[i],
-                prin_stresses[i],  # or prin_stresses[i, -1] for max principal
-                tought
-            ])
-
-    return
-
+# Tractions on the clay plane (one binary file per column, see read_columns)
+stress_on_plane = PlaneMonitor([
+    (
+        "CLAY",
+        [0, -0.838671, 0.040423],
+        ColumnWriter(
+            r"/home/manuus/Desktop/FS-C/model/hymar_gas_injection/traction",
+            PlaneMonitor.columns,
+        ),
+    ),
+])
 
 
 def printer_function(
@@ -4,209 +4,18 @@
 Created on Tue Mar  3 13:15:18 2026
 
 @author: matthijsnuus
-"""
-
-import numpy as np
-import pandas as pd
-import toughio
-
-
-incon = 'ns' #simulation_point or ns
-
-rates_csv = pd.read_csv("/Users/matthijsnuus/Desktop/FS-C/model/injection_rates/filtered_FSC_injecrates.csv", delimiter=',', index_col=[0])
-#rates_csv.loc[rates_csv.index[0], "net flow [kg/s]"] = 0.0
-
-
-
-time_zero =  94880
-time_final = 94880 + 3600 * 3
-time_step = 1
-time_max = 10
-
-
-
-if incon == 'ns': 
-    ns = toughio.read_output("/Users/matthijsnuus/Desktop/FS-C/model/coarse_model/natural_state/SAVE")
-    incon1 = ns.data
-
-mesh = toughio.read_mesh("/Users/matthijsnuus/Desktop/FS-C/model/coarse_model/coupled_model/mesh.f3grid")
-#mesh = toughio.read_mesh("/Users/matthijsnuus/Desktop/FS-C/model/mesh/FSC_coarse.msh")
-
-bot_BC_value = np.amax(incon1['X1'])
-top_BC_value = np.amin(incon1['X1'])
-
-
-if incon == 'ns':
-    incon = np.full((len(incon1['X1']), 4), -1.0e9)
-    incon[:, 0] = incon1['X1']
-    incon[:, 1] = incon1['X2']
-    incon[:, 2] = incon1['X3']
-    incon[:, 3] = incon1['X4']
-    mesh.add_cell_data("initial_condition", incon)
-
-
-materials = (mesh.materials )
-bcond = (materials == "BNDTO").astype(int) + (materials == "BNDBO").astype(int) 
-mesh.add_cell_data("boundary_condition", bcond)
-
-
-mesh.write_tough("/Users/matthijsnuus/Desktop/FS-C/model/coarse_model/injection_model/MESH", incon=True)
-mesh.write("/Users/matthijsnuus/Desktop/FS-C/model/coarse_model/injection_model/mesh.pickle")
-
-times_list1 = np.arange(time_zero, time_zero+30, 5)
-times_list2 = np.arange(time_zero + 31, time_final, 240)
-times_list = np.append(times_list1, times_list2)
-
-parameters = {
-    "title": "injection model",
-    "eos": "eco2n",
-    "isothermal": True,
-    "start": True,
-    "times": times_list, 
-}
-
-
-unique_materials = set((materials).tolist())
-
-
-
-#INITIAL CONDITIONS 
-ini_pore_pressure = 0.45e6#0.432e6 #Pa, 
-ini_NACL = 0.017203
-ini_gas_content = 0.0 #-, ...
-temperature = 16.5 #°C, (1)
 
-#CAPILLARY PRESSURE AND RELATIVE PERMEABILITY VARIABLES     
-pore_size_distr_index =0.5 #-, (2), symbol: λ
-S_lr = 0.01 #-, (2), total trapped water 
-S_ls = 1 #-, (2), liquid saturation  
-S_gr = 0.0 #-, Guess?, total trapped gas 
-P0 = 18e6 #1.47e7 #Pa, R.Senger
-Pmax = 1e12 #Pa, guessed from (2),
-
-#values from Antonio for ICP & IRP
-icp11 = [1.67, 1.8e7, 0, 0.0, 0.0, 0.0, 0.01]
-irp11 = [0.5, 0.0, 0]
-
-parameters["default"] = {
-    "density": 2500.,                     #kg/m3
-    "porosity": 0.12 ,                    #- 
-    "permeability": [5e-19,5e-19,5e-19], #m2  
-    "conductivity": 2.0,                  #W/m/K
-    "specific_heat": 920.,                #J/kg K
-    #"compressibility": 5e-9,             #Pa^-1
-    "expansivity": 1.4e-5,                #°C^-1
-    "conductivity_dry": 2.0,              #W/m/K
-
-    "initial_condition": [ini_pore_pressure,ini_NACL, ini_gas_content,temperature],
-    "relative_permeability": {
-        "id": 11, #Modified van genuchtn 
-        "parameters": irp11,
-    },
-    "capillarity": {
-        "id": 11, #Modified van genuchten 
-        "parameters": icp11,
-    },
-}
-
-#Rock parameters
-parameters["rocks"] = {
-    "CLAY": {
-        #"tortuosity": 0.8, #-, (4) 
-        #"initial_condition": [ini_pore_pressure,ini_gas_content,temperature],
-    },
-    "EDZ": {
-        "porosity": 0.95, #-, (4) 
-        "permeability": [1e-12, 1e-12, 1e-12],
-        "compressibility": 1e-8,
-    },
-    "FAULT": {
-        "porosity": 0.14,
-        "compressibility": 5e-9,             #Pa^-1
-        "permeability": [2e-18, 2e-18, 1e-12]
-        #"permeability": [6.5e-17,5e-17,5e-17]
-    },
-
-    "BNDTO": {"initial_condition": [top_BC_value, ini_NACL, ini_gas_content, temperature]},
-    "BNDBO": {"initial_condition": [bot_BC_value, ini_NACL, ini_gas_content, temperature]},
-
-}
-
-parameters["options"] = {
-    "n_iteration": 9,
-    "n_cycle": 9999,
-    "n_cycle_print": 9999,
-    "t_ini": time_zero,
-    "t_max": time_final,
-    "t_steps": time_step,
-    "t_step_max":  time_max,
-    
-    "t_reduce_factor": 8,
-    "eps1": 1.0e-8,
-    #"eps2": 100.0,
-    "gravity": 9.8,
-}
-
-
-
-parameters['extra_options'] = {
-        1: 1,
-        2: 2,
-        3: 1,
-        4: 1,
-        5: 5,
-        11: 2,   #0 or 2 
-        12: 2,
-        17: 9,
-        21: 8
-}
-
-
-
-
-rates2 = rates_csv.copy()
-#rates2.loc[rates2["TimeElapsed"] < 50000, "net flow cor [kg/s]"] = 0
-#rates2.loc[rates2["net flow cor [kg/s]"] >= 0.01, "net flow cor [kg/s]"] = 0.09
-
-
-parameters['generators'] = []
-rates = None  # Initialize rates
-times = None  # Initialize times
-
-
-rates = (rates2['net flow cor [kg/s]']  * 1).to_list()
-rates_co2 = (rates2['CO2 rate [kg/s]']  * 0).to_list()
-times = rates2['TimeElapsed'].to_list()
-
-
-
-injec_label = mesh.labels[-1][0:-1] + str(int(mesh.labels[-1][-1]) + 1)
-
-generator = {
-    "label": str(mesh.labels[mesh.near((0, 0, -0.05))]),
-    "type": "COM1",
-    "times": times,
-    "rates": np.array(rates),
-    "specific_enthalpy": list(np.zeros(len(times))),
-}
-parameters['generators'].append(generator)
-        
-
-parameters["output"] = {
-    "variables": [
-        {"name": "porosity"},
-        {"name": "pressure"},
-    ],
-}
-
-ref_points = [str(mesh.labels[mesh.near((0, 0, -0.05))])]
-ref_points.append(str(injec_label))
-ref_points.append(str(mesh.labels[mesh.near(( 9.55383428 , 5.01474972, -0.61983978))]))
-ref_points.append(str(mesh.labels[mesh.near((11.8685315,   9.058115  ,  2.72817964))]))
+Injection model of the coarse mesh (MESH, INCON, GENER and INFILE). Parameters
+are defined by coarse_injection_scenario in model_builder.py, only outputs whose
+inputs changed are rewritten.
+"""
 
+from model_builder import build, coarse_injection_scenario
 
-parameters["element_history"] = ref_points
 
-toughio.write_input("/Users/matthijsnuus/Desktop/FS-C/model/coarse_model/injection_model/INFILE", parameters)  
+compress = False #simplify rate table within mass_tol (cumulative mass) and rate_tol (peak rate)
+mass_tol = 1.0e-3
+rate_tol = 1.0e-2
 
 
+build(coarse_injection_scenario(compress=(mass_tol, rate_tol) if compress else None))
@@ -0,0 +1,388 @@
+"""
+Fast MESH writer with cached ELEME/CONNE geometry.
+
+Connection geometry (distances, areas, gravity cosines) is computed once by toughio and cached as NumPy columns. MESH files (e.g., with other boundary conditions) are then written in one buffered pass by a vectorized fixed-width formatter.
+"""
+
+import copy
+import hashlib
+import os
+import tempfile
+
+import numpy as np
+
+
+eleme_header = "ELEME----1----*----2----*----3----*----4----*----5----*----6----*----7----*----8\n"
+conne_header = "CONNE----1----*----2----*----3----*----4----*----5----*----6----*----7----*----8\n"
+
+# Volume factor and distance of boundary elements (as toughio)
+boundary_volume = 1.0e50
+boundary_distance = 1.0e-9
+
+
+def format_fixed(values, width=10):
+    """
+    Format floats as fixed-width fields with as many significant digits as possible.
+
+    Values are written in fixed-point notation when it fits, otherwise in scientific notation without exponent sign and leading zeros (e.g., '2.331645e1'). NaN values are written as blanks. Values are formatted in groups of the same precision, each with a single call to `str.format`.
+
+    Parameters
+    ----------
+    values : array_like
+        Values to format, shape (n,).
+    width : int, optional, default 10
+        Field width.
+
+    Returns
+    -------
+    array_like
+        Formatted fields as a character array of shape (n, width).
+
+    """
+    x = np.asarray(values, dtype=float).ravel()
+    out = np.full((len(x), width), b" ", dtype="S1")
+
+    finite = np.isfinite(x)
+    ax = np.abs(x)
+    sign = (x < 0.0).astype(int)
+    e = np.zeros(len(x), dtype=int)
+    nonzero = finite & (ax > 0.0)
+    e[nonzero] = np.floor(np.log10(ax[nonzero])).astype(int)
+    e[nonzero & (ax >= 10.0 ** (e + 1))] += 1
+    e[nonzero & (ax < 10.0 ** e)] -= 1
+
+    # Fixed-point decimals (for 1e-2 <= |x| < 10**(width - 2 - sign))
+    n_int = np.maximum(e + 1, 1)
+    decimals = width - sign - 1 - n_int
+    d = np.clip(decimals, 0, 15)
+    decimals[np.round(ax * 10.0 ** d) >= 10.0 ** (n_int + d)] -= 1
+    fixed = finite & ((ax == 0.0) | ((e >= -2) & (decimals >= 1)))
+
+    # Scientific mantissa and exponent
+    m = np.zeros(len(x))
+    m[nonzero] = x[nonzero] / 10.0 ** e[nonzero]
+    precision = width - sign - 3 - _exponent_len(e)
+    rounded = np.abs(np.round(m * 10.0 ** np.clip(precision, 0, 15))) >= 10.0 ** (np.clip(precision, 0, 15) + 1)
+    e[rounded] += 1
+    m[rounded] /= 10.0
+    precision = width - sign - 3 - _exponent_len(e)
+
+    groups = [
+        (fixed & (decimals == d), "{{:>{}.{}f}}".format(width, d), False)
+        for d in np.unique(decimals[fixed])
+    ]
+    groups += [
+        (finite & ~fixed & (precision == p), "{{:.{}f}}e{{:d}}".format(p), True)
+        for p in np.unique(precision[finite & ~fixed])
+    ]
+    for mask, fmt, scientific in groups:
+        idx = np.flatnonzero(mask)
+        args = np.column_stack((m[idx], e[idx])).ravel().tolist() if scientific else x[idx].tolist()
+        if scientific:
+            args[1::2] = [int(v) for v in args[1::2]]
+
+        s = (fmt * len(idx)).format(*args)
+        if len(s) == width * len(idx):
+            out[idx] = np.frombuffer(s.encode(), dtype="S1").reshape((len(idx), width))
+
+        else:
+            # Rounding carry not caught above
+            for i in idx:
+                out[i] = np.frombuffer(_format_value(x[i], width).encode(), dtype="S1")
+
+    return out
+
+
+def _exponent_len(e):
+    """Number of characters of integer exponents."""
+    ae = np.abs(e)
+
+    return (e < 0) + 1 + (ae >= 10) + (ae >= 100)
+
+
+def _format_value(value, width):
+    """Format a single value within width characters."""
+    for precision in range(width, -1, -1):
+        s = "{:.{}e}".format(value, precision)
+        mantissa, exponent = s.split("e")
+        s = "{}e{}".format(mantissa, int(exponent))
+        if len(s) <= width:
+            return "{:>{}}".format(s, width)
+
+    raise ValueError("value {} does not fit within {} characters.".format(value, width))
+
+
+def _format_str(values, width):
+    """Format strings as left-aligned fixed-width fields, shape (n, width)."""
+    values = np.char.ljust(np.asarray(values).astype("S{}".format(width)), width)
+
+    return values.view("S1").reshape((len(values), width))
+
+
+def _blank(n, width):
+    """Blank fields, shape (n, width)."""
+    return np.full((n, width), b" ", dtype="S1")
+
+
+def _parse_float(fields):
+    """Parse fixed-width float fields (blanks as NaN)."""
+    fields = np.char.strip(fields)
+
+    return np.where(fields == b"", b"nan", fields).astype(float)
+
+
+class MeshGeometry(object):
+    """
+    ELEME and CONNE arrays of a TOUGH mesh.
+
+    Parameters
+    ----------
+    labels : array_like
+        Element labels, shape (n_elements,).
+    materials : array_like
+        Element materials, shape (n_elements,).
+    volumes : array_like
+        Element volumes, shape (n_elements,).
+    centers : array_like
+        Element centers, shape (n_elements, 3).
+    connections : array_like
+        Element indices of each connection, shape (n_connections, 2).
+    isot : array_like
+        Permeability direction of each connection, shape (n_connections,).
+    distances : array_like
+        Distances from element centers to interface, shape (n_connections, 2).
+    areas : array_like
+        Interface areas, shape (n_connections,).
+    betax : array_like
+        Cosines of angle between gravity and connection lines, shape (n_connections,).
+
+    """
+
+    _arrays = ("labels", "materials", "volumes", "centers", "connections", "isot", "distances", "areas", "betax")
+
+    def __init__(self, labels, materials, volumes, centers, connections, isot, distances, areas, betax):
+        self.labels = np.asarray(labels).astype("S5")
+        self.materials = np.asarray(materials).astype("S5")
+        self.volumes = np.asarray(volumes, dtype=float)
+        self.centers = np.asarray(centers, dtype=float)
+        self.connections = np.asarray(connections, dtype=int)
+        self.isot = np.asarray(isot, dtype=int)
+        self.distances = np.asarray(distances, dtype=float)
+        self.areas = np.asarray(areas, dtype=float)
+        self.betax = np.asarray(betax, dtype=float)
+
+    @classmethod
+    def read(cls, filename):
+        """
+        Read geometry from a MESH file.
+
+        Volumes of boundary elements (multiplied by 1.0e50) are scaled back to actual volumes.
+
+        Parameters
+        ----------
+        filename : str
+            MESH file name.
+
+        Returns
+        -------
+        :class:`MeshGeometry`
+            Mesh geometry.
+
+        """
+        eleme, conne = [], []
+        block = None
+        with open(filename, "rb") as f:
+            for line in f:
+                line = line.rstrip(b"\r\n")
+                if line.startswith(b"ELEME"):
+                    block = eleme
+                elif line.startswith(b"CONNE"):
+                    block = conne
+                elif not line.strip() or line.startswith(b"+++"):
+                    block = None
+                elif block is not None:
+                    block.append(line.ljust(80)[:80])
+
+        eleme = np.array(eleme, dtype="S80").view("S1").reshape((-1, 80))
+        conne = np.array(conne, dtype="S80").view("S1").reshape((-1, 80))
+
+        def field(arr, start, stop):
+            return np.ascontiguousarray(arr[:, start:stop]).view("S{}".format(stop - start)).ravel()
+
+        labels = field(eleme, 0, 5)
+        order = np.argsort(labels)
+        connections = np.column_stack([
+            order[np.searchsorted(labels, field(conne, 0, 5), sorter=order)],
+            order[np.searchsorted(labels, field(conne, 5, 10), sorter=order)],
+        ])
+
+        volumes = _parse_float(field(eleme, 20, 30))
+        volumes = np.where(volumes >= 1.0e-3 * boundary_volume, volumes / boundary_volume, volumes)
+
+        return cls(
+            labels=labels,
+            materials=np.char.strip(field(eleme, 15, 20)),
+            volumes=volumes,
+            centers=np.column_stack([_parse_float(field(eleme, i, i + 10)) for i in (50, 60, 70)]),
+            connections=connections,
+            isot=_parse_float(field(conne, 25, 30)).astype(int),
+            distances=np.column_stack([_parse_float(field(conne, 30, 40)), _parse_float(field(conne, 40, 50))]),
+            areas=_parse_float(field(conne, 50, 60)),
+            betax=np.nan_to_num(_parse_float(field(conne, 60, 70))),
+        )
+
+    @classmethod
+    def from_mesh(cls, mesh):
+        """
+        Geometry of a toughio mesh (computed once by toughio, without boundary conditions).
+
+        Parameters
+        ----------
+        mesh : toughio.Mesh
+            Mesh.
+
+        Returns
+        -------
+        :class:`MeshGeometry`
+            Mesh geometry.
+
+        """
+        mesh = copy.deepcopy(mesh)
+        mesh.cell_data.pop("boundary_condition", None)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            filename = os.path.join(tmp, "MESH")
+            mesh.write_tough(filename)
+
+            return cls.read(filename)
+
+    @classmethod
+    def load(cls, filename):
+        """Load geometry from a NumPy archive."""
+        with np.load(filename) as data:
+            return cls(**{k: data[k] for k in cls._arrays})
+
+    def save(self, filename):
+        """Save geometry to a NumPy archive."""
+        tmp = "{}.tmp.npz".format(filename[:-4] if filename.endswith(".npz") else filename)
+        np.savez(tmp, **{k: getattr(self, k) for k in self._arrays})
+        os.replace(tmp, filename)
+
+    def write(self, filename, boundary_condition=None):
+        """
+        Write MESH file.
+
+        Elements with boundary conditions get their volume multiplied by 1.0e50 and a distance to interface of 1.0e-9 (as toughio).
+
+        Parameters
+        ----------
+        filename : str
+            Output file name.
+        boundary_condition : array_like or None, optional, default None
+            Boundary condition (0 or 1) of each element.
+
+        """
+        n, m = len(self.labels), len(self.connections)
+        volumes, distances = self.volumes, self.distances
+        if boundary_condition is not None:
+            bcond = np.asarray(boundary_condition).astype(bool)
+            volumes = np.where(bcond, volumes * boundary_volume, volumes)
+            distances = np.where(bcond[self.connections], boundary_distance, distances)
+
+        eleme = np.concatenate(
+            (
+                _format_str(self.labels, 5),
+                _blank(n, 10),
+                _format_str(self.materials, 5),
+                format_fixed(volumes),
+                _blank(n, 20),
+                format_fixed(self.centers[:, 0]),
+                format_fixed(self.centers[:, 1]),
+                format_fixed(self.centers[:, 2]),
+                np.full((n, 1), b"\n", dtype="S1"),
+            ),
+            axis=1,
+        )
+        conne = np.concatenate(
+            (
+                _format_str(self.labels[self.connections[:, 0]], 5),
+                _format_str(self.labels[self.connections[:, 1]], 5),
+                _blank(m, 15),
+                np.char.rjust(self.isot.astype("S5"), 5).view("S1").reshape((m, 5)),
+                format_fixed(distances[:, 0]),
+                format_fixed(distances[:, 1]),
+                format_fixed(self.areas),
+                format_fixed(self.betax),
+                _blank(m, 10),
+                np.full((m, 1), b"\n", dtype="S1"),
+            ),
+            axis=1,
+        )
+
+        with open(filename, "wb") as f:
+            f.write(eleme_header.encode())
+            f.write(eleme.tobytes())
+            f.write(b"\n")
+            f.write(conne_header.encode())
+            f.write(conne.tobytes())
+            f.write(b"\n")
+
+
+def geometry_key(mesh):
+    """
+    Hash key of the inputs of a mesh geometry.
+
+    Points, cells, labels and materials are hashed (boundary conditions are not part of the geometry, see :meth:`MeshGeometry.write`).
+
+    Parameters
+    ----------
+    mesh : toughio.Mesh
+        Mesh.
+
+    Returns
+    -------
+    str
+        SHA-1 hash of geometry inputs.
+
+    """
+    h = hashlib.sha1()
+    h.update(np.ascontiguousarray(mesh.points, dtype=float).tobytes())
+    for cell in mesh.cells:
+        h.update(str(cell.type).encode())
+        h.update(np.ascontiguousarray(cell.data, dtype=np.int64).tobytes())
+    for values in (mesh.labels, mesh.materials):
+        h.update("\n".join(np.asarray(values).astype(str).tolist()).encode())
+
+    return h.hexdigest()
+
+
+def cached_geometry(mesh, filename):
+    """
+    Mesh geometry cached in a NumPy archive, recomputed only if its inputs changed.
+
+    Parameters
+    ----------
+    mesh : toughio.Mesh
+        Mesh (with materials added).
+    filename : str
+        Cache file name (.npz). Use one cache file per script or model, as any other mesh replaces the cached geometry.
+
+    Returns
+    -------
+    :class:`MeshGeometry`
+        Mesh geometry.
+
+    """
+    key = geometry_key(mesh)
+    key_file = "{}.sha1".format(filename)
+    if os.path.isfile(filename) and os.path.isfile(key_file):
+        with open(key_file, "r") as f:
+            if f.read().strip() == key:
+                return MeshGeometry.load(filename)
+
+    geometry = MeshGeometry.from_mesh(mesh)
+    geometry.save(filename)
+    with open(key_file, "w") as f:
+        f.write(key)
+
+    return geometry
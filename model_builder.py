@@ -0,0 +1,1074 @@
+"""
+Cached build pipeline of TOUGH input files.
+
+A scenario (mesh, materials, boundary groups, initial conditions, injection rates and TOUGH parameters) is built in a few steps whose products (parsed mesh, connection geometry, boundary mask, INCON, rate table, injection cells) are cached on disk with a content hash of their inputs. Output files (MESH/INCON, GENER and INFILE) are only rewritten when the hash of their inputs changed, so that regenerating a stage after a parameter tweak only rewrites what changed.
+
+Scenarios of the injection and natural state models (fine and coarse meshes), of the simple injection model and of the HyMAR gas injection are defined at the bottom of this file, and built by thin wrapper scripts (infile_writer.py, natural_state.py, infile_writer_simpleINJEC.py, infile_coarse.py, coarse_model/natural_state/natural_state_coarse.py and hymar_gas_injection/hymar_gas_INFILE.py). The main scenarios can also be built at once:
+
+    python model_builder.py
+
+"""
+
+import hashlib
+import json
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+import toughio
+
+from gener_writer import compress_rates, rate_matrix, well_distribution, write_gener
+from mesh_writer import MeshGeometry
+
+
+def file_hash(filename):
+    """
+    Content hash of a file.
+
+    Parameters
+    ----------
+    filename : str
+        File name.
+
+    Returns
+    -------
+    str
+        SHA-1 hash of file content.
+
+    """
+    h = hashlib.sha1()
+    with open(filename, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+
+    return h.hexdigest()
+
+
+def _default(obj):
+    """JSON encoding of NumPy objects in hash keys."""
+    if isinstance(obj, np.ndarray):
+        return hashlib.sha1(np.ascontiguousarray(obj).tobytes()).hexdigest() + str(obj.shape)
+
+    if isinstance(obj, np.generic):
+        return obj.item()
+
+    raise TypeError("cannot hash object of type '{}'.".format(type(obj).__name__))
+
+
+def content_key(*parts):
+    """
+    Hash key of build inputs.
+
+    Parameters
+    ----------
+    parts : sequence
+        JSON serializable inputs (NumPy arrays are hashed).
+
+    Returns
+    -------
+    str
+        SHA-1 hash of inputs.
+
+    """
+    data = json.dumps(parts, sort_keys=True, default=_default)
+
+    return hashlib.sha1(data.encode()).hexdigest()
+
+
+class BuildCache(object):
+    """
+    On-disk cache of build products and record of written outputs.
+
+    The manifest records the hash key of each written output and the products it was built from. Products that are not referenced by any output of the manifest (nor used by the current build) are removed whenever the manifest is rewritten, so that the cache does not grow with every change of inputs.
+
+    Parameters
+    ----------
+    root : str
+        Cache directory.
+
+    """
+
+    def __init__(self, root):
+        self.root = root
+        if not os.path.isdir(root):
+            os.makedirs(root)
+
+        self._manifest_file = os.path.join(root, "manifest.json")
+        self.manifest = {}
+        if os.path.isfile(self._manifest_file):
+            with open(self._manifest_file, "r") as f:
+                self.manifest = json.load(f)
+
+        # Products used by this build
+        self._used = []
+
+    def product(self, name, key, build):
+        """
+        Get a cached product, build it if not found.
+
+        Parameters
+        ----------
+        name : str
+            Product name.
+        key : str
+            Hash key of product inputs.
+        build : callable
+            Function building the product (without argument).
+
+        Returns
+        -------
+        object
+            Product.
+
+        """
+        basename = "{}-{}.pickle".format(name, key)
+        filename = os.path.join(self.root, basename)
+        if basename not in self._used:
+            self._used.append(basename)
+
+        if os.path.isfile(filename):
+            with open(filename, "rb") as f:
+                return pickle.load(f)
+
+        out = build()
+        tmp = "{}.tmp".format(filename)
+        with open(tmp, "wb") as f:
+            pickle.dump(out, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, filename)
+        print("built {} ({})".format(name, key[:8]))
+
+        return out
+
+    def output(self, filenames, key, write):
+        """
+        Write output files only if their inputs changed.
+
+        Parameters
+        ----------
+        filenames : str or sequence of str
+            Output file names.
+        key : str
+            Hash key of output inputs.
+        write : callable
+            Function writing the output files (without argument).
+
+        Returns
+        -------
+        bool
+            `True` if the output files were written.
+
+        Note
+        ----
+        Output files are recorded as built from all the products used so far by the current build.
+
+        """
+        filenames = [filenames] if isinstance(filenames, str) else list(filenames)
+        if all(
+            self._key(filename) == key and os.path.isfile(filename)
+            for filename in filenames
+        ):
+            print("unchanged {}".format(", ".join(filenames)))
+
+            # Products may have changed without changing the output (e.g. a new mesh file with the same cells)
+            if any(self.manifest[os.path.abspath(filename)] != self._entry(key) for filename in filenames):
+                for filename in filenames:
+                    self.manifest[os.path.abspath(filename)] = self._entry(key)
+                self._save()
+
+            return False
+
+        write()
+        for filename in filenames:
+            self.manifest[os.path.abspath(filename)] = self._entry(key)
+        self._save()
+        print("wrote {}".format(", ".join(filenames)))
+
+        return True
+
+    def _entry(self, key):
+        """Manifest entry of an output file."""
+        return {"key": key, "products": list(self._used)}
+
+    def _key(self, filename):
+        """Hash key of an output file in manifest."""
+        entry = self.manifest.get(os.path.abspath(filename))
+
+        # Manifests written before products were recorded only store keys
+        return entry["key"] if isinstance(entry, dict) else entry
+
+    def _save(self):
+        """Write manifest and remove stale products."""
+        tmp = "{}.tmp".format(self._manifest_file)
+        with open(tmp, "w") as f:
+            json.dump(self.manifest, f, indent=2, sort_keys=True)
+        os.replace(tmp, self._manifest_file)
+
+        # Entries without product record are from older manifests, keep everything until rewritten
+        if not all(isinstance(entry, dict) for entry in self.manifest.values()):
+            return
+
+        referenced = set(self._used)
+        for entry in self.manifest.values():
+            referenced.update(entry["products"])
+
+        for basename in os.listdir(self.root):
+            if basename.endswith(".pickle") and basename not in referenced:
+                os.remove(os.path.join(self.root, basename))
+                print("removed stale {}".format(basename))
+
+
+def read_mesh(cache, filename, materials=None):
+    """
+    Parsed mesh with materials added.
+
+    Parameters
+    ----------
+    cache : :class:`BuildCache`
+        Build cache.
+    filename : str
+        Mesh file name.
+    materials : dict or None, optional, default None
+        Material IDs to name as {name: id}.
+
+    Returns
+    -------
+    toughio.Mesh
+        Mesh.
+    str
+        Hash key of mesh.
+
+    """
+    materials = materials or {}
+    key = content_key(file_hash(filename), materials)
+
+    def build():
+        mesh = toughio.read_mesh(filename)
+        for name, imat in materials.items():
+            mesh.add_material(name, imat)
+
+        return mesh
+
+    return cache.product("mesh", key, build), key
+
+
+def boundary_condition(cache, mesh, mesh_key, groups):
+    """
+    Boundary condition mask of mesh cells.
+
+    Parameters
+    ----------
+    cache : :class:`BuildCache`
+        Build cache.
+    mesh : toughio.Mesh
+        Mesh.
+    mesh_key : str
+        Hash key of mesh.
+    groups : sequence of str
+        Materials with fixed boundary conditions.
+
+    Returns
+    -------
+    array_like
+        Boundary condition (0 or 1) of each cell.
+    str
+        Hash key of boundary condition.
+
+    """
+    key = content_key(mesh_key, sorted(groups))
+
+    def build():
+        return np.isin(mesh.materials, list(groups)).astype(int)
+
+    return cache.product("bcond", key, build), key
+
+
+def initial_condition(cache, filename, overrides=()):
+    """
+    Initial conditions from a TOUGH SAVE file.
+
+    Parameters
+    ----------
+    cache : :class:`BuildCache`
+        Build cache.
+    filename : str
+        SAVE file name.
+    overrides : sequence of dict, optional, default ()
+        Overridden primary variables as {"where": (variable, value), "X1": new value, ...}.
+
+    Returns
+    -------
+    array_like
+        Primary variables of each cell, shape (n_cells, 4).
+    str
+        Hash key of initial conditions.
+
+    """
+    key = content_key(file_hash(filename), list(overrides))
+
+    def build():
+        data = toughio.read_output(filename).data
+        incon = np.full((len(data["X1"]), 4), -1.0e9)
+        for i in range(4):
+            incon[:, i] = data["X{}".format(i + 1)]
+
+        for override in overrides:
+            variable, value = override["where"]
+            mask = np.asarray(data[variable]) == value
+            for k, v in override.items():
+                if k != "where":
+                    incon[mask, int(k[1:]) - 1] = v
+
+        return incon
+
+    return cache.product("incon", key, build), key
+
+
+def rate_table(cache, filename, time, columns, compress=None, interpolation="step"):
+    """
+    Injection rate table.
+
+    Parameters
+    ----------
+    cache : :class:`BuildCache`
+        Build cache.
+    filename : str
+        Rates CSV file name.
+    time : str
+        Name of time column.
+    columns : dict
+        Rate column and scale factor of each source type as {type: (column, scale)}.
+    compress : tuple or None, optional, default None
+        Mass and rate tolerances of :func:`compress_rates`. If `None`, table is not compressed.
+    interpolation : str ('step' or 'linear'), optional, default 'step'
+        Interpolation of rates by TOUGH ('linear' if MOP(12) = 0, 'step' otherwise), see :func:`compress_rates`.
+
+    Returns
+    -------
+    dict
+        Rate table with keys 'times', 'rates' ({type: rates}) and 'errors'.
+    str
+        Hash key of rate table.
+
+    """
+    key = content_key(file_hash(filename), time, columns, compress, interpolation)
+
+    def build():
+        df = pd.read_csv(filename)
+        df[time] = pd.to_numeric(df[time], errors="coerce")
+        for column, _ in columns.values():
+            df[column] = pd.to_numeric(df[column], errors="coerce")
+        df = df.dropna(subset=[time] + [column for column, _ in columns.values()])
+        df = df.sort_values(time)
+
+        times = df[time].to_numpy()
+        rates = np.column_stack([df[column].to_numpy() * scale for column, scale in columns.values()])
+        errors = None
+        if compress is not None:
+            n = len(times)
+            times, rates, errors = compress_rates(times, rates, *compress, interpolation=interpolation)
+            print("rate table: {} -> {} points (cumulative mass error {:.2e}, rate error {:.2e})".format(n, len(times), errors["mass"], errors["rate"]))
+
+        return {
+            "times": times,
+            "rates": {k: rates[:, i] for i, k in enumerate(columns)},
+            "errors": errors,
+        }
+
+    return cache.product("rates", key, build), key
+
+
+def injection_cells(cache, mesh, mesh_key, material=None, point=None, distribution="volume"):
+    """
+    Injection cells and fraction of well rate of each cell.
+
+    Parameters
+    ----------
+    cache : :class:`BuildCache`
+        Build cache.
+    mesh : toughio.Mesh
+        Mesh.
+    mesh_key : str
+        Hash key of mesh.
+    material : str or None, optional, default None
+        Material of injection cells.
+    point : array_like or None, optional, default None
+        Injection point (single cell nearest to point), if material is `None`.
+    distribution : str ('volume' or 'uniform'), optional, default 'volume'
+        Distribution of well rate among cells.
+
+    Returns
+    -------
+    dict
+        Injection cells with keys 'labels' and 'fractions'.
+    str
+        Hash key of injection cells.
+
+    """
+    if (material is None) == (point is None):
+        raise ValueError("exactly one of material or point must be provided.")
+
+    key = content_key(mesh_key, material, point, distribution)
+
+    def build():
+        if material is not None:
+            idx = np.flatnonzero(np.asarray(mesh.materials) == material)
+        else:
+            idx = np.atleast_1d(mesh.near(tuple(point)))
+
+        return {
+            "labels": [str(mesh.labels[i]) for i in idx],
+            "fractions": well_distribution(np.asarray(mesh.volumes)[idx], distribution),
+        }
+
+    return cache.product("injection", key, build), key
+
+
+def build(scenario, cache_dir=".build_cache"):
+    """
+    Build TOUGH input files of a scenario.
+
+    Parameters
+    ----------
+    scenario : dict
+        Scenario configuration with keys:
+
+         - 'outdir': output directory
+         - 'mesh': mesh file name
+         - 'materials' (optional): material IDs to name as {name: id}
+         - 'boundary' (optional): materials with fixed boundary conditions
+         - 'incon' (optional): initial conditions as {"path": SAVE file, "overrides": [...]}
+         - 'rates' (optional): rate table as {"path", "time", "columns", "compress", "interpolation"}
+         - 'injection' (optional): injection cells as {"material" or "point", "distribution"}
+         - 'parameters': function returning TOUGH parameters (without generators) from built products
+         - 'mesh_pickle' (optional, default True): also write 'mesh.pickle'
+
+    cache_dir : str, optional, default '.build_cache'
+        Cache directory.
+
+    Returns
+    -------
+    dict
+        Built products.
+
+    """
+    cache = BuildCache(cache_dir)
+    outdir = scenario["outdir"]
+    if not os.path.isdir(outdir):
+        os.makedirs(outdir)
+
+    products = {}
+    mesh, mesh_key = read_mesh(cache, scenario["mesh"], scenario.get("materials"))
+    products["mesh"] = mesh
+
+    bcond, bcond_key = boundary_condition(cache, mesh, mesh_key, scenario.get("boundary", ()))
+    products["boundary_condition"] = bcond
+
+    incon, incon_key = None, None
+    if scenario.get("incon"):
+        incon, incon_key = initial_condition(cache, scenario["incon"]["path"], scenario["incon"].get("overrides", ()))
+    products["incon"] = incon
+
+    # Connection geometry (computed once by toughio per mesh)
+    geometry = cache.product("geometry", mesh_key, lambda: MeshGeometry.from_mesh(mesh))
+
+    # MESH (and INCON)
+    filenames = [os.path.join(outdir, "MESH")]
+    if incon is not None:
+        filenames.append(os.path.join(outdir, "INCON"))
+    if scenario.get("mesh_pickle", True):
+        filenames.append(os.path.join(outdir, "mesh.pickle"))
+
+    def write_mesh():
+        mesh.add_cell_data("boundary_condition", bcond)
+        geometry.write(filenames[0], boundary_condition=bcond)
+        if incon is not None:
+            mesh.add_cell_data("initial_condition", incon)
+            mesh.write_incon(filenames[1])
+        if scenario.get("mesh_pickle", True):
+            mesh.write(filenames[-1])
+
+    cache.output(filenames, content_key("mesh", mesh_key, bcond_key, incon_key), write_mesh)
+
+    # GENER
+    if scenario.get("rates") and scenario.get("injection"):
+        config = scenario["rates"]
+        table, table_key = rate_table(
+            cache,
+            config["path"],
+            config["time"],
+            config["columns"],
+            config.get("compress"),
+            config.get("interpolation", "step"),
+        )
+        cells, cells_key = injection_cells(cache, mesh, mesh_key, **scenario["injection"])
+        products["rates"] = table
+        products["injection"] = cells
+
+        def write_rates():
+            sources = {k: rate_matrix(cells["fractions"], v) for k, v in table["rates"].items()}
+            write_gener(os.path.join(outdir, "GENER"), cells["labels"], table["times"], sources, shared=True)
+
+        cache.output(os.path.join(outdir, "GENER"), content_key("gener", table_key, cells_key), write_rates)
+
+    # INFILE
+    parameters = scenario["parameters"](products)
+    cache.output(
+        os.path.join(outdir, "INFILE"),
+        content_key("infile", parameters),
+        lambda: toughio.write_input(os.path.join(outdir, "INFILE"), parameters),
+    )
+
+    return products
+
+
+# Time windows of injection stages (time_zero, time_final, time_step, time_max)
+stages = {
+    0: (94878, 94978 + 3600 * 5, 1, 10),
+    2: (47580, 123574.7 + 20, 1, 60),
+    3: (123574.7 + 20, 142626.4, 0.5, 10),
+    4: (142626.4, None, 1, 60),
+    11: (94878, 94933.0, 0.8, 1.3),
+}
+
+# Time windows of hydraulic test stages
+hydr_test_stages = {
+    0: (23620, 23620 + 55 * 60, 0.5, 5),
+}
+
+# TOUGH MOP options of all scenarios
+extra_options = {1: 1, 2: 2, 3: 1, 4: 1, 5: 5, 11: 2, 12: 2, 17: 9, 21: 8}
+
+
+def injection_scenario(stage, hydr_test=False, distribution="volume", compress=None):
+    """
+    Injection model scenario (built by infile_writer.py).
+
+    Parameters
+    ----------
+    stage : int
+        Injection stage (see `stages` and `hydr_test_stages`), also the index of the SAVE file of initial conditions.
+    hydr_test : bool, optional, default False
+        If `True`, use the time window of the hydraulic test of the stage.
+    distribution : str ('volume' or 'uniform'), optional, default 'volume'
+        Distribution of injection rate among INJEC cells.
+    compress : tuple or None, optional, default None
+        Mass and rate tolerances of rate table compression.
+
+    Returns
+    -------
+    dict
+        Scenario configuration.
+
+    """
+    windows = hydr_test_stages if hydr_test else stages
+    if stage not in windows:
+        raise ValueError("unknown {}stage {}.".format("hydraulic test " if hydr_test else "", stage))
+
+    model = "/Users/matthijsnuus/Desktop/FS-C/model"
+
+    def parameters(products):
+        incon = products["incon"]
+        mesh = products["mesh"]
+        time_zero, time_final, time_step, time_max = windows[stage]
+        if time_final is None:
+            time_final = float(products["rates"]["times"][-1])
+
+        ini_NACL = 0.017203
+        ini_gas_content = 0.0
+        temperature = 16.5
+
+        ref_points = products["injection"]["labels"][::40]
+        ref_points.append(str(mesh.labels[mesh.near((7.434, 8.137, -0.900))]))
+        ref_points.append(str(mesh.labels[mesh.near((1.904, 5.158, 7.779))]))
+
+        return {
+            "title": "injection model",
+            "eos": "eco2n",
+            "isothermal": True,
+            "start": True,
+            "default": {
+                "density": 2500.,
+                "porosity": 0.12,
+                "permeability": [3e-18, 3e-18, 3e-18],
+                "conductivity": 2.0,
+                "specific_heat": 920.,
+                "compressibility": 5e-9,
+                "expansivity": 1.4e-5,
+                "conductivity_dry": 2.0,
+                "initial_condition": [0.45e6, ini_NACL, ini_gas_content, temperature],
+                "relative_permeability": {"id": 11, "parameters": [0.5, 0.0, 0]},
+                "capillarity": {"id": 11, "parameters": [1.67, 1.8e7, 0, 0.0, 0.0, 0.0, 0.01]},
+            },
+            "rocks": {
+                "CLAY": {},
+                "EDZ": {"porosity": 0.14, "permeability": [1e-14, 1e-14, 1e-14]},
+                "FAULT": {"porosity": 0.14, "permeability": [2e-14, 2e-14, 2e-14]},
+                "BNDTO": {"initial_condition": [float(incon[:, 0].min()), ini_NACL, ini_gas_content, temperature]},
+                "BNDBO": {"initial_condition": [float(incon[:, 0].max()), ini_NACL, ini_gas_content, temperature]},
+            },
+            "options": {
+                "n_iteration": 9,
+                "n_cycle": 9999,
+                "n_cycle_print": 9999,
+                "t_ini": time_zero,
+                "t_max": time_final,
+                "t_steps": time_step,
+                "t_step_max": time_max,
+                "t_reduce_factor": 8,
+                "eps1": 1.0e-8,
+                "gravity": 9.8,
+            },
+            "extra_options": dict(extra_options),
+            "element_history": ref_points,
+        }
+
+    return {
+        "outdir": "{}/injection_model".format(model),
+        "mesh": "{}/coupled_model/mesh.f3grid".format(model),
+        "materials": {"EDZ": 1, "CLAY": 2, "FAULT": 3, "BNDTO": 4, "BNDBO": 5},
+        "boundary": ["BNDTO", "BNDBO"],
+        "incon": {"path": "{}/incons/SAVE{}".format(model, stage)},
+        "rates": {
+            "path": "{}/injection_rates/filtered_FSC_injecrates.csv".format(model),
+            "time": "TimeElapsed",
+            "columns": {"COM1": ("net flow cor [kg/s]", 1.0), "COM3": ("CO2 rate [kg/s]", 1.0)},
+            "compress": compress,
+            "interpolation": "linear" if extra_options[12] == 0 else "step",
+        },
+        "injection": {"material": "INJEC", "distribution": distribution},
+        "parameters": parameters,
+    }
+
+
+def natural_state_scenario(coarse=False):
+    """
+    Natural state scenario (built by natural_state.py and coarse_model/natural_state/natural_state_coarse.py).
+
+    Parameters
+    ----------
+    coarse : bool, optional, default False
+        If `True`, natural state of the coarse model.
+
+    Returns
+    -------
+    dict
+        Scenario configuration.
+
+    """
+    model = "/Users/matthijsnuus/Desktop/FS-C/model"
+    if coarse:
+        model = "{}/coarse_model".format(model)
+
+    def parameters(products):
+        z = products["mesh"].centers[:, 2]
+        p0 = 0.5e6
+        time_zero, time_final = 0, 3600 * 24 * 365 * 50
+
+        ini_NACL = 0
+        ini_gas_content = 0.0
+        temperature = 16.5
+        top_BC_value = p0 - 1000 * 9.81 * float(z.max())
+        bot_BC_value = p0 + 1000 * 9.81 * abs(float(z.min()))
+
+        if coarse:
+            rocks = {
+                "CLAY": {"porosity": 0.12},
+                "FAULT": {"porosity": 0.14},
+                "EDZ": {"porosity": 0.95},
+            }
+        else:
+            rocks = {
+                "CLAY": {"porosity": 0.12},
+                "BFSB1": {"porosity": 0.5},
+                "FAULT": {"porosity": 0.14},
+                "EDZ": {"porosity": 0.14},
+            }
+        rocks["BNDTO"] = {"initial_condition": [top_BC_value, ini_NACL, ini_gas_content, temperature]}
+        rocks["BNDBO"] = {"initial_condition": [bot_BC_value, ini_NACL, ini_gas_content, temperature]}
+
+        return {
+            "title": "natural state",
+            "eos": "eco2n",
+            "isothermal": True,
+            "start": True,
+            "times": list(np.linspace(time_zero, time_final, 20)),
+            "default": {
+                "density": 2500.,
+                "porosity": 0.14,
+                "permeability": [1e-11, 1e-11, 1e-11],
+                "conductivity": 2.0,
+                "specific_heat": 920.,
+                "compressibility": 1e-99,
+                "expansivity": 1.4e-5,
+                "conductivity_dry": 2.0,
+                "initial_condition": [0.1e6, ini_NACL, ini_gas_content, temperature],
+                "relative_permeability": {"id": 11, "parameters": [0.5, 0.0, 0]},
+                "capillarity": {"id": 11, "parameters": [1.67, 1.5e7, 0, 0.0, 0.0, 0.0, 0.01]},
+            },
+            "rocks": rocks,
+            "options": {
+                "n_cycle": 9999,
+                "n_cycle_print": 9999,
+                "t_ini": time_zero,
+                "t_max": time_final,
+                "t_steps": 1 * 3600,
+                "t_step_max": 2 * 24 * 3600,
+                "t_reduce_factor": 4,
+                "eps1": 1.0e-7,
+                "gravity": 9.8,
+            },
+            "extra_options": dict(extra_options),
+            "elements": {},
+        }
+
+    return {
+        "outdir": "{}/natural_state".format(model),
+        "mesh": "{}/coupled_model/mesh.f3grid".format(model),
+        "boundary": ["BNDTO"],
+        "parameters": parameters,
+    }
+
+
+# Time windows of injection stages of the simple injection model
+simple_stages = {
+    0: (94858.0, 100000, 2, 10),
+    2: (47580, 123574.7 + 20, 1, 60),
+    3: (123574.7 + 20, 142626.4, 0.5, 10),
+    4: (142626.4, None, 1, 60),
+    11: (94878, 100000, 0.8, 1.3),
+}
+
+
+def simple_injection_scenario(stage, hydr_test=False, distribution="volume", compress=None):
+    """
+    Simple injection model scenario (built by infile_writer_simpleINJEC.py).
+
+    Injection is distributed among EDZ cells, BFSB1 cells are fixed at 0.38 MPa and initial conditions are read from the natural state.
+
+    Parameters
+    ----------
+    stage : int
+        Injection stage (see `simple_stages` and `hydr_test_stages`).
+    hydr_test : bool, optional, default False
+        If `True`, use the time window of the hydraulic test of the stage.
+    distribution : str ('volume' or 'uniform'), optional, default 'volume'
+        Distribution of injection rate among EDZ cells.
+    compress : tuple or None, optional, default None
+        Mass and rate tolerances of rate table compression.
+
+    Returns
+    -------
+    dict
+        Scenario configuration.
+
+    """
+    windows = hydr_test_stages if hydr_test else simple_stages
+    if stage not in windows:
+        raise ValueError("unknown {}stage {}.".format("hydraulic test " if hydr_test else "", stage))
+
+    model = "/Users/matthijsnuus/Desktop/FS-C/model"
+    BFSB1_value = 0.38e6
+
+    def parameters(products):
+        incon = products["incon"]
+        mesh = products["mesh"]
+        materials = np.asarray(mesh.materials)
+        time_zero, time_final, time_step, time_max = windows[stage]
+        if time_final is None:
+            time_final = float(products["rates"]["times"][-1])
+
+        ini_NACL = 0.017203
+        ini_gas_content = 0.0
+        temperature = 16.5
+
+        # Boundary values of the natural state (BFSB1 cells are overridden)
+        top_BC_value = float(incon[materials == "BNDTO", 0].min())
+        bot_BC_value = float(incon[materials == "BNDBO", 0].max())
+
+        injec_labels = products["injection"]["labels"]
+        ref_points = [str(mesh.labels[mesh.near((0, 0, -0.05))])]
+        ref_points.append(injec_labels[0])
+        ref_points.append(str(mesh.labels[mesh.near((7.669, 8.135, 1.860))]))
+        ref_points.append(str(mesh.labels[mesh.near((10.288, 4.482, -4.541))]))
+
+        return {
+            "title": "injection model",
+            "eos": "eco2n",
+            "isothermal": True,
+            "start": True,
+            "times": np.linspace(time_zero, time_final - 10, 20),
+            "default": {
+                "density": 2500.,
+                "porosity": 0.12,
+                "permeability": [5e-19, 5e-19, 1e-19],
+                "conductivity": 2.0,
+                "specific_heat": 920.,
+                "expansivity": 1.4e-5,
+                "conductivity_dry": 2.0,
+                "initial_condition": [0.45e6, ini_NACL, ini_gas_content, temperature],
+                "relative_permeability": {"id": 11, "parameters": [0.5, 0.0, 0]},
+                "capillarity": {"id": 11, "parameters": [1.67, 1.8e7, 0, 0.0, 0.0, 0.0, 0.01]},
+            },
+            "rocks": {
+                "CLAY": {},
+                "BFSB1": {"porosity": 0.5, "initial_condition": [BFSB1_value, ini_NACL, ini_gas_content, temperature]},
+                "EDZ": {"porosity": 0.96, "permeability": [1e-13, 1e-13, 1e-13], "compressibility": 18e-7},
+                "FAULT": {"porosity": 0.14, "permeability": [5e-17, 5e-17, 5e-17]},
+                "BNDTO": {"initial_condition": [top_BC_value, ini_NACL, ini_gas_content, temperature]},
+                "BNDBO": {"initial_condition": [bot_BC_value, ini_NACL, ini_gas_content, temperature]},
+            },
+            "options": {
+                "n_iteration": 9,
+                "n_cycle": 9999,
+                "n_cycle_print": 9999,
+                "t_ini": time_zero,
+                "t_max": time_final,
+                "t_steps": time_step,
+                "t_step_max": time_max,
+                "t_reduce_factor": 8,
+                "eps1": 1.0e-8,
+                "gravity": 9.8,
+            },
+            "extra_options": dict(extra_options),
+            "output": {"variables": [{"name": "absolute", "options": 0}, {"name": "coordinate"}]},
+            "element_history": ref_points,
+        }
+
+    return {
+        "outdir": "{}/injection_model".format(model),
+        "mesh": "{}/coupled_model/mesh.f3grid".format(model),
+        "boundary": ["BNDTO", "BNDBO", "BFSB1"],
+        "incon": {
+            "path": "{}/natural_state/SAVE".format(model),
+            "overrides": [{"where": ("porosity", 0.5), "X1": BFSB1_value}],
+        },
+        "rates": {
+            "path": "{}/injection_rates/filtered_FSC_injecrates.csv".format(model),
+            "time": "TimeElapsed",
+            "columns": {"COM1": ("net flow cor [kg/s]", 1.0), "COM3": ("CO2 rate [kg/s]", 1.0)},
+            "compress": compress,
+            "interpolation": "linear" if extra_options[12] == 0 else "step",
+        },
+        "injection": {"material": "EDZ", "distribution": distribution},
+        "parameters": parameters,
+    }
+
+
+def coarse_injection_scenario(compress=None):
+    """
+    Injection scenario of the coarse model (built by infile_coarse.py).
+
+    Parameters
+    ----------
+    compress : tuple or None, optional, default None
+        Mass and rate tolerances of rate table compression.
+
+    Returns
+    -------
+    dict
+        Scenario configuration.
+
+    """
+    model = "/Users/matthijsnuus/Desktop/FS-C/model"
+    time_zero = 94880
+    time_final = 94880 + 3600 * 3
+
+    def parameters(products):
+        incon = products["incon"]
+        mesh = products["mesh"]
+
+        ini_NACL = 0.017203
+        ini_gas_content = 0.0
+        temperature = 16.5
+
+        last = str(mesh.labels[-1])
+        ref_points = [products["injection"]["labels"][0]]
+        ref_points.append(last[:-1] + str(int(last[-1]) + 1))
+        ref_points.append(str(mesh.labels[mesh.near((9.55383428, 5.01474972, -0.61983978))]))
+        ref_points.append(str(mesh.labels[mesh.near((11.8685315, 9.058115, 2.72817964))]))
+
+        return {
+            "title": "injection model",
+            "eos": "eco2n",
+            "isothermal": True,
+            "start": True,
+            "times": np.append(np.arange(time_zero, time_zero + 30, 5), np.arange(time_zero + 31, time_final, 240)),
+            "default": {
+                "density": 2500.,
+                "porosity": 0.12,
+                "permeability": [5e-19, 5e-19, 5e-19],
+                "conductivity": 2.0,
+                "specific_heat": 920.,
+                "expansivity": 1.4e-5,
+                "conductivity_dry": 2.0,
+                "initial_condition": [0.45e6, ini_NACL, ini_gas_content, temperature],
+                "relative_permeability": {"id": 11, "parameters": [0.5, 0.0, 0]},
+                "capillarity": {"id": 11, "parameters": [1.67, 1.8e7, 0, 0.0, 0.0, 0.0, 0.01]},
+            },
+            "rocks": {
+                "CLAY": {},
+                "EDZ": {"porosity": 0.95, "permeability": [1e-12, 1e-12, 1e-12], "compressibility": 1e-8},
+                "FAULT": {"porosity": 0.14, "compressibility": 5e-9, "permeability": [2e-18, 2e-18, 1e-12]},
+                "BNDTO": {"initial_condition": [float(incon[:, 0].min()), ini_NACL, ini_gas_content, temperature]},
+                "BNDBO": {"initial_condition": [float(incon[:, 0].max()), ini_NACL, ini_gas_content, temperature]},
+            },
+            "options": {
+                "n_iteration": 9,
+                "n_cycle": 9999,
+                "n_cycle_print": 9999,
+                "t_ini": time_zero,
+                "t_max": time_final,
+                "t_steps": 1,
+                "t_step_max": 10,
+                "t_reduce_factor": 8,
+                "eps1": 1.0e-8,
+                "gravity": 9.8,
+            },
+            "extra_options": dict(extra_options),
+            "output": {"variables": [{"name": "porosity"}, {"name": "pressure"}]},
+            "element_history": ref_points,
+        }
+
+    return {
+        "outdir": "{}/coarse_model/injection_model".format(model),
+        "mesh": "{}/coarse_model/coupled_model/mesh.f3grid".format(model),
+        "boundary": ["BNDTO", "BNDBO"],
+        "incon": {"path": "{}/coarse_model/natural_state/SAVE".format(model)},
+        "rates": {
+            "path": "{}/injection_rates/filtered_FSC_injecrates.csv".format(model),
+            "time": "TimeElapsed",
+            "columns": {"COM1": ("net flow cor [kg/s]", 1.0)},
+            "compress": compress,
+            "interpolation": "linear" if extra_options[12] == 0 else "step",
+        },
+        "injection": {"point": (0, 0, -0.05)},
+        "parameters": parameters,
+    }
+
+
+def hymar_gas_scenario(compress=None):
+    """
+    Gas injection scenario of the HyMAR test (built by hymar_gas_injection/hymar_gas_INFILE.py).
+
+    The simulation ends at the second last time of the rate table.
+
+    Parameters
+    ----------
+    compress : tuple or None, optional, default None
+        Mass and rate tolerances of rate table compression.
+
+    Returns
+    -------
+    dict
+        Scenario configuration.
+
+    """
+    model = "/Users/matthijsnuus/Desktop/FS-C/model/hymar_gas_injection"
+    options = dict(extra_options)
+    options[11] = 0
+
+    def parameters(products):
+        mesh = products["mesh"]
+        times = products["rates"]["times"]
+        time_zero, time_final = float(times[0]), float(times[-2])
+
+        injec_label = products["injection"]["labels"][0]
+        material = mesh.materials[list(mesh.labels).index(injec_label)]
+        if material != "PPINJ":
+            raise ValueError("injection cell '{}' is not in material 'PPINJ' (got '{}').".format(injec_label, material))
+
+        ini_pore_pressure = 2.1e6
+        ini_gas_content = 0.0
+        temperature = 19
+        back_BC = 2e6
+
+        # 10 internal points along the injection interval
+        z_vals = np.linspace(0.0, 0.074, 12)[1:-1]
+        ref_points = [str(mesh.labels[mesh.near((0, 0, float(z)))]) for z in z_vals]
+        ref_points.append(injec_label)
+
+        gravel = {"relative_permeability": {"id": 3, "parameters": [0, 1]}, "capillarity": {"id": 8, "parameters": []}}
+
+        return {
+            "title": "hymar gas",
+            "eos": "eos5",
+            "isothermal": True,
+            "start": True,
+            "times": np.linspace(time_zero, time_final - 10, 20),
+            "default": {
+                "density": 2500.,
+                "porosity": 0.12,
+                "permeability": [1e-20, 1e-20, 5e-20],
+                "conductivity": 2.0,
+                "specific_heat": 920.,
+                "expansivity": 1.4e-5,
+                "conductivity_dry": 2.0,
+                "initial_condition": [ini_pore_pressure, ini_gas_content, temperature],
+                "relative_permeability": {"id": 7, "parameters": [0.457, 0.05, 1, 0.05]},
+                "capillarity": {"id": 7, "parameters": [0.457, 0.05, 1e-7, 1e12, 1]},
+            },
+            "rocks": {
+                "PPINJ": {
+                    "density": 2500,
+                    "porosity": 0.98,
+                    "initial_condition": [ini_pore_pressure, 1, temperature],
+                    "permeability": [1e-17, 1e-17, 1e-17],
+                    "specific_heat": 920e20,  # constant temperature in injection well
+                    "relative_permeability": {"id": 3, "parameters": [1, 0]},
+                    "capillarity": {"id": 8, "parameters": []},
+                },
+                "PPOUT": {"porosity": 0.16},
+                "CLAY": {"porosity": 0.16},
+                "STEEL": {"porosity": 0.1},
+                "GRD_B": dict(gravel),
+                "GRD_T": dict(gravel),
+                "BUFFR": {"porosity": 0.14, "permeability": [1e-13, 1e-13, 1e-13]},
+                "PRESB": {
+                    "permeability": [1e-13, 1e-13, 1e-13],
+                    "initial_condition": [back_BC, ini_gas_content, temperature],
+                },
+            },
+            "options": {
+                "n_iteration": 9,
+                "n_cycle": -19,
+                "n_cycle_print": 9999,
+                "t_ini": time_zero,
+                "t_max": time_final,
+                "t_steps": 1500,
+                "t_step_max": 15000,
+                "t_reduce_factor": 8,
+                "eps1": 1.0e-8,
+                "gravity": 9.8,
+            },
+            "extra_options": options,
+            "output": {
+                "variables": [
+                    {"name": "absolute", "options": 0},
+                    {"name": "coordinate"},
+                    {"name": "pressure"},
+                    {"name": "saturation"},
+                ],
+            },
+            "element_history": ref_points,
+        }
+
+    return {
+        "outdir": "{}/2_TH".format(model),
+        "mesh": "{}/mesh.f3grid".format(model),
+        "boundary": ["PRESB"],
+        "rates": {
+            "path": "{}/tank_model/model_run/filtered_gasrate_from_conne.csv".format(model),
+            "time": "TimeElapsed",
+            "columns": {"COM2": ("GAS_INJEC", 1.0)},
+            "compress": compress,
+            "interpolation": "linear" if options[12] == 0 else "step",
+        },
+        "injection": {"point": (0, 0, 0)},
+        "parameters": parameters,
+    }
+
+
+if __name__ == "__main__":
+    build(natural_state_scenario())
+    build(injection_scenario(stage=0))
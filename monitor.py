@@ -0,0 +1,620 @@
+from __future__ import division
+
+import atexit
+import json
+import os
+from collections import deque
+
+import numpy
+
+from .permeability import (
+    _group_key,
+    _load_group_state,
+    _save_group_state,
+    snapshot,
+    updated_zones,
+    zone_group,
+)
+
+try:
+    from itasca import zonearray as za
+except ImportError:
+    pass
+
+
+__all__ = [
+    "ColumnWriter",
+    "GroupMonitor",
+    "PlaneMonitor",
+    "principal_stresses",
+    "read_columns",
+]
+
+
+# Index of steps stored in a column directory
+_index_dtype = numpy.dtype(
+    [("tstep", "<i8"), ("time", "<f8"), ("row", "<i8"), ("nrow", "<i8")]
+)
+
+
+class ColumnWriter(object):
+    """
+    Buffered columnar output of per-step zone arrays.
+
+    Rows of each coupling step are buffered in memory and flushed to one raw binary file per column (appended), along with an index of the rows of each step. Buffered rows are flushed every `flush_every` steps, when `chunk_size` rows are buffered, and at exit. Use :func:`read_columns` to read any range of steps.
+
+    Parameters
+    ----------
+    path : str
+        Output directory.
+    columns : dict
+        Data type of each column, e.g., `{"zone_id": "i8", "pp": "f8"}`.
+    chunk_size : int, optional, default 10000
+        Number of buffered rows that triggers a flush.
+    flush_every : int or None, optional, default 10
+        Flush cadence in steps. If `None`, only flush when `chunk_size` rows are buffered and at exit.
+    append : bool, optional, default True
+        If `True`, append to existing output in `path` (restarted runs). Rows not referenced by the index (interrupted flush) are discarded, as well as steps greater than or equal to the first appended step. If `False`, existing output in `path` is discarded.
+
+    """
+
+    def __init__(self, path, columns, chunk_size=10000, flush_every=10, append=True):
+        self.path = path
+        self.columns = {k: numpy.dtype(v).newbyteorder("<") for k, v in columns.items()}
+        self.chunk_size = chunk_size
+        self.flush_every = flush_every
+
+        if not os.path.isdir(path):
+            os.makedirs(path)
+
+        meta = os.path.join(path, "columns.json")
+        if append and os.path.isfile(meta):
+            with open(meta, "r") as f:
+                if json.load(f) != {k: v.str for k, v in self.columns.items()}:
+                    raise ValueError("columns do not match existing output in '{}'.".format(path))
+
+            self._index = _read_index(path)
+            self._truncate(self._index.size)
+
+        else:
+            with open(meta, "w") as f:
+                json.dump({k: v.str for k, v in self.columns.items()}, f)
+
+            for filename in ["steps.bin"] + ["{}.bin".format(k) for k in self.columns]:
+                open(os.path.join(path, filename), "wb").close()
+
+            self._index = None
+            self._nrow = 0
+
+        self._steps = []
+        self._buffer = {k: [] for k in self.columns}
+        self._nbuffer = 0
+
+        # Runs end without notice to the callbacks
+        atexit.register(self.flush)
+
+    def append(self, tstep, time, **columns):
+        """
+        Append the rows of a coupling step.
+
+        Parameters
+        ----------
+        tstep : int
+            Coupling time step.
+        time : scalar
+            Simulation time.
+        columns : dict
+            Array of each column (same length).
+
+        """
+        if set(columns) != set(self.columns):
+            raise ValueError("expected columns {}.".format(sorted(self.columns)))
+
+        # Restarted run: drop output of steps that are computed again
+        if self._index is not None:
+            self._truncate(numpy.searchsorted(self._index["tstep"], tstep, side="left"))
+            self._index = None
+
+        nrow = len(next(iter(columns.values())))
+        for k, v in columns.items():
+            v = numpy.asarray(v, dtype=self.columns[k])
+            if v.shape != (nrow,):
+                raise ValueError("column '{}' must be of shape ({},).".format(k, nrow))
+
+            self._buffer[k].append(v)
+
+        self._steps.append((tstep, time, self._nrow, nrow))
+        self._nrow += nrow
+        self._nbuffer += nrow
+
+        if self._nbuffer >= self.chunk_size or (
+            self.flush_every is not None and len(self._steps) >= self.flush_every
+        ):
+            self.flush()
+
+    def flush(self):
+        """Write buffered rows to disk."""
+        if not self._steps:
+            return
+
+        for k, v in self._buffer.items():
+            with open(os.path.join(self.path, "{}.bin".format(k)), "ab") as f:
+                numpy.concatenate(v).tofile(f)
+            v.clear()
+
+        # Index is written last so that readers never see rows that are not on disk
+        with open(os.path.join(self.path, "steps.bin"), "ab") as f:
+            numpy.array(self._steps, dtype=_index_dtype).tofile(f)
+
+        self._steps.clear()
+        self._nbuffer = 0
+
+    def _truncate(self, nstep):
+        """Truncate output on disk to its first nstep steps."""
+        index = self._index[:nstep]
+        self._nrow = int(index["nrow"].sum())
+
+        with open(os.path.join(self.path, "steps.bin"), "r+b") as f:
+            f.truncate(index.nbytes)
+
+        for k, dtype in self.columns.items():
+            with open(os.path.join(self.path, "{}.bin".format(k)), "r+b") as f:
+                f.truncate(self._nrow * dtype.itemsize)
+
+
+def _read_index(path):
+    """Read index of steps of a column directory."""
+    return numpy.fromfile(os.path.join(path, "steps.bin"), dtype=_index_dtype)
+
+
+def read_columns(path, start=None, stop=None, columns=None):
+    """
+    Read output of a :class:`ColumnWriter`.
+
+    Only the rows of the queried steps are read from disk.
+
+    Parameters
+    ----------
+    path : str
+        Output directory.
+    start : int or None, optional, default None
+        First coupling time step to read (first available if None).
+    stop : int or None, optional, default None
+        Last coupling time step to read (last available if None).
+    columns : sequence of str or None, optional, default None
+        Columns to read (all if None).
+
+    Returns
+    -------
+    dict
+        Array of each column, with additional columns 'tstep' and 'time' (repeated for every row).
+
+    """
+    with open(os.path.join(path, "columns.json"), "r") as f:
+        dtypes = {k: numpy.dtype(v) for k, v in json.load(f).items()}
+
+    columns = list(dtypes) if columns is None else list(columns)
+    index = _read_index(path)
+
+    mask = numpy.ones(index.size, dtype=bool)
+    if start is not None:
+        mask &= index["tstep"] >= start
+    if stop is not None:
+        mask &= index["tstep"] <= stop
+    index = index[mask]
+
+    # Steps are stored contiguously, read the row range spanning the selected steps
+    first = index["row"][0] if index.size else 0
+    count = int((index["row"][-1] + index["nrow"][-1] - first) if index.size else 0)
+    out = {}
+    for k in columns:
+        dtype = dtypes[k]
+        out[k] = numpy.fromfile(
+            os.path.join(path, "{}.bin".format(k)),
+            dtype=dtype,
+            count=count,
+            offset=int(first) * dtype.itemsize,
+        )
+
+    # Drop rows of unselected steps in between (if any)
+    rows = numpy.concatenate(
+        [numpy.arange(r, r + n) for r, n in zip(index["row"], index["nrow"])]
+        + [numpy.empty(0, dtype=int)]
+    ) - first
+    if rows.size != count:
+        out = {k: v[rows] for k, v in out.items()}
+
+    out["tstep"] = numpy.repeat(index["tstep"], index["nrow"])
+    out["time"] = numpy.repeat(index["time"], index["nrow"])
+
+    return out
+
+
+def principal_stresses(stress):
+    """
+    Principal stresses of symmetric stress tensors.
+
+    Closed-form (trigonometric) eigenvalues of symmetric 3x3 matrices, vectorized over zones.
+
+    Parameters
+    ----------
+    stress : array_like
+        Stress tensor array of shape (nzone, 3, 3).
+
+    Returns
+    -------
+    array_like
+        Principal stress array of shape (nzone, 3), in ascending order.
+
+    """
+    stress = numpy.asarray(stress, dtype=float)
+    s11, s22, s33 = stress[:, 0, 0], stress[:, 1, 1], stress[:, 2, 2]
+    s12, s23, s13 = stress[:, 0, 1], stress[:, 1, 2], stress[:, 0, 2]
+
+    # Mean stress and deviatoric magnitude
+    q = (s11 + s22 + s33) / 3.0
+    d11, d22, d33 = s11 - q, s22 - q, s33 - q
+    p = numpy.sqrt((d11**2 + d22**2 + d33**2 + 2.0 * (s12**2 + s23**2 + s13**2)) / 6.0)
+
+    # Half determinant of normalized deviatoric tensor (isotropic tensors have p = 0)
+    isotropic = p == 0.0
+    p_safe = numpy.where(isotropic, 1.0, p)
+    det = (
+        d11 * (d22 * d33 - s23 * s23)
+        - s12 * (s12 * d33 - s23 * s13)
+        + s13 * (s12 * s23 - d22 * s13)
+    )
+    r = numpy.where(isotropic, 0.0, 0.5 * det / p_safe**3)
+    phi = numpy.arccos(numpy.clip(r, -1.0, 1.0)) / 3.0
+
+    out = numpy.empty((stress.shape[0], 3))
+    out[:, 2] = q + 2.0 * p * numpy.cos(phi)
+    out[:, 0] = q + 2.0 * p * numpy.cos(phi + 2.0 * numpy.pi / 3.0)
+    out[:, 1] = 3.0 * q - out[:, 0] - out[:, 2]
+
+    return out
+
+
+class PlaneMonitor(object):
+    """
+    Tractions on planes of zone groups.
+
+    Stresses of all monitored zones are fetched once per call, and tractions on all planes are computed with a single batched product. Instances are callable and can directly be used as FLAC3D Python functions (after mechanical analysis).
+
+    Parameters
+    ----------
+    planes : sequence of tuple
+        Group name, normal vector and output sink of each monitored plane. Sink is a :class:`ColumnWriter` with columns :attr:`PlaneMonitor.columns`, or None.
+    friction : scalar, optional, default 0.6
+        Friction coefficient of the planes.
+    cohesion : scalar, optional, default 0.0
+        Cohesion of the planes (in Pa).
+    extra_index : dict or None, optional, default None
+        FLAC3D zone extra variable index where to store 'slip_tendency', 'dcfs' and/or 'distance_to_failure' of monitored zones, e.g., `{"slip_tendency": 41}`.
+    top_k : int, optional, default 10
+        Number of most critical zones per plane kept in :attr:`summaries` at every step.
+    window : int, optional, default 100
+        Number of steps kept in :attr:`summaries`.
+    init_file : str or None, optional, default None
+        NPZ file where normal and shear stresses of the first coupling step (reference of Coulomb failure stress change) are saved, and reloaded from when a run is restarted.
+    overwrite_init : bool, optional, default False
+        If `True`, reference stresses are recomputed at the first coupling step and overwrite those saved in init_file.
+
+    Note
+    ----
+    Effective normal stresses are positive in compression. Slip tendency is `ss / sn` (NaN for zones not in compression, which are never listed in :attr:`summaries`), Coulomb failure stress change is `dss - friction * dsn` relative to the first coupling step, and distance to failure is `cohesion + friction * sn - ss` (zone fails when negative).
+
+    Example
+    -------
+    >>> monitor = PlaneMonitor([
+    ...     ("FAULT", [0.50432, -0.645501, 0.573576], ColumnWriter("fault", PlaneMonitor.columns)),
+    ...     ("EDZ", [0.0, 0.0, 1.0], None),
+    ... ])
+    >>> python_func_flac = (monitor,)
+
+    """
+
+    columns = {
+        "zone_id": "i8",
+        "pp": "f8",
+        "sn": "f8",
+        "ss": "f8",
+        "s1": "f8",
+        "s2": "f8",
+        "s3": "f8",
+        "slip_tendency": "f8",
+        "dcfs": "f8",
+        "distance_to_failure": "f8",
+    }
+
+    def __init__(
+        self,
+        planes,
+        friction=0.6,
+        cohesion=0.0,
+        extra_index=None,
+        top_k=10,
+        window=100,
+        init_file=None,
+        overwrite_init=False,
+    ):
+        self.friction = friction
+        self.cohesion = cohesion
+        self.extra_index = dict(extra_index) if extra_index else {}
+        self.top_k = top_k
+        self.summaries = deque(maxlen=window)
+        self.init_file = init_file
+        self.overwrite_init = overwrite_init
+
+        for k in self.extra_index:
+            if k not in {"slip_tendency", "dcfs", "distance_to_failure"}:
+                raise ValueError("unknown extra variable '{}'.".format(k))
+        if len(set(self.extra_index.values())) != len(self.extra_index):
+            raise ValueError("extra variable indices must be distinct.")
+
+        self.planes = []
+        for group, normal, sink in planes:
+            normal = numpy.asarray(normal, dtype=float)
+            if normal.shape != (3,):
+                raise ValueError("normal vector must have 3 components.")
+
+            self.planes.append((group, normal, sink))
+
+        self.results = [None] * len(self.planes)
+        self.initial = [None] * len(self.planes)
+
+    def __call__(self, tough_time):
+        """Compute and output tractions on all planes."""
+        tought, tstep = tough_time
+        snap = snapshot()
+
+        # Shared fetch for the union of all monitored groups
+        masks = [snap.in_group(group) for group, _, _ in self.planes]
+        zones = zone_group(numpy.logical_or.reduce(masks))
+        pp = zones.pp()
+        stress = zones.stress_effective()
+        prin = principal_stresses(stress)
+
+        # One row per (plane, zone), with the normal vector of its plane
+        rows = [numpy.searchsorted(zones.index, numpy.flatnonzero(mask)) for mask in masks]
+        row = numpy.concatenate(rows)
+        normals = numpy.repeat(
+            [normal for _, normal, _ in self.planes], [r.size for r in rows], axis=0
+        )
+
+        # Traction, normal and shear stresses on all planes at once
+        traction = numpy.einsum("ijk,ik->ij", stress[row], normals)
+        sn = numpy.einsum("ij,ij->i", traction, normals)
+        ss = numpy.sqrt(numpy.maximum(numpy.einsum("ij,ij->i", traction, traction) - sn**2, 0.0))
+
+        # Reactivation indicators on all planes at once (slip tendency undefined if not in compression)
+        compression = sn > 0.0
+        slip_tendency = numpy.full_like(sn, numpy.nan)
+        slip_tendency[compression] = ss[compression] / sn[compression]
+        distance_to_failure = self.cohesion + self.friction * sn - ss
+
+        for i, ((_, normal, _), mask, sl) in enumerate(
+            zip(self.planes, masks, self._slices(rows))
+        ):
+            if self.initial[i] is None or (tstep == 1 and self.overwrite_init):
+                self.initial[i] = self._initial(tstep, mask, normal, sn[sl], ss[sl])
+        sn0 = numpy.concatenate([initial["sn"] for initial in self.initial])
+        ss0 = numpy.concatenate([initial["ss"] for initial in self.initial])
+        dcfs = (ss - ss0) - self.friction * (sn - sn0)
+
+        for i, ((group, _, sink), r, sl) in enumerate(
+            zip(self.planes, rows, self._slices(rows))
+        ):
+            result = {
+                "zone_id": zones.index[r],
+                "pp": pp[r],
+                "sn": sn[sl],
+                "ss": ss[sl],
+                "s1": prin[r, 2],
+                "s2": prin[r, 1],
+                "s3": prin[r, 0],
+                "slip_tendency": slip_tendency[sl],
+                "dcfs": dcfs[sl],
+                "distance_to_failure": distance_to_failure[sl],
+            }
+            self.results[i] = result
+            self.summaries.append(self._summary(tstep, tought, group, result))
+
+            if sink is not None:
+                sink.append(tstep, tought, **result)
+
+        # Store indicators as zone extra variables
+        indicators = {
+            "slip_tendency": slip_tendency,
+            "dcfs": dcfs,
+            "distance_to_failure": distance_to_failure,
+        }
+        for k, index in self.extra_index.items():
+            values = za.extra(index)
+            values[zones.index[row]] = indicators[k]
+            za.set_extra(index, values)
+            snap.clear(("extra", index))
+
+    def _initial(self, tstep, mask, normal, sn, ss):
+        """Reference normal and shear stresses of a plane (loaded from init_file in restarted runs)."""
+        size, packed = _group_key(mask)
+        key = size, packed + normal.tobytes()
+
+        state = (
+            _load_group_state(self.init_file, key, 2)
+            if self.init_file and not self.overwrite_init
+            else None
+        )
+
+        if state is None:
+            if tstep != 1 and self.init_file:
+                raise ValueError(
+                    "reference stresses of plane not found in '{}'.".format(self.init_file)
+                )
+
+            state = sn, ss
+            if self.init_file:
+                _save_group_state(self.init_file, {key: state})
+
+        return {"sn": state[0], "ss": state[1]}
+
+    def _slices(self, rows):
+        """Slices of the rows of each plane."""
+        stop = numpy.cumsum([r.size for r in rows])
+
+        return [slice(b - r.size, b) for r, b in zip(rows, stop)]
+
+    def _summary(self, tstep, time, group, result):
+        """Most critical zones of a plane (highest slip tendency and Coulomb failure stress change, lowest distance to failure)."""
+        summary = {"tstep": tstep, "time": time, "group": group}
+        for k, sign in (("slip_tendency", 1.0), ("dcfs", 1.0), ("distance_to_failure", -1.0)):
+            finite = numpy.flatnonzero(numpy.isfinite(result[k]))
+            values = sign * result[k][finite]
+            n = min(self.top_k, values.size)
+            idx = (
+                numpy.argpartition(values, values.size - n)[values.size - n:]
+                if n
+                else numpy.empty(0, dtype=int)
+            )
+            idx = finite[idx[numpy.argsort(values[idx])[::-1]]]
+            summary[k] = {"zone_id": result["zone_id"][idx], "value": result[k][idx]}
+
+        return summary
+
+
+class GroupMonitor(object):
+    """
+    Rolling statistics of permeability, pore pressure and failure of a zone group.
+
+    Statistics are computed with partial sorts only. One record per step is kept in memory (last `window` steps) and optionally written to a binary log, while statistics are only printed every `every` steps or when the fraction of failed zones crosses a threshold. Instances are callable and can directly be used as FLAC3D Python functions (after mechanical analysis).
+
+    Parameters
+    ----------
+    group : str
+        Zone group name.
+    joint : bool, optional, default True
+        If `True`, failure is read from joint plastic shear strains.
+    log : :class:`ColumnWriter` or None, optional, default None
+        Binary log with columns :attr:`GroupMonitor.columns`.
+    every : int or None, optional, default 10
+        Print statistics every N coupling steps (never if None).
+    failed_fraction : sequence of scalar, optional, default ()
+        Print statistics when the fraction of failed zones first exceeds each of these thresholds.
+    window : int, optional, default 100
+        Number of steps kept in :attr:`records`.
+
+    """
+
+    columns = {
+        "nzone": "i8",
+        "nfailed": "i8",
+        "nupdated": "i8",
+        "k_min": "f8",
+        "k_p50": "f8",
+        "k_p95": "f8",
+        "k_max": "f8",
+        "pp_min": "f8",
+        "pp_p50": "f8",
+        "pp_max": "f8",
+        "strain_shear_max": "f8",
+    }
+
+    def __init__(
+        self,
+        group,
+        joint=True,
+        log=None,
+        every=10,
+        failed_fraction=(),
+        window=100,
+    ):
+        self.group = group
+        self.joint = joint
+        self.log = log
+        self.every = every
+        self.failed_fraction = sorted(failed_fraction)
+        self.records = deque(maxlen=window)
+        self._crossed = 0
+
+    def __call__(self, tough_time):
+        """Compute, log and print statistics of current step."""
+        tought, tstep = tough_time
+        snap = snapshot()
+
+        group = snap.in_group(self.group)
+        zones = zone_group(group)
+        if not len(zones):
+            return
+
+        k = zones.permeability()[:, 0]
+        pp = zones.pp()
+        strain_shear, _ = zones.strain_plastic(self.joint)
+        nfailed = numpy.count_nonzero(strain_shear > 0.0)
+
+        k_p50, k_p95 = _percentiles(k, (50.0, 95.0))
+        (pp_p50,) = _percentiles(pp, (50.0,))
+        record = {
+            "nzone": len(zones),
+            "nfailed": nfailed,
+            "nupdated": updated_zones(group).size,
+            "k_min": k.min(),
+            "k_p50": k_p50,
+            "k_p95": k_p95,
+            "k_max": k.max(),
+            "pp_min": pp.min(),
+            "pp_p50": pp_p50,
+            "pp_max": pp.max(),
+            "strain_shear_max": strain_shear.max(),
+        }
+        self.records.append(dict(record, tstep=tstep, time=tought))
+
+        if self.log is not None:
+            self.log.append(tstep, tought, **{k: [v] for k, v in record.items()})
+
+        # Print at cadence, or when a new failed fraction threshold is crossed
+        fraction = nfailed / len(zones)
+        crossed = sum(fraction > threshold for threshold in self.failed_fraction)
+        if crossed > self._crossed or (self.every and (tstep - 1) % self.every == 0):
+            self._print(tstep, tought, record)
+        self._crossed = max(crossed, self._crossed)
+
+    def rolling(self):
+        """
+        Statistics over the steps kept in memory.
+
+        Returns
+        -------
+        dict
+            Minimum and maximum of each statistic over the last `window` steps.
+
+        """
+        out = {}
+        for k in self.columns:
+            values = numpy.array([record[k] for record in self.records])
+            out[k] = (values.min(), values.max()) if values.size else (None, None)
+
+        return out
+
+    def _print(self, tstep, time, record):
+        """Print statistics of a step."""
+        print("=== {} monitor tstep={} t={} ===".format(self.group, tstep, time))
+        print(
+            "k (min/p50/p95/max)   : {:.3e} {:.3e} {:.3e} {:.3e}".format(
+                record["k_min"], record["k_p50"], record["k_p95"], record["k_max"]
+            )
+        )
+        print(
+            "pp (min/p50/max)      : {:.3f} {:.3f} {:.3f} MPa".format(
+                record["pp_min"] * 1.0e-6, record["pp_p50"] * 1.0e-6, record["pp_max"] * 1.0e-6
+            )
+        )
+        print("failed zones          : {} / {}".format(record["nfailed"], record["nzone"]))
+        print("updated zones         : {} / {}".format(record["nupdated"], record["nzone"]))
+
+
+def _percentiles(x, q):
+    """Nearest-rank percentiles computed with a single partial sort."""
+    kth = [int(round(qq / 100.0 * (x.size - 1))) for qq in q]
+    part = numpy.partition(x, kth)
+
+    return [part[k] for k in kth]
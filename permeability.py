@@ -1,6 +1,8 @@
 from __future__ import division
 
-from functools import wraps
+import hashlib
+import os
+from functools import partial, wraps
 
 import numpy
 
@@ -13,9 +15,18 @@ try:
 except ImportError:
     pass
 
+try:
+    import numba
+except ImportError:
+    numba = None
+
 
 __all__ = [
+    "diagnostics",
     "permeability",
+    "PermeabilityRegistry",
+    "updated",
+    "updated_zones",
     "constant",
     "chin2000",
     "rutqvist2002",
@@ -25,11 +36,37 @@ __all__ = [
 ]
 
 
-def permeability(func):
-    """Decorate permeability model functions."""
+def permeability(func=None, static=False):
+    """
+    Decorate permeability model functions.
+
+    Parameters
+    ----------
+    func : callable
+        Permeability model function.
+    static : bool, optional, default False
+        If `True`, the model is time-invariant (its output only depends on its input parameters). Outputs are then cached per group and parameters, and returned without recomputation nor validation on subsequent calls.
+
+    """
+    if func is None:
+        return lambda func: permeability(func, static=static)
+
+    cache = {}
 
     @wraps(func)
     def decorator(group, k0, phi0, *args, **kwargs):
+        if static:
+            key = (
+                _group_key(numpy.asarray(group, dtype=bool)),
+                _param_key(k0),
+                _param_key(phi0),
+                tuple(_param_key(arg) for arg in args),
+                tuple((k, _param_key(v)) for k, v in sorted(kwargs.items())),
+            )
+            if key in cache:
+                _updated[key[0]] = numpy.empty(0, dtype=int)
+                return cache[key]
+
         # Number of zones in current group
         nzone = group.sum()
 
@@ -54,7 +91,9 @@ def permeability(func):
 
                 
                 raise ValueError()
-        if not (not isinstance(phi0, str) and numpy.ndim(phi0) == 0):
+        if isinstance(phi0, str) or not (
+            numpy.ndim(phi0) == 0 or numpy.shape(phi0) == (nzone,)
+        ):
             raise ValueError()
 
         # Reshape permeability as a (nzone, 3) array
@@ -66,19 +105,692 @@ def permeability(func):
             else k0
         )
 
-        # Update permeability and check outputs
+        # Permeability and porosity of previous groups may have been written back by run
+        snapshot().clear("permeability", "porosity")
+
+        # Update permeability and check outputs (incremental models overwrite updated zones)
+        _updated[_group_key(numpy.asarray(group, dtype=bool))] = zone_group(group).index
         k, phi = func(group, k0, phi0, *args, **kwargs)
         if not (isinstance(k, numpy.ndarray) and numpy.shape(k0) == (nzone, 3)):
             raise ValueError()
         if not (isinstance(phi, numpy.ndarray) and numpy.shape(phi) == (nzone,)):
             raise ValueError()
 
+        if static:
+            k.flags.writeable = False
+            phi.flags.writeable = False
+            cache[key] = k, phi
+
         return k, phi
 
+    decorator.static = static
+
     return decorator
 
 
-@permeability
+class PermeabilityRegistry(object):
+    """
+    Permeability models of zone groups.
+
+    Groups sharing the same model and model parameters (apart from `k0` and `phi0`) are evaluated together in a single vectorized call with per-zone `k0` and `phi0` arrays, once per coupling step. Per-zone arrays of a batch are only expanded when its groups change, and static batches (e.g., :func:`constant`) are only evaluated once.
+
+    Zones of overlapping groups get the permeability and porosity of the last registered group, as when each group is written in turn.
+
+    Example
+    -------
+    >>> registry = PermeabilityRegistry()
+    >>> registry.add("FAULT", rinaldi2019, k0=1.0e-17, phi0=0.14, n=1, w=2.4, ...)
+    >>> registry.add("BNDTO", constant, k0=1.0e-18, phi0=0.12)
+    >>> registry.add("BNDBO", constant, k0=1.0e-18, phi0=0.10)
+    >>> permeability_func = registry.permeability_func()
+
+    """
+
+    def __init__(self):
+        self._models = {}
+        self._results = {}
+        self._tstep = None
+        self._keys = {}
+        self._expanded = {}
+        self._static = {}
+
+    def __len__(self):
+        """Number of registered groups."""
+        return len(self._models)
+
+    def add(self, name, func, k0, phi0, **kwargs):
+        """
+        Register the permeability model of a zone group.
+
+        Parameters
+        ----------
+        name : str
+            Zone group name.
+        func : callable
+            Permeability model function (decorated with :func:`permeability`).
+        k0 : scalar or array_like
+            Stress-free permeability (scalar, 3 components or (nzone, 3)).
+        phi0 : scalar
+            Stress-free porosity.
+        kwargs : dict
+            Other parameters of the permeability model.
+
+        """
+        if name in self._models:
+            raise ValueError("group '{}' is already registered.".format(name))
+
+        self._models[name] = func, k0, phi0, kwargs
+        self._keys[name] = _param_key(k0), _param_key(phi0)
+
+    def batches(self):
+        """
+        Groups evaluated together.
+
+        Returns
+        -------
+        list of list of str
+            Group names of each batch.
+
+        """
+        batches = {}
+        for name, (func, _, _, kwargs) in self._models.items():
+            key = func, tuple((k, _param_key(v)) for k, v in sorted(kwargs.items()))
+            batches.setdefault(key, []).append(name)
+
+        return list(batches.values())
+
+    def permeability_func(self):
+        """
+        Permeability functions of all groups.
+
+        Returns
+        -------
+        dict
+            Permeability function of each group to pass to `run`.
+
+        """
+        return {name: partial(self._evaluate_group, name) for name in self._models}
+
+    def evaluate(self):
+        """
+        Evaluate all groups.
+
+        Returns
+        -------
+        array_like
+            Mask array of zones covered by the registered groups.
+        array_like
+            New permeability array of shape (nzone, 3) (in whole-model zone order, single write).
+        array_like
+            New porosity array of shape (nzone,) (in whole-model zone order, single write).
+
+        """
+        snap = snapshot()
+        mask = None
+        for name in self._models:
+            group = snap.in_group(name)
+            k, phi = self._evaluate_group(name, group)
+
+            if mask is None:
+                mask = numpy.zeros(group.size, dtype=bool)
+                kall = numpy.zeros((group.size, 3))
+                phiall = numpy.zeros(group.size)
+
+            mask |= group
+            kall[group] = k
+            phiall[group] = phi
+
+        return mask, kall, phiall
+
+    def _evaluate_group(self, name, group):
+        """Get permeability and porosity of a group (evaluates its batch once per step)."""
+        tstep = snapshot().tstep
+        if tstep != self._tstep:
+            self._results.clear()
+            self._tstep = tstep
+
+        if name not in self._results:
+            batch = next(batch for batch in self.batches() if name in batch)
+
+            if len(batch) == 1:
+                func, k0, phi0, kwargs = self._models[name]
+                self._results[name] = func(group, k0, phi0, **kwargs)
+
+            else:
+                self._results.update(self._evaluate_batch(batch, name, group))
+
+        return self._results[name]
+
+    def _evaluate_batch(self, names, name, group):
+        """Evaluate groups sharing the same model in a single call (with mask of queried group)."""
+        names = tuple(names)
+        snap = snapshot()
+        masks = [
+            numpy.asarray(group, dtype=bool) if n == name else snap.in_group(n)
+            for n in names
+        ]
+        keys = tuple(_group_key(mask) for mask in masks)
+        func, _, _, kwargs = self._models[names[0]]
+
+        # Per-zone stress-free permeability and porosity (expanded once per set of groups)
+        expansion_key = tuple((key,) + self._keys[n] for n, key in zip(names, keys))
+        if self._expanded.get(names, (None,))[0] != expansion_key:
+            union = numpy.logical_or.reduce(masks)
+            index = numpy.flatnonzero(union)
+            positions = [numpy.searchsorted(index, numpy.flatnonzero(mask)) for mask in masks]
+            k0 = numpy.empty((index.size, 3))
+            phi0 = numpy.empty(index.size)
+            for n, pos in zip(names, positions):
+                _, k0_, phi0_, _ = self._models[n]
+                k0[pos] = numpy.broadcast_to(k0_, (pos.size, 3))
+                phi0[pos] = phi0_
+
+            self._expanded[names] = expansion_key, (union, positions, k0, phi0)
+            self._static.pop(names, None)
+
+        union, positions, k0, phi0 = self._expanded[names][1]
+
+        if getattr(func, "static", False) and names in self._static:
+            # Time-invariant batch: nothing to send to TOUGH again
+            for key in keys:
+                _updated[key] = numpy.empty(0, dtype=int)
+
+            return self._static[names]
+
+        k, phi = func(union, k0, phi0, **kwargs)
+
+        # Zones to send to TOUGH for each group
+        updated = updated_zones(union)
+        for mask, key in zip(masks, keys):
+            _updated[key] = numpy.intersect1d(updated, numpy.flatnonzero(mask))
+
+        results = {n: (k[pos], phi[pos]) for n, pos in zip(names, positions)}
+        if getattr(func, "static", False):
+            self._static[names] = results
+
+        return results
+
+
+# Zones updated by the last evaluation of each group
+_updated = {}
+
+
+def updated(group):
+    """
+    Check whether the last permeability evaluation of a group returned new values.
+
+    Parameters
+    ----------
+    group : array_like
+        Mask array for queried group.
+
+    Returns
+    -------
+    bool
+        `False` if the outputs of a static model were returned from cache or if no zone changed in incremental mode (permeability and porosity do not need to be sent to TOUGH again), `True` otherwise.
+
+    """
+    return updated_zones(group).size > 0
+
+
+def updated_zones(group):
+    """
+    Get zones updated by the last permeability evaluation of a group.
+
+    Parameters
+    ----------
+    group : array_like
+        Mask array for queried group.
+
+    Returns
+    -------
+    array_like
+        Indices (in whole-model zone order) of zones whose permeability and porosity were recomputed, i.e., the sparse update to send to TOUGH.
+
+    """
+    group = numpy.asarray(group, dtype=bool)
+    key = _group_key(group)
+
+    return _updated[key] if key in _updated else numpy.flatnonzero(group)
+
+
+# Diagnostics of permeability models
+#  - level: 0 (off), 1 (group summary) or 2 (summary and zone values at 2nd max permeability)
+#  - every: emit diagnostics every N coupling steps
+#  - hook: callable(name, tstep, record), diagnostics are printed if None
+diagnostics = {
+    "level": 0,
+    "every": 1,
+    "hook": None,
+}
+
+
+def _diagnostics_level():
+    """Diagnostics level of current coupling step (0 if not emitted at this step)."""
+    from .io import tstep
+
+    every = max(int(diagnostics["every"]), 1)
+
+    return diagnostics["level"] if (tstep - 1) % every == 0 else 0
+
+
+def _emit_diagnostics(name, record):
+    """Send diagnostics record of a model to hook, or print it."""
+    from .io import tstep
+
+    if diagnostics["hook"] is not None:
+        diagnostics["hook"](name, tstep, record)
+        return
+
+    width = max(len(key) for key in record)
+    print("=== {} diagnostics (tstep={}) ===".format(name, tstep))
+    for key, value in record.items():
+        print("{:<{}} : {}".format(key, width, value))
+
+
+def _second_max_index(x):
+    """Index of second largest value in O(n)."""
+    if x.size < 2:
+        return int(numpy.argmax(x))
+
+    top = numpy.argpartition(x, -2)[-2:]
+
+    return int(top[numpy.argmin(x[top])])
+
+
+def _min_index(x, mask):
+    """Index of smallest value among masked values."""
+    idx = numpy.flatnonzero(mask)
+
+    return int(idx[numpy.argmin(x[idx])])
+
+
+def _param_key(value):
+    """Hashable key of a model parameter."""
+    if isinstance(value, (list, tuple, numpy.ndarray)):
+        value = numpy.asarray(value)
+        return value.shape, value.dtype.str, value.tobytes()
+
+    return value
+
+
+# Flat indices of 3x3 tensor components in (xx, yy, zz, xy, yz, xz)
+_voigt_to_tensor = numpy.array([0, 3, 5, 3, 1, 4, 5, 4, 2])
+
+
+def stress_tensor(stress):
+    """
+    Assemble stress tensors from flat stress arrays.
+
+    Parameters
+    ----------
+    stress : array_like
+        Flat stress array (xx, yy, zz, xy, yz, xz) of shape (nzone, 6), as returned by :func:`itasca.zonearray.stress_flat`.
+
+    Returns
+    -------
+    array_like
+        Stress tensor array of shape (nzone, 3, 3).
+
+    """
+    stress = numpy.asarray(stress)
+
+    return stress[:, _voigt_to_tensor].reshape((-1, 3, 3))
+
+
+class Snapshot(object):
+    """
+    Whole-model zone arrays memoized for one coupling step.
+
+    Each zone array is read from FLAC3D on first query only, and the same (read-only) array is returned to every subsequent query until the zone state changes. The snapshot returned by :func:`snapshot` is renewed when the coupling time step or the FLAC3D cycle count changes (i.e., after each mechanical solve). Permeability and porosity are discarded before each permeability model call (written back by `run` after each group). Python functions that write zone arrays must discard them with :meth:`clear`.
+
+    Parameters
+    ----------
+    tstep : int
+        Coupling time step of the snapshot.
+    cycle : int or None, optional, default None
+        FLAC3D cycle count of the snapshot.
+
+    Attributes
+    ----------
+    nbytes : int
+        Number of bytes read from FLAC3D.
+    nbytes_total : int
+        Number of bytes read from FLAC3D by all snapshots (class attribute).
+
+    """
+
+    nbytes_total = 0
+
+    def __init__(self, tstep, cycle=None):
+        self.tstep = tstep
+        self.cycle = cycle
+        self.nbytes = 0
+        self._cache = {}
+
+    def _get(self, key, func, *args):
+        """Read a zone array on first query and memoize it."""
+        if key not in self._cache:
+            arr = numpy.asarray(func(*args))
+            arr.flags.writeable = False
+            self._cache[key] = arr
+            self.nbytes += arr.nbytes
+            Snapshot.nbytes_total += arr.nbytes
+
+        return self._cache[key]
+
+    def clear(self, *keys):
+        """
+        Discard memoized zone arrays (e.g., after writing zone arrays within a step).
+
+        Parameters
+        ----------
+        keys : str or tuple
+            Keys of zone arrays to discard (e.g., 'pp' or ('extra', 41)). All zone arrays are discarded if not provided.
+
+        """
+        if not keys:
+            self._cache.clear()
+
+        for key in keys:
+            self._cache.pop(key, None)
+
+    def stress_flat(self):
+        """Flat stress array (xx, yy, zz, xy, yz, xz)."""
+        return self._get("stress_flat", za.stress_flat)
+
+    def pp(self):
+        """Pore pressure."""
+        return self._get("pp", tza.pp)
+
+    def temp(self):
+        """Temperature."""
+        return self._get("temp", za.temp)
+
+    def permeability(self):
+        """Permeability."""
+        return self._get("permeability", tza.permeability)
+
+    def porosity(self):
+        """Porosity."""
+        return self._get("porosity", tza.porosity)
+
+    def strain_vol(self):
+        """Volumetric strain."""
+        return self._get("strain_vol", tza.strain_vol)
+
+    def extra(self, index):
+        """Zone extra variable."""
+        return self._get(("extra", index), za.extra, index)
+
+    def prop_scalar(self, name):
+        """Scalar zone property."""
+        return self._get(("prop_scalar", name), za.prop_scalar, name)
+
+    def in_group(self, name):
+        """Mask array of zone group."""
+        return self._get(("in_group", name), za.in_group, name)
+
+
+_snapshot = None
+
+
+def snapshot():
+    """
+    Get zone array snapshot of current coupling step.
+
+    The snapshot is shared by all permeability models and Python callbacks, and is automatically renewed when the coupling time step or the FLAC3D cycle count (mechanical solve) changes.
+
+    Returns
+    -------
+    :class:`Snapshot`
+        Zone array snapshot.
+
+    """
+    from .io import tstep
+
+    global _snapshot
+    cycle = _cycle()
+    if _snapshot is None or _snapshot.tstep != tstep or _snapshot.cycle != cycle:
+        _snapshot = Snapshot(tstep, cycle)
+
+    return _snapshot
+
+
+def _cycle():
+    """FLAC3D cycle count (None outside of FLAC3D)."""
+    try:
+        return it.cycle()
+
+    except NameError:
+        return None
+
+
+class ZoneGroup(object):
+    """
+    Zone group with cached zone indices.
+
+    Whole-model zone arrays are restricted to the group with a single take on the cached index array, and all subsequent operations only touch the zones of the group.
+
+    Parameters
+    ----------
+    group : array_like
+        Mask array for queried group.
+
+    """
+
+    def __init__(self, group):
+        self.mask = numpy.asarray(group, dtype=bool)
+        self.index = numpy.flatnonzero(self.mask)
+        self.key = _group_key(self.mask)
+
+    def __len__(self):
+        """Number of zones in group."""
+        return self.index.size
+
+    def take(self, arr):
+        """Restrict a whole-model zone array to the group."""
+        return numpy.take(arr, self.index, axis=0)
+
+    def stress_flat(self):
+        """Flat stress array (xx, yy, zz, xy, yz, xz) of grouped zones."""
+        return self.take(snapshot().stress_flat())
+
+    def pp(self):
+        """Pore pressure of grouped zones."""
+        return self.take(snapshot().pp())
+
+    def permeability(self):
+        """Permeability of grouped zones."""
+        return self.take(snapshot().permeability())
+
+    def strain_vol(self):
+        """Volumetric strain of grouped zones."""
+        return self.take(snapshot().strain_vol())
+
+    def stress_effective(self):
+        """
+        Effective stress tensors of grouped zones (compression positive).
+
+        Equivalent to `-zone.stress_effective()` for each zone of the group, but read in bulk from the zone arrays.
+
+        """
+        stress = -stress_tensor(self.stress_flat())
+        stress[:, [0, 1, 2], [0, 1, 2]] -= self.pp()[:, None]
+
+        return stress
+
+    def extra(self, index):
+        """Zone extra variable of grouped zones."""
+        return self.take(snapshot().extra(index))
+
+    def prop_scalar(self, name):
+        """Scalar zone property of grouped zones."""
+        return self.take(snapshot().prop_scalar(name))
+
+    def strain_plastic(self, joint=False):
+        """Plastic shear and tensile strains of grouped zones."""
+        suffix = "-joint" if joint else ""
+        strain_shear = self.prop_scalar("strain-shear-plastic{}".format(suffix))
+        strain_tensile = self.prop_scalar("strain-tensile-plastic{}".format(suffix))
+
+        return strain_shear, strain_tensile
+
+
+_zone_groups = {}
+
+
+def _group_key(group):
+    """Hashable key of a mask array."""
+    return group.size, numpy.packbits(group).tobytes()
+
+
+def zone_group(group):
+    """
+    Get cached zone group of a mask array.
+
+    Parameters
+    ----------
+    group : array_like
+        Mask array for queried group.
+
+    Returns
+    -------
+    :class:`ZoneGroup`
+        Zone group (created on first query only).
+
+    """
+    group = numpy.asarray(group, dtype=bool)
+    key = _group_key(group)
+    if key not in _zone_groups:
+        _zone_groups[key] = ZoneGroup(group)
+
+    return _zone_groups[key]
+
+
+def _save_group_state(filename, states):
+    """
+    Save state arrays of zone groups to a NPZ file.
+
+    States of other groups already stored in the file are kept.
+
+    Parameters
+    ----------
+    filename : str
+        Output file name.
+    states : dict
+        Tuple of state arrays for each group key.
+
+    """
+    arrays = {}
+    if os.path.isfile(filename):
+        with numpy.load(filename) as data:
+            arrays.update({name: data[name] for name in data.files})
+
+    for key, values in states.items():
+        for i, value in enumerate(values):
+            arrays["{}_{}".format(_group_name(key), i)] = value
+
+    # Write to a temporary file first so that an interrupted run never leaves a truncated file
+    tmp = "{}.tmp".format(filename)
+    with open(tmp, "wb") as f:
+        numpy.savez(f, **arrays)
+    os.replace(tmp, filename)
+
+
+def _load_group_state(filename, key, n):
+    """
+    Load state arrays of a zone group from a NPZ file.
+
+    Parameters
+    ----------
+    filename : str
+        Input file name.
+    key : tuple
+        Group key.
+    n : int
+        Number of state arrays.
+
+    Returns
+    -------
+    tuple or None
+        State arrays of the group, or None if not stored in file.
+
+    """
+    if not os.path.isfile(filename):
+        return None
+
+    names = ["{}_{}".format(_group_name(key), i) for i in range(n)]
+    with numpy.load(filename) as data:
+        if not all(name in data.files for name in names):
+            return None
+
+        return tuple(data[name] for name in names)
+
+
+def _group_name(key):
+    """Short name of a group key for file storage."""
+    return "g{}_{}".format(key[0], hashlib.sha1(key[1]).hexdigest()[:16])
+
+
+# Reference state, permeability and porosity of incremental models per group
+_incremental_state = {}
+
+
+def _incremental(name, zones, params, state, tol, func):
+    """
+    Recompute permeability and porosity only for zones whose state changed.
+
+    Parameters
+    ----------
+    name : str
+        Model name.
+    zones : :class:`ZoneGroup`
+        Queried zone group.
+    params : dict
+        Model parameters. Reference states are kept separately for each set of parameters, so that all zones are recomputed when parameters change.
+    state : dict
+        State arrays of shape (nzone,) that drive the model.
+    tol : dict
+        Absolute change tolerance for each state array.
+    func : callable
+        Function that returns permeability and porosity for a mask of zones.
+
+    Returns
+    -------
+    array_like
+        New permeability array for queried group.
+    array_like
+        New porosity array for queried group.
+
+    """
+    key = name, zones.key, tuple((k, _param_key(v)) for k, v in sorted(params.items()))
+
+    if key not in _incremental_state:
+        mask = numpy.ones(len(zones), dtype=bool)
+        k, phi = func(mask)
+        ref = {field: numpy.array(value) for field, value in state.items()}
+
+    else:
+        ref, k, phi = _incremental_state[key]
+        mask = numpy.zeros(len(zones), dtype=bool)
+        for field, value in state.items():
+            mask |= numpy.abs(value - ref[field]) > tol[field]
+
+        # Zones below tolerance keep their previous values (and reference state)
+        k, phi = k.copy(), phi.copy()
+        if mask.any():
+            k[mask], phi[mask] = func(mask)
+            for field, value in state.items():
+                ref[field][mask] = value[mask]
+
+    _incremental_state[key] = ref, k, phi
+    _updated[zones.key] = zones.index[mask]
+
+    return k, phi
+
+
+@permeability(static=True)
 def constant(group, k0, phi0):
     """
     No mechanical-induced permeability change.
@@ -139,7 +851,7 @@ def chin2000(group, k0, phi0, ke=5.6):
 
     """
     # Volumetric strain
-    strain_vol = tza.strain_vol()[group]
+    strain_vol = zone_group(group).strain_vol()
 
     # New porosity and permeability arrays
     phi = 1.0 - (1.0 - phi0) * numpy.exp(-strain_vol)
@@ -177,11 +889,13 @@ def rutqvist2002(group, k0, phi0, phir=0.0, ke=22.2, phie=5.0e-8):
         New porosity array for queried group.
 
     """
+    zones = zone_group(group)
+
     # Pore pressure
-    pp = numpy.array([z.pp() for z, g in zip(it.zone.list(), group) if g])
+    pp = zones.pp()
 
     # Mean effective stress
-    stress_mean = za.stress_flat()[group, :3].mean(axis=1) + pp
+    stress_mean = zones.stress_flat()[:, :3].mean(axis=1) + pp
 
     # New porosity and permeability arrays
     phi = (phi0 - phir) * numpy.exp(phie * stress_mean) + phir
@@ -216,12 +930,12 @@ def minkoff2004(group, k0, phi0, ke):
 
     """
     # Volumetric strain
-    strain_vol = tza.strain_vol()[group]
+    strain_vol = zone_group(group).strain_vol()
 
     # New porosity and permeability arrays
     phi = numpy.full_like(strain_vol, phi0)
     kf = numpy.exp(ke * strain_vol)
-    k = numpy.einsum("ij, i-> ij", tza.permeability()[group], kf)
+    k = numpy.einsum("ij, i-> ij", zone_group(group).permeability(), kf)
 
     return k, phi
 
@@ -231,18 +945,13 @@ def hsiung2005(group, k0, phi0, n, psi, a, sig0, joint=False):
     After Hsiung et al. (2005).
     """
 
-    # Pore pressure
-    pp = tza.pp()
+    zones = zone_group(group)
 
     # Plastic shear strain and tensile
-    suffix = "-joint" if joint else ""
-    strain_shear = za.prop_scalar("strain-shear-plastic{}".format(suffix))[group]
-    strain_tensile = za.prop_scalar("strain-tensile-plastic{}".format(suffix))[group]
+    strain_shear, strain_tensile = zones.strain_plastic(joint)
 
     # Effective stress tensor for grouped zones
-    stress = numpy.array(
-        [-z.stress_effective() for z, g in zip(it.zone.list(), group) if g]
-    )
+    stress = zones.stress_effective()
 
     # Effective normal stresses on plane n
     sig = normal_stress(stress, n)   # shape (nzone,)
@@ -286,40 +995,47 @@ def hsiung2005(group, k0, phi0, n, psi, a, sig0, joint=False):
     k_temp = k_temp.reshape(-1, 1)
     k = numpy.concatenate((k_temp, k_temp, k_temp), axis=1)
 
-    # For debug / max search
-    k_col = k[:, 0]
-    idx_sorted  = numpy.argsort(k_col)[::-1]
-    idx_max     = idx_sorted[0]
-    idx_second  = idx_sorted[1]
-    idx_min     = idx_sorted[-1]
-    k_max       = k_col[idx_max]
-    k_second    = k_col[idx_second]
-
-    print("=== Hsiung2005 debug (FAULT group) ===")
-    print("Max k 2      :", k[idx_second, :])
-    print("Min k        :", k[idx_min, :])
-    print("Index       :", idx_second)
-    print("k0 at idx   :", k0[idx_second, :])
-    print("phi0        :", phi0)
-    print("phi at idx  :", phi[idx_second])
-    print("sig  at idx :", sig[idx_second])
-    print("sig0 at idx :", sig0[idx_second])
-    print("strain_tens :", strain_tensile[idx_second])
-    print("strain_shear:", strain_shear[idx_second])
-    print("psi (deg)   :", psi)
-    print("a           :", a)
-    print("br at idx   :", br[idx_second])
-    print("c+ at idx   :", c_plus[idx_second])
-    print("c- at idx   :", c_minus[idx_second])
-    print("kf+ at idx  :", kf_plus[idx_second])
-    print("kf- at idx  :", kf_minus[idx_second])
-    print("pp max      :", numpy.amax(pp)*1e-6, " MPa")
-    print("======================================")
+    level = _diagnostics_level()
+    if level:
+        k_col = k[:, 0]
+        idx_second = _second_max_index(k_col)
+        record = {
+            "zones": k_col.size,
+            "k max": k[numpy.argmax(k_col)],
+            "k 2nd max": k[idx_second],
+            "k min": k[numpy.argmin(k_col)],
+            "pp max (MPa)": numpy.amax(zones.pp()) * 1.0e-6,
+        }
+        if level > 1:
+            record.update({
+                "index (2nd max k)": idx_second,
+                "k0 @2nd max": k0[idx_second],
+                "phi @2nd max": phi[idx_second],
+                "sig @2nd max": sig[idx_second],
+                "sig0 @2nd max": numpy.ravel(sig0)[idx_second] if numpy.ndim(sig0) else sig0,
+                "strain_tens @2nd max": strain_tensile[idx_second],
+                "strain_shear @2nd max": strain_shear[idx_second],
+                "br @2nd max": br[idx_second],
+                "c+ @2nd max": c_plus[idx_second],
+                "c- @2nd max": c_minus[idx_second],
+                "kf+ @2nd max": kf_plus[idx_second],
+                "kf- @2nd max": kf_minus[idx_second],
+            })
+        _emit_diagnostics("hsiung2005", record)
 
     return k, phi
 
 @permeability
-def nuus2025(group, k0, phi0, a,k_jump_factor, joint=False):
+def nuus2025(
+    group,
+    k0,
+    phi0,
+    a,
+    k_jump_factor,
+    joint=False,
+    incremental=False,
+    tol_strain=1.0e-6,
+):
     """
     Simple strain-driven permeability model (Nuus 2025).
 
@@ -343,98 +1059,84 @@ def nuus2025(group, k0, phi0, a,k_jump_factor, joint=False):
         Larger a -> faster permeability growth with strain.
     joint : bool, optional
         If True, read joint plastic strains; otherwise zone plastic strains.
+    incremental : bool, optional
+        If True, only recompute zones whose plastic strains changed by more
+        than tol_strain since their last update (see updated_zones).
+    tol_strain : scalar, optional
+        Plastic strain change tolerance (incremental mode only).
     """
 
+    zones = zone_group(group)
+
     # --- Plastic shear and tensile strain ---
-    suffix = "-joint" if joint else ""
-    strain_shear   = za.prop_scalar("strain-shear-plastic{}".format(suffix))[group]
-    strain_tensile = za.prop_scalar("strain-tensile-plastic{}".format(suffix))[group]
+    strain_shear, strain_tensile = zones.strain_plastic(joint)
     failed_mask = strain_shear > 0.0      # or > threshold if you prefer
 
-    # --- Equivalent plastic strain eps_eq ---
-    # eps_eq = sqrt( eps_tens^2 + (2/3)*gamma_shear^2 )
-    eps_eq = numpy.sqrt(
-        strain_tensile**2 + (2.0 / 3.0) * strain_shear**2
-    )
-
-    # --- Permeability update: k_scalar = k0 * exp(a * eps_eq) ---
-    # --- build multiplicative factor per zone (nzone,)
-    mult = numpy.exp(a * eps_eq)
-    mult[failed_mask] *= k_jump_factor
-
-    # --- apply to each component of k0 (preserves anisotropy), result (nzone, 3)
-    k = k0 * mult[:, None]
-
-    # Always use non-negative permeability (component-wise)
-    k = numpy.abs(k)
-
-    # Cap permeability (component-wise)
-    k_max_cap = 1.0e-12
-    k = numpy.minimum(k, k_max_cap)
-
-    # Porosity: simplest choice -> constant phi0 for all zones
-    nzone = group.sum()
-    phi = numpy.full(nzone, phi0, dtype=float)
-
-    # ----------------- DEBUG BLOCK -----------------
-    k_col = k[:, 0]   # representative component
-
-    idx_sorted  = numpy.argsort(k_col)[::-1]
-    idx_max     = idx_sorted[0]
-    idx_second  = idx_sorted[1]
-
-    # --- minimum k among FAILED zones only ---
-    if numpy.any(failed_mask):
-        # indices of failed zones in this group
-        failed_indices = numpy.nonzero(failed_mask)[0]        # e.g. [3, 7, 12, ...]
-        # corresponding k values
-        k_failed = k_col[failed_indices]
-        # index (within k_failed) of the minimum k
-        rel_idx_min_failed = numpy.argmin(k_failed)
-        # map back to the original indexing
-        idx_min_failed = failed_indices[rel_idx_min_failed]
-    else:
-        # no failed zones → fall back to global minimum
-        idx_min_failed = idx_sorted[-1]
+    def update(mask):
+        # --- Equivalent plastic strain eps_eq ---
+        # eps_eq = sqrt( eps_tens^2 + (2/3)*gamma_shear^2 )
+        eps_eq = numpy.sqrt(
+            strain_tensile[mask]**2 + (2.0 / 3.0) * strain_shear[mask]**2
+        )
+
+        # --- Permeability update: k_scalar = k0 * exp(a * eps_eq) ---
+        # --- build multiplicative factor per zone (nzone,)
+        mult = numpy.exp(a * eps_eq)
+        mult[failed_mask[mask]] *= k_jump_factor
 
-    # Pore pressure for this group only
-    pp_all   = tza.pp()          # all zones
-    pp_group = pp_all[group]     # just FAULT (or whatever group)
-    pp_sorted = numpy.sort(pp_group)
+        # --- apply to each component of k0 (preserves anisotropy), result (nzone, 3)
+        k = k0[mask] * mult[:, None]
 
-    if pp_sorted.size >= 2:
-        pp_max      = pp_sorted[-1]
-        pp_second   = pp_sorted[-2]
+        # Always use non-negative permeability (component-wise)
+        k = numpy.abs(k)
+
+        # Cap permeability (component-wise)
+        k_max_cap = 1.0e-12
+        k = numpy.minimum(k, k_max_cap)
+
+        # Porosity: simplest choice -> constant phi0 for all zones
+        phi = numpy.full(len(k), phi0, dtype=float)
+
+        return k, phi
+
+    if incremental:
+        state = {"strain_shear": strain_shear, "strain_tensile": strain_tensile}
+        tol = {"strain_shear": tol_strain, "strain_tensile": tol_strain}
+        params = {"k0": k0, "phi0": phi0, "a": a, "k_jump_factor": k_jump_factor, "joint": joint}
+        k, phi = _incremental("nuus2025", zones, params, state, tol, update)
     else:
-        pp_max    = pp_sorted[-1]
-        pp_second = pp_sorted[-1]
-
-    # -------- failure statistics (based on shear plastic strain) --------
-    # Define "failed" zones as those with positive plastic shear strain
-    failed_mask = strain_shear > 0.0
-
-    n_failed = numpy.count_nonzero(failed_mask)
-    n_total  = strain_shear.size
-
-    # Optionally: fraction of failed zones
-    frac_failed = n_failed / n_total if n_total > 0 else 0.0
-
-    print(f"=== nuus2025 debug ({group_name}) ===")
-    print("k (2nd highest)       :", k[idx_second, :])
-    print("k (min, failed only)  :", k[idx_min_failed, :])
-    print("Index (2nd max k)     :", idx_second)
-    print("Index (min k failed)  :", idx_min_failed)
-    print("k0 at idx (2nd max)   :", k0[idx_second, :])
-    print("phi0                  :", phi0)
-    print("phi at idx (2nd max)  :", phi[idx_second])
-    print("strain_tens @2nd max  :", strain_tensile[idx_second])
-    print("strain_shear @2nd max :", strain_shear[idx_second])
-    print("strain_tens @min fail :", strain_tensile[idx_min_failed])
-    print("strain_shear@min fail :", strain_shear[idx_min_failed])
-    print("a (sensitiv.)         :", a)
-    print("pp 2nd max            : {:.3f} MPa".format(pp_second * 1e-6))
-    print("failed zones          : {} / {}"
-          .format(numpy.count_nonzero(failed_mask), strain_shear.size))
-    print("====================================")
+        k, phi = update(slice(None))
+
+    level = _diagnostics_level()
+    if level:
+        k_col = k[:, 0]   # representative component
+        idx_second = _second_max_index(k_col)
+
+        # minimum k among failed zones only (global minimum if none failed)
+        idx_min_failed = (
+            _min_index(k_col, failed_mask)
+            if failed_mask.any()
+            else int(numpy.argmin(k_col))
+        )
+
+        record = {
+            "zones": k_col.size,
+            "failed zones": numpy.count_nonzero(failed_mask),
+            "k 2nd max": k[idx_second],
+            "k min (failed)": k[idx_min_failed],
+            "pp max (MPa)": numpy.amax(zones.pp()) * 1.0e-6,
+        }
+        if level > 1:
+            record.update({
+                "index (2nd max k)": idx_second,
+                "index (min k failed)": idx_min_failed,
+                "k0 @2nd max": k0[idx_second],
+                "phi @2nd max": phi[idx_second],
+                "strain_tens @2nd max": strain_tensile[idx_second],
+                "strain_shear @2nd max": strain_shear[idx_second],
+                "strain_tens @min fail": strain_tensile[idx_min_failed],
+                "strain_shear @min fail": strain_shear[idx_min_failed],
+            })
+        _emit_diagnostics("nuus2025", record)
 
     return k, phi
@@ -1,5 +1,26 @@
+# Initial effective normal stress, permeability and porosity per zone group
+_rinaldi2019_init = {}
+
+
 @permeability
-def rinaldi2019(group, k0, phi0, n, w, br, bmax, alpha, n_vector, joint=False):
+def rinaldi2019(
+    group,
+    k0,
+    phi0,
+    n,
+    w,
+    br,
+    bmax,
+    alpha,
+    n_vector,
+    joint=False,
+    incremental=False,
+    tol_strain=1.0e-6,
+    tol_stress=1.0e4,
+    fused=False,
+    init_file=None,
+    overwrite_init=False,
+):
     """
     After Rinaldi et al. (2019)
 
@@ -25,6 +46,18 @@ def rinaldi2019(group, k0, phi0, n, w, br, bmax, alpha, n_vector, joint=False):
         Unit normal vector (3 components). Unit normal vector of the fault.
     joint : bool, optional, default False
         If `True` shear and tensile strains as well as dilation angle are read from joint values
+    incremental : bool, optional, default False
+        If `True` permeability and porosity are only recomputed for zones whose plastic strains or effective normal stress changed since their last update (see :func:`updated_zones`)
+    tol_strain : scalar, optional, default 1.0e-6
+        Plastic strain change tolerance (incremental mode only)
+    tol_stress : scalar, optional, default 1.0e4
+        Effective normal stress change tolerance in Pa (incremental mode only)
+    fused : bool, optional, default False
+        If `True` and numba is installed, aperture, porosity and permeability are computed in a single compiled pass over the zones (NumPy if numba is not installed)
+    init_file : str or None, optional, default None
+        NPZ file where initial effective normal stress, permeability and porosity are saved at the first coupling step, and reloaded from when a run is restarted from a FLAC3D save (even if the coupling time step restarts at 1). Use a stable path that does not depend on the name of the save. A fingerprint of the model (zone counts and n_vector) is saved along, and a ValueError is raised if it does not match on reload
+    overwrite_init : bool, optional, default False
+        If `True`, initial state is recomputed at the first coupling step and overwrites the state saved in init_file (to start a new run with an existing init_file)
 
     Returns
     -------
@@ -35,74 +68,159 @@ def rinaldi2019(group, k0, phi0, n, w, br, bmax, alpha, n_vector, joint=False):
     """
     # read the time step from the global variable defined before
     from .io import tstep
-    if tstep==1:
-        global eff_n_stress_init, k0_, phi0_
-        # get initial effective normal stress
-        #stress_tensor_init = numpy.array([-z.stress_effective() for z, g in zip(it.zone.list(), group) if g])
-        #pp_init = numpy.array([z.pp() for z, g in zip(it.zone.list(), group) if g])
-        #eff_n_stress_init = normal_stress(stress_tensor_init, n_vector)
-        # get initial permeability
-        k0_ = za.extra(11) # this was the initial line! 
-
-        # get initial porosity
-        phi0_ = za.extra(13)
-        # Alternatively:
-        # get the pore pressure
-        #pp = numpy.array([z.pp() for z, g in zip(it.zone.list(), group) if g])
-        # or:
-        pp = za.extra(15)
-        # get stress tensor
-        stresses = za.stress_flat()
-        stress_tensor = []
-        for i in range(len(stresses)):
-            stress_tensor.append(numpy.asarray([[stresses[i][0], stresses[i][3], stresses[i][5]],
-                                                [stresses[i][3], stresses[i][1], stresses[i][4]],
-                                                [stresses[i][5], stresses[i][4], stresses[i][2]]]))
-        stress_tensor = numpy.asarray(stress_tensor)
-
-        # get the normal effective stress from the stress tensor and the normal to the fault plane subtracted by the pore pressure
-        eff_n_stress_init = normal_stress(-stress_tensor, n_vector) - pp # negative stress tensor for compression
-
-        #raise ValueError()
-
-    # get array of cell ids within group (this stopped working at some point instead of using group)
-    #group_ids = numpy.where(za.in_group(group)==True)[0]
+
+    # cached zone indices of the group, all reads below are restricted to it
+    zones = zone_group(group)
+    if zones.key not in _rinaldi2019_init or (tstep == 1 and overwrite_init):
+        # model the initial state was computed for (the initial effective normal stress depends on n_vector)
+        fingerprint = numpy.concatenate(([zones.mask.size, len(zones)], numpy.ravel(n_vector))).astype(float)
+
+        # restarted run, initial state was saved by the first coupling step
+        state = (
+            _load_group_state(init_file, zones.key, 4)
+            if init_file and not overwrite_init
+            else None
+        )
+        if state is None and init_file and not overwrite_init and _load_group_state(init_file, zones.key, 3) is not None:
+            raise ValueError(
+                "initial state of group in '{}' has no model fingerprint, set overwrite_init=True to start a new run.".format(init_file)
+            )
+
+        if state is not None:
+            if not numpy.array_equal(state[3], fingerprint):
+                raise ValueError(
+                    "initial state of group in '{}' was saved for another model (zone counts or n_vector differ), set overwrite_init=True to start a new run.".format(init_file)
+                )
+            state = state[:3]
+
+        if state is None:
+            if tstep != 1:
+                raise ValueError(
+                    "initial state of group not found{}.".format(
+                        " in '{}'".format(init_file) if init_file else " (init_file not set)"
+                    )
+                )
+
+            # get initial permeability
+            k0_ = zones.extra(11)
+
+            # get initial porosity
+            phi0_ = zones.extra(13)
+
+            # get the pore pressure
+            pp = zones.extra(15)
+
+            # get stress tensor
+            stress = stress_tensor(zones.stress_flat())
+
+            # get the normal effective stress from the stress tensor and the normal to the fault plane subtracted by the pore pressure
+            eff_n_stress_init = normal_stress(-stress, n_vector) - pp # negative stress tensor for compression
+
+            state = eff_n_stress_init, k0_, phi0_
+            if init_file:
+                _save_group_state(init_file, {zones.key: state + (fingerprint,)})
+
+        _rinaldi2019_init[zones.key] = state
+
+    eff_n_stress_init, k0_, phi0_ = _rinaldi2019_init[zones.key]
 
     # get plastic shear and tensile strain
-    suffix = "-joint" if joint else ""
-    strain_shear = za.prop_scalar("strain-shear-plastic{}".format(suffix))[group]
-    strain_tensile = za.prop_scalar("strain-tensile-plastic{}".format(suffix))[group]
+    strain_shear, strain_tensile = zones.strain_plastic(joint)
     # and the dilation angle
-    psi = za.prop_scalar("dilation{}".format(suffix))[group]
+    suffix = "-joint" if joint else ""
+    psi = zones.prop_scalar("dilation{}".format(suffix))
 
     # get pore pressure
-    #pp = numpy.array([z.pp() for z, g in zip(it.zone.list(), group) if g])
-    # or:
-    pp = za.extra(15)[group]
+    pp = zones.extra(15)
 
     # get effective normal stress
     # first get the stress tensor(s)
-    stresses = za.stress_flat()[group]
-    stress_tensor = []
-    for i in range(len(stresses)):
-        stress_tensor.append(numpy.asarray([[stresses[i][0], stresses[i][3], stresses[i][5]],
-                                            [stresses[i][3], stresses[i][1], stresses[i][4]],
-                                            [stresses[i][5], stresses[i][4], stresses[i][2]]]))
-    stress_tensor = numpy.asarray(stress_tensor)
+    stress = stress_tensor(zones.stress_flat())
 
     # get the normal effective stress from the stress tensor and the normal to the fault plane subtracted by the pore pressure
-    eff_n_stress = normal_stress(-stress_tensor, n_vector) - pp # negative stress tensor for compression
-    # or:
-    #stress_tensor = numpy.array([-z.stress_effective() for z, g in zip(it.zone.list(), group) if g])
-    #eff_n_stress = normal_stress(stress_tensor, n_vector)
+    eff_n_stress = normal_stress(-stress, n_vector) - pp # negative stress tensor for compression
+
+    # compiled single-pass kernel if available, NumPy otherwise
+    kernel = (
+        _rinaldi2019_fused
+        if fused and _rinaldi2019_fused is not None
+        else _rinaldi2019_kernel
+    )
+
+    if incremental:
+        state = {
+            "strain_shear": strain_shear,
+            "strain_tensile": strain_tensile,
+            "eff_n_stress": eff_n_stress,
+        }
+        tol = {
+            "strain_shear": tol_strain,
+            "strain_tensile": tol_strain,
+            "eff_n_stress": tol_stress,
+        }
+
+        params = {"n": n, "w": w, "br": br, "bmax": bmax, "alpha": alpha, "n_vector": n_vector, "joint": joint}
+
+        return _incremental(
+            "rinaldi2019",
+            zones,
+            params,
+            state,
+            tol,
+            lambda mask: kernel(
+                eff_n_stress[mask],
+                eff_n_stress_init[mask],
+                strain_shear[mask],
+                strain_tensile[mask],
+                psi[mask],
+                k0_[mask],
+                phi0_[mask],
+                n,
+                w,
+                br,
+                bmax,
+                alpha,
+            ),
+        )
+
+    return kernel(
+        eff_n_stress,
+        eff_n_stress_init,
+        strain_shear,
+        strain_tensile,
+        psi,
+        k0_,
+        phi0_,
+        n,
+        w,
+        br,
+        bmax,
+        alpha,
+    )
+
 
+def _rinaldi2019_kernel(
+    eff_n_stress,
+    eff_n_stress_init,
+    strain_shear,
+    strain_tensile,
+    psi,
+    k0_,
+    phi0_,
+    n,
+    w,
+    br,
+    bmax,
+    alpha,
+):
+    """Fracture aperture, porosity and permeability of Rinaldi et al. (2019) model."""
     # calculate the fracture spacing
     sf = n/w
 
     # calculate the initial fracture aperture
     #eff_n_stress_i = sign0 * (1.0e6)
     alpha = alpha / (1.0e6)
-    bi = br + bmax * numpy.exp(-alpha*eff_n_stress_init[group])
+    bi = br + bmax * numpy.exp(-alpha*eff_n_stress_init)
 
     # calculate the fracture aperture shear shift
     bshear = strain_shear * numpy.tan(numpy.deg2rad(psi)) / sf
@@ -121,21 +239,63 @@ def rinaldi2019(group, k0, phi0, n, w, br, bmax, alpha, n_vector, joint=False):
     dphi = strain_tensile + strain_shear * numpy.tan(numpy.deg2rad(psi))
 
     # calculate new porosity array
-    phi = phi0_[group] + dphi
+    phi = phi0_ + dphi
 
     # calculate new permeability array
     kf = b / bi # ratio of fracture aperture vs initial fracture aperture
-    k = numpy.einsum("ij, i->ij", k0_[group], kf * kf * kf)
+    k = numpy.einsum("ij, i->ij", k0_, kf * kf * kf)
 
     # ---- cap maximum permeability ----
     k_max = 5e-12
     k = numpy.clip(k, a_min=None, a_max=k_max)
 
+    return k, phi
+
+
+def _rinaldi2019_fused_kernel(
+    eff_n_stress,
+    eff_n_stress_init,
+    strain_shear,
+    strain_tensile,
+    psi,
+    k0_,
+    phi0_,
+    n,
+    w,
+    br,
+    bmax,
+    alpha,
+):
+    """Single-pass version of :func:`_rinaldi2019_kernel` (only allocates the output arrays)."""
+    nzone = eff_n_stress.size
+    k = numpy.empty((nzone, 3))
+    phi = numpy.empty(nzone)
+
+    sf = n / w
+    alpha = alpha / 1.0e6
+    k_max = 5e-12
+    for i in range(nzone):
+        tan_psi = numpy.tan(numpy.deg2rad(psi[i]))
+
+        # initial and total fracture apertures (elastic + shear + tensile)
+        bi = br + bmax * numpy.exp(-alpha * eff_n_stress_init[i])
+        b = (
+            br
+            + bmax * numpy.exp(-alpha * eff_n_stress[i])
+            + strain_shear[i] * tan_psi / sf
+            + strain_tensile[i] * w
+        )
+
+        # porosity and capped permeability
+        phi[i] = phi0_[i] + strain_tensile[i] + strain_shear[i] * tan_psi
+        kf = b / bi
+        kf3 = kf * kf * kf
+        for j in range(3):
+            k[i, j] = min(k0_[i, j] * kf3, k_max)
+
+    return k, phi
 
-#    print("=== aperure values in permeability function ===")
-#    print("max b_el = ", numpy.amax(bel))
-#    print("max b = ", numpy.amax(b))
-#    print("min b = ", numpy.amin(b))
-#    print("=== === === ===")
 
-    return k, phi
\ No newline at end of file
+_rinaldi2019_fused = (
+    numba.njit(cache=True)(_rinaldi2019_fused_kernel) if numba is not None else None
+)
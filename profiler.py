@@ -0,0 +1,241 @@
+from __future__ import division
+
+import atexit
+import time
+from functools import wraps
+
+from .permeability import Snapshot, snapshot
+
+
+__all__ = [
+    "CouplingProfiler",
+]
+
+
+# Phases timed in each coupling step
+_phases = (
+    "callback_tough",
+    "mechanical",
+    "callback_flac",
+    "permeability",
+    "other",
+)
+
+
+class CouplingProfiler(object):
+    """
+    Wall time of the phases of each coupling step.
+
+    The profiler instruments the extension points of `run` (permeability functions, Python functions before and after mechanical analysis) and times each step:
+
+     - 'callback_tough': Python functions before mechanical analysis
+     - 'mechanical': FLAC3D mechanical solve (between both sets of Python functions), including mechanical functions (e.g., :meth:`RatioStrategy.before` and :meth:`RatioStrategy.after`)
+     - 'callback_flac': Python functions after mechanical analysis
+     - 'permeability': permeability functions of all groups
+     - 'other': remaining time of the step (TOUGH solve, data exchange and histories)
+
+    CPU time of the mechanical solve is recorded as well, its ratio to the wall time being the effective number of threads used by FLAC3D. Zone array bytes read through the shared snapshots of the step (before and after the mechanical solve) are also recorded. A summary table is optionally printed at exit.
+
+    Parameters
+    ----------
+    log : :class:`ColumnWriter` or None, optional, default None
+        Binary log with columns :attr:`CouplingProfiler.columns` (one row per step).
+    summary : bool, optional, default False
+        If `True`, print a summary table at exit.
+
+    Example
+    -------
+    >>> profiler = CouplingProfiler(summary=True)
+    >>> run(..., **profiler.wrap(permeability_func, python_func_tough, python_func_flac))
+
+    """
+
+    columns = dict(
+        {phase: "f8" for phase in _phases},
+        wall="f8",
+        mechanical_cpu="f8",
+        bytes_read="i8",
+    )
+
+    def __init__(self, log=None, summary=False):
+        self.log = log
+        self.records = []
+        self._open = {}
+
+        # Runs end without notice to the callbacks, last step is closed at exit
+        if summary:
+            atexit.register(self.print_summary)
+        elif log is not None:
+            atexit.register(self.close)
+
+    def wrap(
+        self,
+        permeability_func=None,
+        callback_tough=(),
+        callback_flac=(),
+        mechanical_tough=(),
+        mechanical_flac=(),
+    ):
+        """
+        Instrument the extension points of `run`.
+
+        Parameters
+        ----------
+        permeability_func : dict or None, optional, default None
+            Permeability function of each group.
+        callback_tough : sequence of callable, optional, default ()
+            Python functions before mechanical analysis.
+        callback_flac : sequence of callable, optional, default ()
+            Python functions after mechanical analysis.
+        mechanical_tough : sequence of callable, optional, default ()
+            Python functions part of the mechanical analysis (e.g., solves), run last before mechanical analysis and timed as mechanical analysis.
+        mechanical_flac : sequence of callable, optional, default ()
+            Python functions part of the mechanical analysis (e.g., additional solves), run first after mechanical analysis and timed as mechanical analysis.
+
+        Returns
+        -------
+        dict
+            Instrumented keyword arguments 'permeability_func', 'callback_tough' and 'callback_flac' for `run`.
+
+        """
+        permeability_func = {
+            name: self._timed_permeability(func)
+            for name, func in (permeability_func or {}).items()
+        }
+        callback_tough = (
+            (self._begin_tough,)
+            + tuple(self._timed_callback("callback_tough", func) for func in callback_tough)
+            + (self._end_tough,)
+            + tuple(mechanical_tough)
+        )
+        callback_flac = (
+            tuple(mechanical_flac)
+            + (self._begin_flac,)
+            + tuple(self._timed_callback("callback_flac", func) for func in callback_flac)
+            + (self._end_flac,)
+        )
+
+        return {
+            "permeability_func": permeability_func,
+            "callback_tough": callback_tough,
+            "callback_flac": callback_flac,
+        }
+
+    def close(self):
+        """Close all open steps."""
+        self._close_before(float("inf"))
+
+    def print_summary(self):
+        """Print summary table of timed steps."""
+        self.close()
+        if not self.records:
+            return
+
+        nstep = len(self.records)
+        wall = sum(record["wall"] for record in self.records)
+        print("=== coupling profile ({} steps, {:.1f} s) ===".format(nstep, wall))
+        print("{:<16} {:>10} {:>12} {:>8}".format("phase", "total (s)", "mean (ms)", "share"))
+        for phase in _phases:
+            total = sum(record[phase] for record in self.records)
+            print(
+                "{:<16} {:>10.2f} {:>12.2f} {:>7.1f}%".format(
+                    phase, total, total / nstep * 1.0e3, 100.0 * total / wall if wall else 0.0
+                )
+            )
+
+        mechanical = sum(record["mechanical"] for record in self.records)
+        cpu = sum(record["mechanical_cpu"] for record in self.records)
+        nbytes = sum(record["bytes_read"] for record in self.records)
+        print("effective threads (mechanical) : {:.1f}".format(cpu / mechanical if mechanical else 0.0))
+        print("zone arrays read per step      : {:.1f} MB".format(nbytes / nstep / 1024**2))
+
+    def _record(self, tstep):
+        """Get record of a step."""
+        if tstep not in self._open:
+            self._close_before(tstep)
+            self._open[tstep] = dict(
+                {phase: 0.0 for phase in _phases},
+                tstep=tstep,
+                time=0.0,
+                wall=0.0,
+                mechanical_cpu=0.0,
+                bytes_read=0,
+                _nbytes=Snapshot.nbytes_total,
+                _start=None,
+                _tough_end=None,
+            )
+
+        return self._open[tstep]
+
+    def _close_before(self, tstep):
+        """Close records of steps prior to tstep."""
+        now = time.perf_counter()
+        for t in sorted(t for t in self._open if t < tstep):
+            record = self._open.pop(t)
+            if record["_start"] is not None:
+                record["wall"] = now - record["_start"]
+            measured = sum(record[phase] for phase in _phases if phase != "other")
+            record["other"] = max(record["wall"] - measured, 0.0)
+
+            record = {k: v for k, v in record.items() if not k.startswith("_")}
+            self.records.append(record)
+            if self.log is not None:
+                self.log.append(
+                    record["tstep"],
+                    record["time"],
+                    **{k: [record[k]] for k in self.columns},
+                )
+
+    def _begin_tough(self, tough_time):
+        tought, tstep = tough_time
+        record = self._record(tstep)
+        record["time"] = tought
+        record["_start"] = time.perf_counter()
+
+    def _end_tough(self, tough_time):
+        _, tstep = tough_time
+        record = self._record(tstep)
+        record["_tough_end"] = time.perf_counter(), time.process_time()
+
+    def _begin_flac(self, tough_time):
+        _, tstep = tough_time
+        record = self._record(tstep)
+        if record["_tough_end"] is not None:
+            wall, cpu = record["_tough_end"]
+            record["mechanical"] += time.perf_counter() - wall
+            record["mechanical_cpu"] += time.process_time() - cpu
+
+    def _end_flac(self, tough_time):
+        _, tstep = tough_time
+        record = self._record(tstep)
+        record["bytes_read"] = Snapshot.nbytes_total - record["_nbytes"]
+
+    def _timed_callback(self, phase, func):
+        """Time a Python function."""
+
+        @wraps(func)
+        def wrapper(tough_time):
+            start = time.perf_counter()
+            out = func(tough_time)
+            self._record(tough_time[1])[phase] += time.perf_counter() - start
+
+            return out
+
+        return wrapper
+
+    def _timed_permeability(self, func):
+        """Time a permeability function."""
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            out = func(*args, **kwargs)
+
+            snap = snapshot()
+            record = self._record(snap.tstep)
+            record["permeability"] += time.perf_counter() - start
+            record["bytes_read"] = Snapshot.nbytes_total - record["_nbytes"]
+
+            return out
+
+        return wrapper
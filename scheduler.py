@@ -0,0 +1,350 @@
+from __future__ import division
+
+import atexit
+
+import numpy
+
+from .permeability import snapshot, zone_group
+
+try:
+    import itasca as it
+except ImportError:
+    pass
+
+
+__all__ = [
+    "MechanicalScheduler",
+    "RatioStrategy",
+    "rate_changes",
+]
+
+
+def rate_changes(times, rates, tol=0.0):
+    """
+    Times at which an injection rate changes.
+
+    Parameters
+    ----------
+    times : array_like
+        Times of the rate table (sorted).
+    rates : array_like
+        Rates at each time, shape (ntime,) or (ntime, nsource).
+    tol : scalar, optional, default 0.0
+        Minimum absolute rate change.
+
+    Returns
+    -------
+    array_like
+        Times at which any rate changes by more than tol.
+
+    """
+    times = numpy.asarray(times, dtype=float)
+    rates = numpy.asarray(rates, dtype=float).reshape((len(times), -1))
+
+    change = numpy.abs(numpy.diff(rates, axis=0)).max(axis=1) > tol
+
+    return times[1:][change]
+
+
+class MechanicalScheduler(object):
+    """
+    Adaptive frequency of the mechanical analysis.
+
+    The scheduler skips the FLAC3D mechanical analysis of a coupling step as long as the maximum absolute changes in pore pressure and temperature since the last mechanical analysis stay below thresholds. Skipped increments are merged into the next mechanical analysis, which is forced when:
+
+     - a threshold is reached,
+     - an injection rate changed since the previous step,
+     - max_skip consecutive steps were skipped.
+
+    It must be the first Python function before mechanical analysis.
+
+    Parameters
+    ----------
+    dpp : scalar, optional, default 1.0e5
+        Pore pressure change threshold (Pa).
+    dtemp : scalar or None, optional, default 1.0
+        Temperature change threshold (°C). If `None`, temperature is not checked (non-thermal run).
+    force_times : array_like, optional, default ()
+        Times at which a mechanical analysis is forced (e.g., output of :func:`rate_changes`).
+    max_skip : int or None, optional, default None
+        Maximum number of consecutive skipped steps.
+    log : :class:`ColumnWriter` or None, optional, default None
+        Binary log with columns :attr:`MechanicalScheduler.columns` (one row per step).
+    summary : bool, optional, default False
+        If `True`, print the number of mechanical analyses at exit.
+
+    Example
+    -------
+    >>> scheduler = MechanicalScheduler(dpp=1.0e5, force_times=rate_changes(times, rates, tol=0.01))
+    >>> python_func_tough = (scheduler,) + python_func_tough
+
+    """
+
+    columns = {
+        "solve": "i1",
+        "dpp_max": "f8",
+        "dtemp_max": "f8",
+        "nskip": "i4",
+    }
+
+    def __init__(self, dpp=1.0e5, dtemp=1.0, force_times=(), max_skip=None, log=None, summary=False):
+        self.dpp = dpp
+        self.dtemp = dtemp
+        self.force_times = numpy.sort(numpy.asarray(force_times, dtype=float))
+        self.max_skip = max_skip
+        self.log = log
+
+        self.nstep = 0
+        self.nsolve = 0
+        self.nskip = 0
+        self._active = True
+        self._pp = None
+        self._temp = None
+        self._time = None
+
+        if summary:
+            atexit.register(self.print_summary)
+
+    @property
+    def active(self):
+        """Return `True` if the mechanical analysis of the current step is run."""
+        return self._active
+
+    def __call__(self, tough_time):
+        """Decide whether the mechanical analysis of the current step is run."""
+        time, tstep = tough_time
+        snap = snapshot()
+        pp = snap.pp()
+        temp = snap.temp() if self.dtemp is not None else None
+
+        if self._pp is None:
+            dpp_max = dtemp_max = 0.0
+            solve = True
+
+        else:
+            dpp_max = numpy.abs(pp - self._pp).max()
+            dtemp_max = (
+                numpy.abs(temp - self._temp).max() if temp is not None else 0.0
+            )
+
+            # Rate change within (previous step, current step]
+            i1, i2 = numpy.searchsorted(self.force_times, [self._time, time], side="right")
+
+            solve = (
+                dpp_max >= self.dpp
+                or (temp is not None and dtemp_max >= self.dtemp)
+                or i2 > i1
+                or (self.max_skip is not None and self.nskip >= self.max_skip)
+            )
+
+        if solve:
+            self._pp = pp
+            self._temp = temp
+            self.nsolve += 1
+            self.nskip = 0
+
+        else:
+            self.nskip += 1
+
+        self._set_active(solve)
+        self._time = time
+        self.nstep += 1
+
+        if self.log is not None:
+            self.log.append(
+                tstep,
+                time,
+                solve=[solve],
+                dpp_max=[dpp_max],
+                dtemp_max=[dtemp_max],
+                nskip=[self.nskip],
+            )
+
+    def _set_active(self, active):
+        """Switch mechanical process on or off."""
+        if active != self._active:
+            it.command("model mechanical active {}".format("on" if active else "off"))
+            self._active = active
+
+    def print_summary(self):
+        """Print number of mechanical analyses."""
+        if self.nstep:
+            print(
+                "mechanical analyses: {} / {} steps ({:.1f}% skipped)".format(
+                    self.nsolve,
+                    self.nstep,
+                    100.0 * (self.nstep - self.nsolve) / self.nstep,
+                )
+            )
+
+
+class RatioStrategy(object):
+    """
+    Convergence-aware equilibrium ratio of the mechanical analysis.
+
+    The mechanical analysis of each step starts from the equilibrium state of the previous step, and the number of cycles it takes is recorded. Its equilibrium ratio is chosen per step:
+
+     - max |dpp| since previous mechanical analysis < dpp_small (and failed zones not rising at previous step): relaxed to ratio_max
+     - otherwise: ratio (`mechanical_ratio` of `run`)
+     - failed zones rising after the solve: solved again to ratio_min
+
+    The strategy has two parts: :meth:`before` (last Python function before mechanical analysis) solves relaxed steps itself and switches the mechanical process off so that the solve of `run` returns immediately, and :meth:`after` (first Python function after mechanical analysis) switches it back on, tightens the solution if needed and records the cycles of the step. `run` keeps `mechanical_ratio=ratio` as its default. Pass both parts to :meth:`CouplingProfiler.wrap` so that their solves are timed as mechanical analysis.
+
+    Parameters
+    ----------
+    ratio : scalar, optional, default 1.0e-7
+        Equilibrium ratio of the mechanical solve of `run` (`mechanical_ratio`).
+    ratio_min : scalar, optional, default 1.0e-8
+        Equilibrium ratio when failed zones are rising.
+    ratio_max : scalar, optional, default 1.0e-5
+        Equilibrium ratio when pore pressure increments are small.
+    dpp_small : scalar, optional, default 1.0e4
+        Pore pressure increment threshold (Pa).
+    group : str or None, optional, default None
+        Name of group monitored for failure. If `None`, ratio is never tightened.
+    joint : bool, optional, default False
+        If `True`, use plastic strain of ubiquitous joints.
+    scheduler : :class:`MechanicalScheduler` or None, optional, default None
+        Scheduler of mechanical analyses. Nothing is solved when the scheduler skipped the step.
+    log : :class:`ColumnWriter` or None, optional, default None
+        Binary log with columns :attr:`RatioStrategy.columns` (one row per step).
+    summary : bool, optional, default False
+        If `True`, print the number of mechanical cycles at exit.
+
+    Example
+    -------
+    >>> strategy = RatioStrategy(ratio=mechanical_ratio, group="FAULT", joint=True, scheduler=scheduler)
+    >>> run(
+    ...     mechanical_ratio=mechanical_ratio,
+    ...     **profiler.wrap(
+    ...         permeability_func,
+    ...         (scheduler,) + python_func_tough,
+    ...         python_func_flac,
+    ...         mechanical_tough=(strategy.before,),
+    ...         mechanical_flac=(strategy.after,),
+    ...     ),
+    ... )
+
+    """
+
+    columns = {
+        "ratio": "f8",
+        "cycles": "i8",
+        "dpp_max": "f8",
+        "nfailed": "i8",
+    }
+
+    def __init__(
+        self,
+        ratio=1.0e-7,
+        ratio_min=1.0e-8,
+        ratio_max=1.0e-5,
+        dpp_small=1.0e4,
+        group=None,
+        joint=False,
+        scheduler=None,
+        log=None,
+        summary=False,
+    ):
+        if not ratio_min <= ratio <= ratio_max:
+            raise ValueError("ratios must satisfy ratio_min <= ratio <= ratio_max.")
+
+        self.ratio = ratio
+        self.ratio_min = ratio_min
+        self.ratio_max = ratio_max
+        self.dpp_small = dpp_small
+        self.group = group
+        self.joint = joint
+        self.scheduler = scheduler
+        self.log = log
+
+        self.cycles = {}
+        self._pp = None
+        self._nfailed = None
+        self._rising = False
+        self._step = None
+
+        if summary:
+            atexit.register(self.print_summary)
+
+    def before(self, tough_time):
+        """Choose the equilibrium ratio of the current step, and solve relaxed steps."""
+        self._step = None
+        if self.scheduler is not None and not self.scheduler.active:
+            return
+
+        snap = snapshot()
+        pp = snap.pp()
+        dpp_max = numpy.abs(pp - self._pp).max() if self._pp is not None else numpy.inf
+        self._pp = pp
+
+        ratio = (
+            self.ratio_max
+            if dpp_max < self.dpp_small and not self._rising
+            else self.ratio
+        )
+        self._step = {"cycle": it.cycle(), "ratio": ratio, "dpp_max": dpp_max}
+
+        if ratio != self.ratio:
+            it.command("model solve ratio {:g}".format(ratio))
+            it.command("model mechanical active off")
+            snap.clear()
+
+    def after(self, tough_time):
+        """Tighten the mechanical analysis of the current step if needed, and record its cycles."""
+        time, tstep = tough_time
+        if self._step is None:
+            return
+
+        step, self._step = self._step, None
+        if step["ratio"] != self.ratio:
+            it.command("model mechanical active on")
+
+        snap = snapshot()
+        nfailed = self._failed(snap)
+        ratio = step["ratio"]
+        self._rising = self._nfailed is not None and nfailed > self._nfailed
+        if self._rising:
+            ratio = self.ratio_min
+            it.command("model solve ratio {:g}".format(ratio))
+
+            # Zone state changed within the step
+            snap.clear()
+            nfailed = self._failed(snap)
+        self._nfailed = nfailed
+
+        cycles = it.cycle() - step["cycle"]
+        self.cycles[tstep] = cycles
+
+        if self.log is not None:
+            self.log.append(
+                tstep,
+                time,
+                ratio=[ratio],
+                cycles=[cycles],
+                dpp_max=[step["dpp_max"]],
+                nfailed=[nfailed],
+            )
+
+    def _failed(self, snap):
+        """Number of failed zones in group."""
+        if self.group is None:
+            return 0
+
+        zones = zone_group(snap.in_group(self.group))
+        strain_shear, _ = zones.strain_plastic(self.joint)
+
+        return numpy.count_nonzero(strain_shear > 0.0)
+
+    def print_summary(self):
+        """Print number of mechanical cycles."""
+        if self.cycles:
+            cycles = list(self.cycles.values())
+            print(
+                "mechanical cycles: {} in {} solves (mean {:.0f}, max {})".format(
+                    sum(cycles),
+                    len(cycles),
+                    sum(cycles) / len(cycles),
+                    max(cycles),
+                )
+            )
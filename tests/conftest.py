@@ -0,0 +1,141 @@
+"""
+Fake FLAC3D backend shared by the tests.
+
+`itasca` and `toughflac` are replaced by a fake zone array backend, and the coupling modules of this directory are loaded on top of it as deployed in toughflac.coupling.
+"""
+
+import os
+import sys
+import types
+
+import numpy
+import pytest
+
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+nzone = 500
+
+
+class FakeModel(object):
+    """Zone state of a fake FLAC3D model."""
+
+    def __init__(self, n, seed=42):
+        rng = numpy.random.default_rng(seed)
+        self.n = n
+        self.stress = rng.normal(-8.0e6, 2.0e6, (n, 6))
+        self.pp = rng.uniform(1.0e5, 1.0e6, n)
+        self.extra = {
+            11: numpy.tile([1.0e-17, 1.0e-17, 1.0e-18], (n, 1)),
+            13: numpy.full(n, 0.14),
+            15: self.pp.copy(),
+        }
+        self.props = {}
+        for suffix in ("", "-joint"):
+            self.props["strain-shear-plastic{}".format(suffix)] = numpy.where(rng.random(n) < 0.3, rng.random(n) * 1.0e-3, 0.0)
+            self.props["strain-tensile-plastic{}".format(suffix)] = numpy.where(rng.random(n) < 0.1, rng.random(n) * 1.0e-4, 0.0)
+            self.props["dilation{}".format(suffix)] = numpy.full(n, 10.0)
+        self.groups = {"FAULT": rng.random(n) < 0.2}
+        self.cycle = 0
+        self.pos = rng.uniform(-10.0, 10.0, (n, 3))
+        self.gp_pos = rng.uniform(-10.0, 10.0, (2 * n, 3))
+        self.disp = rng.normal(0.0, 1.0e-3, (2 * n, 3))
+
+
+class FakeZone(object):
+    """Zone object of the per-zone API (it.zone.list())."""
+
+    def __init__(self, model, i):
+        self.model = model
+        self.i = i
+
+    def pp(self):
+        return self.model.pp[self.i]
+
+    def stress_effective(self):
+        s = self.model.stress[self.i]
+        tensor = numpy.array([[s[0], s[3], s[5]], [s[3], s[1], s[4]], [s[5], s[4], s[2]]])
+
+        return tensor + numpy.eye(3) * self.model.pp[self.i]
+
+
+def _module(name, **attrs):
+    module = types.ModuleType(name)
+    module.__path__ = []
+    module.__dict__.update(attrs)
+
+    return module
+
+
+@pytest.fixture
+def model(monkeypatch):
+    """Fake backend and freshly loaded permeability module."""
+    model = FakeModel(nzone)
+
+    za = _module(
+        "itasca.zonearray",
+        stress_flat=lambda: model.stress.copy(),
+        extra=lambda i: model.extra[i].copy(),
+        set_extra=lambda i, values: model.extra.__setitem__(i, numpy.array(values, dtype=float)),
+        prop_scalar=lambda name: model.props[name].copy(),
+        in_group=lambda name: model.groups[name].copy(),
+        temp=lambda: numpy.full(model.n, 20.0),
+        pos=lambda: model.pos.copy(),
+    )
+    gpa = _module(
+        "itasca.gridpointarray",
+        pos=lambda: model.gp_pos.copy(),
+        disp=lambda: model.disp.copy(),
+    )
+    it = _module(
+        "itasca",
+        zonearray=za,
+        gridpointarray=gpa,
+        zone=types.SimpleNamespace(list=lambda: [FakeZone(model, i) for i in range(model.n)]),
+        cycle=lambda: model.cycle,
+        command=lambda command: None,
+    )
+    tza = _module(
+        "toughflac.zonearray",
+        pp=lambda: model.pp.copy(),
+        permeability=lambda: model.extra[11].copy(),
+        porosity=lambda: model.extra[13].copy(),
+        strain_vol=lambda: model.props["strain-shear-plastic"].copy(),
+    )
+    utils = _module(
+        "toughflac.utils",
+        normal_stress=lambda stress, n: numpy.einsum("ijk, j, k -> i", stress, n, n),
+    )
+    io = _module("toughflac.coupling.io", tstep=1)
+    coupling = _module("toughflac.coupling", io=io)
+    toughflac = _module("toughflac", zonearray=tza, utils=utils, coupling=coupling)
+    for name, module in {
+        "itasca": it,
+        "itasca.zonearray": za,
+        "itasca.gridpointarray": gpa,
+        "toughflac": toughflac,
+        "toughflac.zonearray": tza,
+        "toughflac.utils": utils,
+        "toughflac.coupling": coupling,
+        "toughflac.coupling.io": io,
+    }.items():
+        monkeypatch.setitem(sys.modules, name, module)
+
+    def load(name, *filenames):
+        """Load coupling modules of this directory as toughflac.coupling.<name>."""
+        source = ""
+        for filename in filenames:
+            with open(os.path.join(root, filename)) as f:
+                source += f.read() + "\n"
+
+        module = types.ModuleType("toughflac.coupling.{}".format(name))
+        module.__package__ = "toughflac.coupling"
+        monkeypatch.setitem(sys.modules, module.__name__, module)
+        exec(compile(source, filenames[0], "exec"), module.__dict__)
+
+        return module
+
+    model.io = io
+    model.load = load
+    model.module = load("permeability", "permeability.py", "permeability_update_rinaldi.py")
+
+    return model
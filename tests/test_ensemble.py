@@ -0,0 +1,59 @@
+"""
+Ensemble runner with stub solver.
+"""
+
+import json
+import os
+import sys
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root)
+
+from ensemble import Ensemble, parameter_grid, stub_command  # noqa: E402
+
+
+def test_ensemble_stub(tmp_path):
+    template = tmp_path / "template"
+    (template / "f3out").mkdir(parents=True)
+    (template / "INFILE_coupled").write_text("infile")
+    (template / "SAVE").write_text("save")
+    (template / "rinaldi2019_init.npz").write_text("init")
+    (tmp_path / "flac3d.py").write_text("script")
+
+    grid = parameter_grid(br=[10e-6, 20e-6], k0_fault=[[5.0e-17, 5.0e-17, 1.0e-17]])
+    ensemble = Ensemble(
+        root=str(tmp_path / "ensemble"),
+        template=str(template),
+        grid=grid,
+        files={str(tmp_path / "flac3d.py"): "flac3d.py"},
+        n_concurrent=2,
+        n_threads_total=8,
+        command=stub_command(0.0),
+    )
+    index = ensemble.run()
+
+    with open(str(tmp_path / "ensemble" / "index.json")) as f:
+        assert json.load(f) == index
+
+    assert sorted(index) == ["run_0000", "run_0001"]
+    for name, parameters in zip(sorted(index), grid):
+        rundir = tmp_path / "ensemble" / name
+        expected = dict(parameters, n_threads=4, logdir=".")
+
+        # Template is copied without its outputs
+        assert sorted(os.listdir(str(rundir))) == ["INFILE_coupled", "f3out", "flac3d.py", "parameters.json", "run.log"]
+        with open(str(rundir / "parameters.json")) as f:
+            assert json.load(f) == expected
+        with open(str(rundir / "f3out" / "stub.json")) as f:
+            assert json.load(f) == expected
+
+        run = index[name]
+        assert run["status"] == "done"
+        assert run["returncode"] == 0
+        assert run["parameters"] == expected
+        assert run["rundir"] == str(rundir)
+        assert run["outputs"] == ["f3out/stub.json", "run.log"]
+
+    # Completed members are not run again
+    ensemble = Ensemble(str(tmp_path / "ensemble"), str(template), grid, command=stub_command(0.0))
+    assert ensemble.run() == index
@@ -0,0 +1,78 @@
+"""
+GENER writer and rate table compression.
+"""
+
+import os
+import sys
+
+import numpy
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root)
+
+from gener_writer import compress_rates, rate_matrix, well_distribution, write_gener  # noqa: E402
+
+
+def test_write_gener_shared(tmp_path):
+    labels = ["INJ{:02d}".format(i) for i in range(10)]
+    times = numpy.linspace(0.0, 1.0e5, 50)
+    rates = 2.0 + numpy.sin(times)
+
+    # Same volumes up to noise below written precision, except one cell
+    volumes = numpy.ones(10) + 1.0e-12 * numpy.arange(10)
+    volumes[5] = 2.0
+    sources = {"COM11": rate_matrix(well_distribution(volumes), rates)}
+
+    write_gener(str(tmp_path / "GENER"), labels, times, sources)
+    write_gener(str(tmp_path / "GENER_shared"), labels, times, sources, shared=True)
+
+    def records(filename):
+        out = {}
+        with open(str(tmp_path / filename)) as f:
+            for line in f.read().splitlines()[1:-1]:
+                if line.startswith("INJ"):
+                    table = out[line[:20]] = []
+                else:
+                    table.append(line)
+
+        return out
+
+    written = records("GENER")
+    shared = records("GENER_shared")
+    assert list(shared) == ["INJ00         4    1", "INJ05               ", "INJ06         3    1"]
+    assert shared["INJ00         4    1"] == written["INJ00               "]
+    assert shared["INJ05               "] == written["INJ05               "]
+
+
+def replay_step(times, rates, times_c, rates_c):
+    """Relative rate and cumulative mass errors of a reduced table with step rates (MOP(12) = 2)."""
+    rates_r = rates_c[numpy.searchsorted(times_c, times[:-1], side="right") - 1]
+    dt = numpy.diff(times)[:, None]
+    dm = numpy.cumsum((rates_r - rates[:-1]) * dt, axis=0)
+
+    return (
+        (numpy.abs(rates_r - rates[:-1]).max(axis=0) / numpy.abs(rates).max(axis=0)).max(),
+        (numpy.abs(dm).max(axis=0) / (numpy.abs(rates[:-1]) * dt).sum(axis=0)).max(),
+    )
+
+
+def test_compress_rates_step():
+    data = numpy.genfromtxt(
+        os.path.join(root, "injection_rates", "filtered_FSC_injecrates.csv"),
+        delimiter=",",
+        skip_header=1,
+        usecols=(5, 2, 3),  # TimeElapsed, net flow cor [kg/s], CO2 rate [kg/s]
+    )
+    times, rates = data[:, 0], data[:, 1:]
+
+    times_c, rates_c, errors = compress_rates(times, rates, mass_tol=1.0e-3, rate_tol=1.0e-2)
+    rate_error, mass_error = replay_step(times, rates, times_c, rates_c)
+    assert len(times_c) < len(times)
+    assert times_c[0] == times[0] and times_c[-1] == times[-1]
+    assert rate_error <= 1.0e-2 and mass_error <= 1.0e-3
+    assert numpy.isclose(errors["rate"], rate_error) and numpy.isclose(errors["mass"], mass_error)
+    assert errors["mass_final"] < 1.0e-12
+
+    # Linear simplification does not hold with step rates
+    times_c, rates_c, _ = compress_rates(times, rates, mass_tol=1.0e-3, rate_tol=1.0e-2, interpolation="linear")
+    assert replay_step(times, rates, times_c, rates_c)[0] > 1.0e-2
@@ -0,0 +1,114 @@
+"""
+History sampler.
+"""
+
+import numpy
+import pytest
+
+
+@pytest.fixture
+def history(model):
+    model.load("monitor", "monitor.py")
+
+    return model.load("history", "history.py")
+
+
+def sample(model, sampler, tsteps):
+    for tstep in tsteps:
+        model.io.tstep = tstep
+        model.pp += 1.0e3
+        sampler((0.1 * tstep, tstep))
+
+
+def read(path):
+    with open(path) as f:
+        header = f.readline().strip().split(",")
+
+    return header, numpy.loadtxt(path, delimiter=",", skiprows=1, ndmin=2)
+
+
+@pytest.mark.parametrize("kdtree", [False, True])
+def test_history_resolution(model, history, tmp_path, monkeypatch, kdtree):
+    if kdtree:
+        pytest.importorskip("scipy.spatial")
+    else:
+        monkeypatch.setattr(history, "cKDTree", None)
+
+    zones, gridpoints = [3, 17, 250], [5, 999]
+    hist = {
+        "h1": {"pp": (model.pos[zones] + 1.0e-3).tolist()},
+        "h2": {"disp_z": (model.gp_pos[gridpoints] - 1.0e-3).tolist()},
+    }
+    sampler = history.HistorySampler(hist, savedir=str(tmp_path))
+    sample(model, sampler, [1])
+    sampler.flush()
+
+    header, data = read(str(tmp_path / "h1.csv"))
+    assert header == ["tstep", "time", "pp_1", "pp_2", "pp_3"]
+    assert numpy.allclose(data[0, 2:], model.pp[zones])
+
+    header, data = read(str(tmp_path / "h2.csv"))
+    assert header == ["tstep", "time", "disp_z_1", "disp_z_2"]
+    assert numpy.allclose(data[0, 2:], model.disp[gridpoints, 2])
+
+
+def test_history_values(model, history, tmp_path):
+    izone, igp = 42, 7
+    point = model.pos[izone].tolist()
+    attributes = ["pp", "temp", "stress_xx", "stress_yy", "stress_zz", "stress_xy", "stress_yz", "stress_xz"]
+    attributes += ["stress_prin_x", "stress_prin_y", "stress_prin_z"]
+    hist = {"h": {attribute: [point] for attribute in attributes}}
+    hist["h"].update({"disp_{}".format(x): [model.gp_pos[igp].tolist()] for x in "xyz"})
+
+    sampler = history.HistorySampler(hist, savedir=str(tmp_path), flush_every=None)
+    pp = []
+    for tstep in [1, 2]:
+        sample(model, sampler, [tstep])
+        pp.append(model.pp[izone])
+    sampler.flush()
+
+    _, data = read(str(tmp_path / "h.csv"))
+    assert numpy.array_equal(data[:, 0], [1, 2])
+    assert numpy.allclose(data[:, 1], [0.1, 0.2])
+    assert numpy.allclose(data[:, 2], pp)
+    assert numpy.allclose(data[:, 3], 20.0)
+    assert numpy.allclose(data[:, 4:10], model.stress[izone])
+
+    s = model.stress[izone]
+    tensor = numpy.array([[s[0], s[3], s[5]], [s[3], s[1], s[4]], [s[5], s[4], s[2]]])
+    assert numpy.allclose(data[:, 10:13], numpy.linalg.eigvalsh(tensor))
+    assert numpy.allclose(data[:, 13:16], model.disp[igp])
+
+
+def test_history_restart(model, history, tmp_path):
+    hist = {"h": {"pp": [model.pos[0].tolist()]}}
+    path = str(tmp_path / "h.csv")
+
+    sampler = history.HistorySampler(hist, savedir=str(tmp_path), flush_every=2)
+    sample(model, sampler, [1, 2, 3, 4, 5])
+    sampler.flush()
+
+    # Interrupted flush: last row partially written
+    with open(path, "a") as f:
+        f.write("6,6.0000")
+
+    # Restart from step 4, previous output of steps 4 and 5 is discarded
+    pp = model.pp[0]
+    sampler = history.HistorySampler(hist, savedir=str(tmp_path), flush_every=2)
+    sample(model, sampler, [4, 5, 6])
+    sampler.flush()
+
+    header, data = read(path)
+    assert header == ["tstep", "time", "pp_1"]
+    assert numpy.array_equal(data[:, 0], [1, 2, 3, 4, 5, 6])
+    assert numpy.allclose(data[3:, 2], pp + 1.0e3 * numpy.arange(1, 4))
+
+    # No append: existing output is discarded
+    sampler = history.HistorySampler(hist, savedir=str(tmp_path), append=False)
+    sample(model, sampler, [7])
+    sampler.flush()
+    assert numpy.array_equal(read(path)[1][:, 0], [7])
+
+    # Other columns
+    with pytest.raises(ValueError):
+        history._csv_size(path, "tstep,time,temp_1\n", 8)
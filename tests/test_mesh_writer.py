@@ -0,0 +1,107 @@
+"""
+Cached mesh geometry.
+"""
+
+import os
+import sys
+import types
+
+import numpy
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root)
+
+import mesh_writer  # noqa: E402
+
+
+def fake_mesh(materials):
+    """Stand-in for a toughio mesh of two hexahedra."""
+    return types.SimpleNamespace(
+        points=numpy.arange(36, dtype=float).reshape((12, 3)),
+        cells=[types.SimpleNamespace(type="hexahedron", data=numpy.array([[0, 1, 2, 3, 4, 5, 6, 7], [4, 5, 6, 7, 8, 9, 10, 11]]))],
+        labels=numpy.array(["AAA00", "AAA01"]),
+        materials=numpy.array(materials),
+    )
+
+
+def test_cached_geometry(tmp_path, monkeypatch):
+    geometry = mesh_writer.MeshGeometry.read(os.path.join(root, "coarse_model", "injection_model", "MESH"))
+    calls = []
+
+    def from_mesh(mesh):
+        calls.append(mesh)
+        return geometry
+
+    monkeypatch.setattr(mesh_writer.MeshGeometry, "from_mesh", from_mesh)
+    filename = str(tmp_path / "geometry.npz")
+
+    mesh_writer.cached_geometry(fake_mesh(["CLAY", "FAULT"]), filename)
+    cached = mesh_writer.cached_geometry(fake_mesh(["CLAY", "FAULT"]), filename)
+    assert len(calls) == 1
+    assert numpy.array_equal(cached.connections, geometry.connections)
+
+    # Other materials (e.g., add_material not called) invalidate the cache
+    mesh_writer.cached_geometry(fake_mesh(["1", "3"]), filename)
+    assert len(calls) == 2
+
+
+def last_digit(field):
+    """Unit of the last digit written in a field."""
+    mantissa, _, exponent = field.strip().partition("e")
+    decimals = len(mantissa.partition(".")[2])
+
+    return 10.0 ** (int(exponent or 0) - decimals)
+
+
+def test_format_fixed():
+    numpy.random.seed(42)
+    values = numpy.random.uniform(-1.0, 1.0, 2000) * 10.0 ** numpy.random.uniform(-120.0, 120.0, 2000)
+    values = numpy.concatenate((
+        values,
+        [0.0, -0.0, 1.0, -1.0, 0.01, -0.01, 1.0e-3, 1.0e-9, 1.0e50, 123456789.0, -12345678.0, 1.0e10],
+        [1.0e-100, -1.0e-100, 1.0e150, -1.0e150, 1.0e300, -1.0e-300, 2.2250738585072014e-308],
+        [9.9999999, -9.9999999, 99.999999, 9.99999999e-5, -9.99999999e-5, 9.999999999e99, 0.099999999999],
+    ))
+
+    fields = mesh_writer.format_fixed(values)
+    assert fields.shape == (len(values), 10)
+
+    for value, field in zip(values, fields):
+        field = field.tobytes().decode()
+        assert len(field) == 10
+        assert abs(float(field) - value) <= 0.5 * last_digit(field) * (1.0 + 1.0e-9), (value, field)
+
+        # At least as many significant digits as the shortest scientific notation
+        reference = mesh_writer._format_value(value, 10)
+        assert last_digit(field) <= last_digit(reference) * (1.0 + 1.0e-9), (value, field, reference)
+
+    # Rounding carry to the next power of ten
+    values = [9.9999999, -9.9999999, 9.99999999e-5, -9.99999999e-5, 9.999999999e99, 0.099999999999, 99999999.99]
+    expected = [b"9.99999990", b"-9.9999999", b"1.00000e-4", b"-1.0000e-4", b"1.0000e100", b"0.10000000", b"1.000000e8"]
+    assert [field.tobytes() for field in mesh_writer.format_fixed(values)] == expected
+
+    # NaN as blanks
+    assert mesh_writer.format_fixed([numpy.nan]).tobytes() == b" " * 10
+    assert numpy.isnan(mesh_writer._parse_float(numpy.array([b" " * 10]))[0])
+
+
+def test_mesh_roundtrip(tmp_path):
+    filename = os.path.join(root, "coarse_model", "coupled_model", "MESH")
+    geometry = mesh_writer.MeshGeometry.read(filename)
+    assert len(geometry.labels) and len(geometry.connections)
+
+    geometry.write(str(tmp_path / "MESH"))
+    written = mesh_writer.MeshGeometry.read(str(tmp_path / "MESH"))
+
+    for k in ("labels", "materials", "connections", "isot"):
+        assert numpy.array_equal(getattr(written, k), getattr(geometry, k)), k
+
+    for k in ("volumes", "centers", "distances", "areas", "betax"):
+        assert numpy.allclose(getattr(written, k), getattr(geometry, k), rtol=1.0e-6, atol=0.0, equal_nan=True), k
+
+    # ELEME and CONNE records are 80 characters
+    with open(str(tmp_path / "MESH")) as f:
+        lines = f.read().splitlines()
+    assert lines[0] == mesh_writer.eleme_header.rstrip()
+    assert all(len(line) == 80 for line in lines if line)
+    assert len(lines) == len(geometry.labels) + len(geometry.connections) + 4
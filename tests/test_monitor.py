@@ -0,0 +1,131 @@
+"""
+Binary column output and plane monitor.
+"""
+
+import numpy
+import pytest
+
+
+@pytest.fixture
+def monitor(model):
+    return model.load("monitor", "monitor.py")
+
+
+def write_steps(writer, tsteps):
+    for tstep in tsteps:
+        writer.append(tstep, 0.1 * tstep, zone_id=[tstep, tstep], pp=[1.0 * tstep, 2.0 * tstep])
+
+
+def test_column_writer_flush(monitor, tmp_path):
+    path = str(tmp_path / "out")
+    writer = monitor.ColumnWriter(path, {"zone_id": "i8", "pp": "f8"}, flush_every=2)
+    write_steps(writer, [1, 2, 3])
+
+    # Third step is still buffered
+    assert numpy.array_equal(monitor.read_columns(path)["tstep"], [1, 1, 2, 2])
+
+    writer.flush()
+    assert numpy.array_equal(monitor.read_columns(path)["tstep"], [1, 1, 2, 2, 3, 3])
+
+
+def test_column_writer_restart(monitor, tmp_path):
+    path = str(tmp_path / "out")
+    writer = monitor.ColumnWriter(path, {"zone_id": "i8", "pp": "f8"})
+    write_steps(writer, [1, 2, 3, 4])
+    writer.flush()
+
+    # Interrupted flush: rows not referenced by the index
+    with open(str(tmp_path / "out" / "pp.bin"), "ab") as f:
+        numpy.zeros(3).tofile(f)
+
+    # Run restarted from step 3, existing output is kept up to step 2
+    writer = monitor.ColumnWriter(path, {"zone_id": "i8", "pp": "f8"})
+    assert numpy.array_equal(monitor.read_columns(path)["tstep"], [1, 1, 2, 2, 3, 3, 4, 4])
+    write_steps(writer, [3, 4, 5])
+    writer.flush()
+
+    out = monitor.read_columns(path)
+    assert numpy.array_equal(out["tstep"], [1, 1, 2, 2, 3, 3, 4, 4, 5, 5])
+    assert numpy.array_equal(out["pp"], [1.0, 2.0, 2.0, 4.0, 3.0, 6.0, 4.0, 8.0, 5.0, 10.0])
+    assert numpy.array_equal(monitor.read_columns(path, start=4, columns=["zone_id"])["zone_id"], [4, 4, 5, 5])
+
+    # New run
+    writer = monitor.ColumnWriter(path, {"zone_id": "i8", "pp": "f8"}, append=False)
+    assert monitor.read_columns(path)["tstep"].size == 0
+
+    with pytest.raises(ValueError):
+        monitor.ColumnWriter(path, {"zone_id": "i4"})
+
+
+def test_plane_monitor(model, monitor, tmp_path):
+    init_file = str(tmp_path / "plane_init.npz")
+    normal = [0.0, 0.0, 1.0]
+    fault = numpy.flatnonzero(model.groups["FAULT"])
+
+    # Zones in tension on the plane
+    model.stress[fault[:5], 2] = 1.0e7
+    plane = monitor.PlaneMonitor(
+        [("FAULT", normal, None)],
+        extra_index={"slip_tendency": 41},
+        top_k=10,
+        window=2,
+        init_file=init_file,
+    )
+    model.extra[41] = numpy.zeros(model.n)
+    for tstep in (1, 2, 3):
+        model.io.tstep = tstep
+        model.cycle += 1
+        plane((0.1 * tstep, tstep))
+
+    result = plane.results[0]
+    tension = result["sn"] <= 0.0
+    assert tension.sum() == 5
+    assert numpy.isnan(result["slip_tendency"][tension]).all()
+    assert numpy.isnan(model.extra[41][fault[:5]]).all()
+
+    summary = plane.summaries[-1]["slip_tendency"]
+    assert len(plane.summaries) == 2
+    assert summary["value"].size == 10 and numpy.isfinite(summary["value"]).all()
+    assert summary["value"][0] == numpy.nanmax(result["slip_tendency"])
+    assert numpy.allclose(result["dcfs"], 0.0)
+
+    # Restarted run keeps the reference stresses of the first step
+    model.stress[fault, 5] += 1.0e6
+    model.cycle += 1
+    plane = monitor.PlaneMonitor([("FAULT", normal, None)], init_file=init_file)
+    plane((0.4, 4))
+    assert (plane.results[0]["dcfs"] != 0.0).any()
+
+    with pytest.raises(ValueError):
+        monitor.PlaneMonitor([("FAULT", normal, None)], init_file=str(tmp_path / "missing.npz"))((0.4, 4))
+
+
+def test_principal_stresses(monitor):
+    rng = numpy.random.default_rng(0)
+    n = 1000
+
+    # Random tensors, rotated tensors with double and triple (isotropic) eigenvalues, and near-degenerate tensors
+    a = rng.normal(-1.0e7, 5.0e6, (n, 3, 3))
+    rotation, _ = numpy.linalg.qr(rng.normal(size=(4 * n, 3, 3)))
+    values = rng.normal(-1.0e7, 5.0e6, (4 * n, 3))
+    values[:n, 1] = values[:n, 0]
+    values[n : 2 * n, 1] = values[n : 2 * n, 2]
+    values[2 * n : 3 * n] = values[2 * n : 3 * n, :1]
+    values[3 * n :, 1:] = values[3 * n :, :1] * (1.0 + rng.normal(0.0, 1.0e-9, (n, 2)))
+    stress = numpy.concatenate((
+        0.5 * (a + a.transpose(0, 2, 1)),
+        numpy.einsum("nij, nj, nkj -> nik", rotation, values, rotation),
+        numpy.zeros((1, 3, 3)),
+        numpy.eye(3)[None] * -5.0e6,
+    ))
+
+    out = monitor.principal_stresses(stress)
+    ref = numpy.linalg.eigvalsh(stress)
+    # Double eigenvalues are only accurate to about sqrt(machine epsilon) with the trigonometric formula
+    scale = numpy.abs(stress).max(axis=(1, 2), keepdims=True)[:, 0]
+    assert numpy.all(numpy.abs(out - ref) <= 1.0e-6 * numpy.maximum(scale, 1.0))
+    assert numpy.all(numpy.diff(out, axis=1) >= -1.0e-6 * scale)
+
+    # Exact for isotropic tensors
+    assert numpy.array_equal(out[-1], [-5.0e6] * 3)
+    assert numpy.array_equal(out[-2], [0.0] * 3)
@@ -0,0 +1,283 @@
+"""
+Bulk zone array reads of permeability models against the baseline per-zone formulas.
+
+FLAC3D is not required, see the fake backend in conftest.py.
+"""
+
+import sys
+
+import numpy
+import pytest
+
+
+def close(a, b):
+    """Relative comparison (permeabilities are far below default absolute tolerance)."""
+    return numpy.allclose(a, b, rtol=1.0e-10, atol=0.0)
+
+
+def baseline_pp(model, group):
+    return numpy.array([z.pp() for z, g in zip(sys.modules["itasca"].zone.list(), group) if g])
+
+
+def baseline_stress_effective(model, group):
+    return numpy.array([-z.stress_effective() for z, g in zip(sys.modules["itasca"].zone.list(), group) if g])
+
+
+def baseline_stress_tensor(stresses):
+    return numpy.array([
+        [[s[0], s[3], s[5]], [s[3], s[1], s[4]], [s[5], s[4], s[2]]]
+        for s in stresses
+    ])
+
+
+def test_stress_effective(model):
+    group = model.groups["FAULT"]
+    zones = model.module.zone_group(group)
+
+    assert close(zones.pp(), baseline_pp(model, group))
+    assert close(zones.stress_effective(), baseline_stress_effective(model, group))
+
+
+def test_rutqvist2002(model):
+    group = model.groups["FAULT"]
+    k0, phi0, phir, ke, phie = 1.0e-16, 0.12, 0.0, 22.2, 5.0e-8
+    k, phi = model.module.rutqvist2002(group, k0, phi0, phir=phir, ke=ke, phie=phie)
+
+    stress_mean = model.stress[group, :3].mean(axis=1) + baseline_pp(model, group)
+    phi_ref = (phi0 - phir) * numpy.exp(phie * stress_mean) + phir
+    k_ref = numpy.full((group.sum(), 3), k0) * numpy.exp(ke * (phi_ref / phi0 - 1.0))[:, None]
+
+    assert close(phi, phi_ref)
+    assert close(k, k_ref)
+
+
+def test_hsiung2005(model):
+    group = model.groups["FAULT"]
+    k0, phi0, n, psi, a, sig0 = 1.0e-17, 0.12, numpy.array([0.47, -0.60, 0.64]), 10.0, 1.0e-6, 1.0e6
+    k, phi = model.module.hsiung2005(group, k0, phi0, n=n, psi=psi, a=a, sig0=sig0, joint=True)
+
+    strain_shear = model.props["strain-shear-plastic-joint"][group]
+    strain_tensile = model.props["strain-tensile-plastic-joint"][group]
+    sig = numpy.einsum("ijk, j, k -> i", baseline_stress_effective(model, group), n, n)
+    br = (12.0 * k0 / phi0) ** 0.5
+    dphi = strain_tensile + strain_shear * numpy.tan(numpy.deg2rad(psi))
+    disc = numpy.sqrt(1.0 + 4.0 * sig0 * a / br)
+    kf = [
+        a / (c * (1.0 + c * sig) * br) + dphi / phi0
+        for c in (0.5 * (-1.0 + disc) / sig0, 0.5 * (-1.0 - disc) / sig0)
+    ]
+    k_ref = numpy.minimum(numpy.abs(numpy.maximum(k0 * kf[0] ** 3, k0 * kf[1] ** 3)), 5.0e-13)
+
+    assert close(phi, phi0 + dphi)
+    assert close(k, numpy.tile(k_ref[:, None], (1, 3)))
+
+
+@pytest.mark.parametrize("fused", [False, True])
+def test_rinaldi2019(model, fused):
+    group = model.groups["FAULT"]
+    n_vector = numpy.array([0.47, -0.60, 0.64])
+    params = dict(n=1, w=2.4, br=20.0e-6, bmax=60.0e-6, alpha=1.5, n_vector=n_vector, joint=True, fused=fused)
+    model.module.rinaldi2019(group, 1.0e-17, 0.14, **params)
+
+    # Second step with perturbed stress and pore pressure
+    eff_n_stress_init = numpy.einsum("ijk, j, k -> i", -baseline_stress_tensor(model.stress), n_vector, n_vector) - model.extra[15]
+    model.stress *= 1.1
+    model.extra[15] *= 1.2
+    model.io.tstep = 2
+    k, phi = model.module.rinaldi2019(group, 1.0e-17, 0.14, **params)
+
+    strain_shear = model.props["strain-shear-plastic-joint"][group]
+    strain_tensile = model.props["strain-tensile-plastic-joint"][group]
+    tan_psi = numpy.tan(numpy.deg2rad(model.props["dilation-joint"][group]))
+    eff_n_stress = numpy.einsum("ijk, j, k -> i", -baseline_stress_tensor(model.stress[group]), n_vector, n_vector) - model.extra[15][group]
+    alpha = params["alpha"] / 1.0e6
+    bi = params["br"] + params["bmax"] * numpy.exp(-alpha * eff_n_stress_init[group])
+    b = (
+        params["br"]
+        + params["bmax"] * numpy.exp(-alpha * eff_n_stress)
+        + strain_shear * tan_psi / (params["n"] / params["w"])
+        + strain_tensile * params["w"]
+    )
+    k_ref = numpy.clip(model.extra[11][group] * ((b / bi) ** 3)[:, None], None, 5.0e-12)
+
+    assert close(phi, model.extra[13][group] + strain_tensile + strain_shear * tan_psi)
+    assert close(k, k_ref)
+
+
+def test_diagnostics(model, capsys):
+    module = model.module
+    group = model.groups["FAULT"]
+    records = []
+    module.diagnostics.update(level=1, every=2, hook=lambda name, tstep, record: records.append((name, tstep, record)))
+
+    hsiung2005 = dict(n=numpy.array([0.47, -0.60, 0.64]), psi=10.0, a=1.0e-6, sig0=1.0e6, joint=True)
+    nuus2025 = dict(a=100.0, k_jump_factor=10.0)
+    for tstep in [1, 2, 3]:
+        model.io.tstep = tstep
+        module.hsiung2005(group, 1.0e-17, 0.12, **hsiung2005)
+        module.nuus2025(group, 1.0e-17, 0.14, **nuus2025)
+
+    # Emitted every 2 steps
+    assert [(name, tstep) for name, tstep, _ in records] == [("hsiung2005", 1), ("nuus2025", 1), ("hsiung2005", 3), ("nuus2025", 3)]
+    assert list(records[0][2]) == ["zones", "k max", "k 2nd max", "k min", "pp max (MPa)"]
+    assert list(records[1][2]) == ["zones", "failed zones", "k 2nd max", "k min (failed)", "pp max (MPa)"]
+
+    # Zone values at 2nd max permeability
+    records.clear()
+    module.diagnostics["level"] = 2
+    k, _ = module.hsiung2005(group, 1.0e-17, 0.12, **hsiung2005)
+    _, _, record = records.pop()
+    k_sorted = numpy.sort(k[:, 0])
+    i = record["index (2nd max k)"]
+    assert record["zones"] == group.sum()
+    assert record["k max"][0] == k_sorted[-1] and record["k 2nd max"][0] == k_sorted[-2] and record["k min"][0] == k_sorted[0]
+    assert k[i, 0] == k_sorted[-2]
+    assert close(record["pp max (MPa)"], model.pp[group].max() * 1.0e-6)
+    assert close(record["strain_shear @2nd max"], model.props["strain-shear-plastic-joint"][group][i])
+
+    k, _ = module.nuus2025(group, 1.0e-17, 0.14, **nuus2025)
+    _, _, record = records.pop()
+    failed = model.props["strain-shear-plastic"][group] > 0.0
+    assert record["failed zones"] == failed.sum()
+    assert record["k min (failed)"][0] == k[failed, 0].min()
+    assert k[record["index (min k failed)"], 0] == k[failed, 0].min()
+    assert k[record["index (2nd max k)"], 0] == numpy.sort(k[:, 0])[-2]
+
+    # Printed without hook, nothing when off
+    module.diagnostics["hook"] = None
+    module.nuus2025(group, 1.0e-17, 0.14, **nuus2025)
+    assert "=== nuus2025 diagnostics (tstep=3) ===" in capsys.readouterr().out
+    module.diagnostics["level"] = 0
+    module.nuus2025(group, 1.0e-17, 0.14, **nuus2025)
+    assert capsys.readouterr().out == ""
+
+
+def test_incremental(model):
+    module = model.module
+    group = model.groups["FAULT"]
+    index = numpy.flatnonzero(group)
+    strain = model.props["strain-shear-plastic"]
+    params = dict(a=100.0, k_jump_factor=10.0, incremental=True, tol_strain=1.0e-6)
+    k1, phi1 = module.nuus2025(group, 1.0e-17, 0.14, **params)
+
+    # Zone 0 changes below tolerance, zone 1 above
+    i0, i1 = numpy.flatnonzero(strain[group] == 0.0)[:2]
+    strain[index[i0]] += 5.0e-7
+    strain[index[i1]] += 1.0e-5
+    model.io.tstep = 2
+    k2, _ = module.nuus2025(group, 1.0e-17, 0.14, **params)
+    assert numpy.array_equal(module.updated_zones(group), [index[i1]])
+
+    k_ref, _ = module.nuus2025(group, 1.0e-17, 0.14, **dict(params, incremental=False))
+    assert numpy.array_equal(k2[i0], k1[i0]) and not close(k_ref[i0], k1[i0])
+    assert close(k2[i1], k_ref[i1]) and not close(k2[i1], k1[i1])
+    mask = numpy.ones(len(index), dtype=bool)
+    mask[[i0, i1]] = False
+    assert numpy.array_equal(k2[mask], k1[mask])
+
+    # New parameters: all zones are recomputed
+    k3, _ = module.nuus2025(group, 1.0e-17, 0.14, **dict(params, a=200.0))
+    assert numpy.array_equal(module.updated_zones(group), index)
+
+    k_ref, _ = module.nuus2025(group, 1.0e-17, 0.14, **dict(params, a=200.0, incremental=False))
+    assert close(k3, k_ref)
+
+
+def test_snapshot_invalidation(model):
+    snapshot = model.module.snapshot
+    pp = snapshot().pp()
+
+    # Same step and cycle: memoized
+    model.pp += 1.0
+    assert snapshot().pp() is pp
+
+    # Mechanical solve within the step
+    model.cycle += 10
+    assert close(snapshot().pp(), model.pp)
+
+    # Zone arrays written by a Python function
+    model.extra[41] = numpy.zeros(model.n)
+    assert not snapshot().extra(41).any()
+    model.extra[41] = numpy.ones(model.n)
+    snapshot().clear(("extra", 41))
+    assert snapshot().extra(41).all()
+
+    # New coupling step
+    model.pp += 1.0
+    model.io.tstep += 1
+    assert close(snapshot().pp(), model.pp)
+
+
+def test_rinaldi2019_restart(model, tmp_path):
+    group = model.groups["FAULT"]
+    init_file = str(tmp_path / "rinaldi2019_init.npz")
+    params = dict(n=1, w=2.4, br=20.0e-6, bmax=60.0e-6, alpha=1.5, n_vector=numpy.array([0.47, -0.60, 0.64]), joint=True)
+    k, phi = model.module.rinaldi2019(group, 1.0e-17, 0.14, init_file=init_file, **params)
+
+    # Restarted run (new process) with coupling time step reset to 1: saved state is kept
+    model.module._rinaldi2019_init.clear()
+    k_restart, phi_restart = model.module.rinaldi2019(group, 1.0e-17, 0.14, init_file=init_file, **params)
+    assert close(k_restart, k) and close(phi_restart, phi)
+
+    model.module._rinaldi2019_init.clear()
+    model.stress *= 0.1
+    model.io.tstep = 5
+    k_restart, _ = model.module.rinaldi2019(group, 1.0e-17, 0.14, init_file=init_file, **params)
+    assert not close(k_restart, k)
+
+    # New reference state only on request
+    model.module._rinaldi2019_init.clear()
+    model.io.tstep = 1
+    k_new, _ = model.module.rinaldi2019(group, 1.0e-17, 0.14, init_file=init_file, overwrite_init=True, **params)
+    assert not close(k_new, k_restart)
+
+    model.module._rinaldi2019_init.clear()
+    model.io.tstep = 6
+    k_restart, _ = model.module.rinaldi2019(group, 1.0e-17, 0.14, init_file=init_file, **params)
+    assert close(k_restart, k_new)
+
+    # Missing state of a restarted run
+    model.module._rinaldi2019_init.clear()
+    model.io.tstep = 2
+    with pytest.raises(ValueError):
+        model.module.rinaldi2019(group, 1.0e-17, 0.14, init_file=str(tmp_path / "missing.npz"), **params)
+
+    # Initial state saved for another fault orientation
+    model.module._rinaldi2019_init.clear()
+    with pytest.raises(ValueError):
+        model.module.rinaldi2019(group, 1.0e-17, 0.14, init_file=init_file, **dict(params, n_vector=numpy.array([0.0, 0.0, 1.0])))
+
+    # Initial state saved without fingerprint
+    with numpy.load(init_file) as data:
+        arrays = {name: data[name] for name in data.files if not name.endswith("_3")}
+    numpy.savez(init_file, **arrays)
+    with pytest.raises(ValueError):
+        model.module.rinaldi2019(group, 1.0e-17, 0.14, init_file=init_file, **params)
+
+
+def test_registry_batches(model, monkeypatch):
+    module = model.module
+    rng = numpy.random.default_rng(0)
+    model.groups.update({"EDZ": rng.random(model.n) < 0.3, "CLAY": rng.random(model.n) < 0.3})
+
+    registry = module.PermeabilityRegistry()
+    registry.add("EDZ", module.constant, k0=[5.0e-13, 5.0e-13, 1.0e-12], phi0=0.14)
+    registry.add("CLAY", module.constant, k0=[5.0e-18, 5.0e-18, 1.0e-18], phi0=0.12)
+    assert registry.batches() == [["EDZ", "CLAY"]]
+
+    # Overlapping zones get the values of the last registered group
+    mask, k, phi = registry.evaluate()
+    overlap = model.groups["EDZ"] & model.groups["CLAY"]
+    assert overlap.any()
+    assert close(k[overlap], [5.0e-18, 5.0e-18, 1.0e-18]) and close(phi[overlap], 0.12)
+    assert close(k[model.groups["EDZ"] & ~overlap], [5.0e-13, 5.0e-13, 1.0e-12])
+
+    # Static batch is not hashed nor evaluated again
+    def fail(*args, **kwargs):
+        raise AssertionError("static batch evaluated again")
+
+    monkeypatch.setattr(module, "_param_key", fail)
+    model.io.tstep += 1
+    _, k2, phi2 = registry.evaluate()
+    assert close(k2, k) and close(phi2, phi)
+    assert not module.updated(model.groups["EDZ"])
@@ -0,0 +1,170 @@
+"""
+Mechanical scheduling and its timing by the coupling profiler.
+"""
+
+import math
+import sys
+
+import numpy
+import pytest
+
+
+class FakeSolver(object):
+    """FLAC3D commands of the mechanical process (cycles grow as the equilibrium ratio is tightened)."""
+
+    def __init__(self, model, ratio=1.0e-7):
+        self.model = model
+        self.ratio = ratio
+        self.active = True
+        self.commands = []
+
+    def command(self, command):
+        self.commands.append(command)
+        if command.startswith("model solve ratio"):
+            self.model.cycle += self.cycles(float(command.split()[-1]))
+        elif command.startswith("model mechanical active"):
+            self.active = command.endswith("on")
+
+    def cycles(self, ratio):
+        return int(round(100.0 * math.log10(1.0e-4 / ratio)))
+
+    def solve(self):
+        """Mechanical solve of run (to mechanical_ratio, nothing if mechanical process is off)."""
+        if self.active:
+            self.model.cycle += self.cycles(self.ratio)
+
+
+@pytest.fixture
+def scheduler(model):
+    return model.load("scheduler", "scheduler.py")
+
+
+@pytest.fixture
+def solver(model, monkeypatch):
+    solver = FakeSolver(model)
+    monkeypatch.setattr(sys.modules["itasca"], "command", solver.command)
+
+    return solver
+
+
+def coupling_step(model, solver, kwargs, tstep):
+    """One coupling step of run with instrumented callbacks."""
+    model.io.tstep = tstep
+    model.cycle += 1  # TOUGH step, new snapshot
+    for func in kwargs["callback_tough"]:
+        func((0.1 * tstep, tstep))
+
+    solver.solve()
+    for func in kwargs["callback_flac"]:
+        func((0.1 * tstep, tstep))
+
+
+def test_mechanical_scheduler(model, scheduler, solver, monkeypatch):
+    temp = numpy.full(model.n, 20.0)
+    monkeypatch.setattr(sys.modules["itasca.zonearray"], "temp", lambda: temp.copy())
+
+    # Injection rate changes at 0.5 (step 5)
+    force_times = scheduler.rate_changes([0.0, 0.25, 0.5, 0.6], [1.0, 1.0, 2.0, 2.001], tol=0.01)
+    assert numpy.allclose(force_times, [0.5])
+
+    mechanical = scheduler.MechanicalScheduler(dpp=1.0e5, dtemp=1.0, force_times=force_times, max_skip=3)
+    dpp = {2: 5.0e4, 3: 5.0e4}
+    dtemp = {4: 1.5, 10: 0.6, 11: 0.6}
+    solves = []
+    for tstep in range(1, 12):
+        model.io.tstep = tstep
+        model.pp += dpp.get(tstep, 1.0e3)
+        temp += dtemp.get(tstep, 0.0)
+
+        cycle = model.cycle
+        mechanical((0.1 * tstep, tstep))
+        solver.solve()
+        assert solver.active == mechanical.active
+        assert (model.cycle > cycle) == mechanical.active
+        solves.append(mechanical.active)
+
+    # 1: first step, 3: cumulated dpp, 4: dtemp, 5: rate change, 9: max_skip, 11: cumulated dtemp
+    assert numpy.flatnonzero(solves).tolist() == [0, 2, 3, 4, 8, 10]
+    assert mechanical.nstep == 11
+    assert mechanical.nsolve == 6
+    assert solver.commands == ["model mechanical active {}".format(x) for x in ["off", "on", "off", "on", "off", "on"]]
+
+    # Temperature is not checked in non-thermal runs
+    mechanical = scheduler.MechanicalScheduler(dpp=1.0e5, dtemp=None)
+    for tstep in range(12, 14):
+        model.io.tstep = tstep
+        temp += 10.0
+        mechanical((0.1 * tstep, tstep))
+    assert mechanical.nsolve == 1
+
+
+def test_ratio_strategy(model, scheduler, solver):
+    profiler = model.load("profiler", "profiler.py").CouplingProfiler(summary=False)
+    strategy = scheduler.RatioStrategy(ratio=1.0e-7, ratio_min=1.0e-8, ratio_max=1.0e-5, dpp_small=1.0e4, group="FAULT")
+    kwargs = profiler.wrap(mechanical_tough=(strategy.before,), mechanical_flac=(strategy.after,))
+    assert kwargs["callback_tough"][-1] == strategy.before
+    assert kwargs["callback_flac"][0] == strategy.after
+
+    strain = model.props["strain-shear-plastic"]
+    fault = numpy.flatnonzero(model.groups["FAULT"] & (strain == 0.0))
+    dpp = {1: 0.0, 2: 1.0e3, 3: 1.0e5, 4: 1.0e3, 5: 1.0e3}
+    for tstep in range(1, 6):
+        model.pp += dpp[tstep]
+        if tstep == 3:
+            strain[fault[0]] = 1.0e-4  # new failed zone at step 3
+        coupling_step(model, solver, kwargs, tstep)
+        assert solver.active
+
+    # 1: first step, 2: small increment (relaxed), 3: large increment and failure (tightened),
+    # 4: small increment after rising failures, 5: small increment (relaxed)
+    assert strategy.cycles == {1: 300, 2: 100, 3: 300 + 400, 4: 300, 5: 100}
+    assert solver.commands == [
+        "model solve ratio 1e-05",
+        "model mechanical active off",
+        "model mechanical active on",
+        "model solve ratio 1e-08",
+        "model solve ratio 1e-05",
+        "model mechanical active off",
+        "model mechanical active on",
+    ]
+
+    # Relaxed solves are timed as mechanical analysis
+    profiler.close()
+    assert [record["tstep"] for record in profiler.records] == [1, 2, 3, 4, 5]
+    assert all(record["mechanical"] > 0.0 for record in profiler.records)
+
+    with pytest.raises(ValueError):
+        scheduler.RatioStrategy(ratio=1.0e-8, ratio_min=1.0e-7)
+
+
+def test_profiler_bytes_read(model, scheduler, solver):
+    profiler = model.load("profiler", "profiler.py").CouplingProfiler()
+    snapshot = model.module.snapshot
+    kwargs = profiler.wrap(
+        callback_tough=(lambda tough_time: snapshot().pp(),),
+        callback_flac=(lambda tough_time: (snapshot().pp(), snapshot().stress_flat()),),
+    )
+    for tstep in [1, 2]:
+        coupling_step(model, solver, kwargs, tstep)
+
+    # Pore pressure is read again from the snapshot renewed by the mechanical solve
+    profiler.close()
+    nbytes = 8 * model.n * (1 + 1 + 6)
+    assert [record["bytes_read"] for record in profiler.records] == [nbytes, nbytes]
+
+
+def test_exit_summary(model, scheduler, monkeypatch):
+    profiler = model.load("profiler", "profiler.py")
+    registered = []
+    monkeypatch.setattr(scheduler.atexit, "register", registered.append)
+
+    # Exit summaries are opt-in
+    mechanical = scheduler.MechanicalScheduler()
+    strategy = scheduler.RatioStrategy()
+    profiler.CouplingProfiler()
+    assert registered == []
+
+    mechanical = scheduler.MechanicalScheduler(summary=True)
+    strategy = scheduler.RatioStrategy(summary=True)
+    summary = profiler.CouplingProfiler(summary=True)
+    assert registered == [mechanical.print_summary, strategy.print_summary, summary.print_summary]